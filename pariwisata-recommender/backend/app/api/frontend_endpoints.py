@@ -20,68 +20,13 @@ from app.models.destination_review import DestinationReview
 from app.models.activity_review import ActivityReview
 from app.models.user_interaction import UserInteraction
 from app.models.category import Category
+from app.services.destination_catalog import destination_catalog
+from app.services.recommendation_hydrator import recommendation_hydrator
+from app.services.review_stats import review_stats_provider
+from app.services.interaction_pipeline import InteractionEvent, interaction_pipeline
 
 router = APIRouter()
 
-# ============== HELPER FUNCTIONS ==============
-
-async def _update_mab_from_interaction(user_id: int, destination_id: int, db: AsyncSession):
-    """
-    Helper function to update MAB based on user interaction.
-    Called asynchronously after user clicks/rates a recommendation.
-    """
-    try:
-        from app.services.ml_service import ml_service
-        from app.services.reward_calculator import reward_calculator
-        
-        # Get user's recent recommendations (from last session)
-        # This would ideally be stored in session/cache
-        # For now, we'll calculate reward from all recent interactions
-        
-        # Get last 10 destinations the user interacted with
-        interaction_query = select(UserInteraction).where(
-            UserInteraction.user_id == user_id,
-            UserInteraction.entity_type == 'destination'
-        ).order_by(desc(UserInteraction.created_at)).limit(10)
-        
-        result = await db.execute(interaction_query)
-        recent_interactions = result.scalars().all()
-        
-        if not recent_interactions:
-            return
-        
-        # Build recommendation list from interactions
-        recommended_items = []
-        for inter in recent_interactions:
-            recommended_items.append({
-                'destination_id': inter.entity_id,
-                'category': 'Unknown',  # Would need to fetch from destination
-                'popularity_score': 0
-            })
-        
-        # Calculate composite reward
-        reward = await reward_calculator.calculate_reward_from_recommendations(
-            user_id=user_id,
-            recommended_items=recommended_items,
-            db=db
-        )
-        
-        # Update MAB (context would need to be stored/retrieved)
-        # For now, use 'default' context
-        context = {'default': True}
-        arm_index = 2  # Middle arm (λ=0.5) as default
-        
-        ml_service.update_recommendation_feedback(
-            arm_index=arm_index,
-            reward=reward,
-            context=context
-        )
-        
-        print(f"✅ MAB updated: user={user_id}, reward={reward:.3f}")
-        
-    except Exception as e:
-        print(f"⚠️ MAB update failed: {e}")
-
 # ============== PYDANTIC SCHEMAS ==============
 
 class ReviewCreate(BaseModel):
@@ -137,17 +82,11 @@ async def get_destinations_list(
         result = await db.execute(query)
         destinations = result.scalars().unique().all()
         
-        # Get review statistics for each destination
+        # Get review statistics for all destinations (one grouped query)
+        stats = await review_stats_provider.for_destinations([dest.id for dest in destinations], db)
         destinations_data = []
         for dest in destinations:
-            # Count reviews and calculate average rating
-            review_query = select(
-                func.count(DestinationReview.id).label('count'),
-                func.avg(DestinationReview.rating).label('avg_rating')
-            ).where(DestinationReview.destination_id == dest.id)
-            
-            review_result = await db.execute(review_query)
-            review_stats = review_result.one()
+            review_stats = stats[dest.id]
             
             destinations_data.append({
                 "id": dest.id,
@@ -306,6 +245,7 @@ async def create_destination_review(
         db.add(new_review)
         await db.commit()
         await db.refresh(new_review)
+        destination_catalog.invalidate()  # Agregat rating berubah
         
         # 🚀 AUTO LEARNING: Track rating + review
         from app.middleware.learning_middleware import track_rating_added, track_review_added
@@ -412,16 +352,11 @@ async def get_activities_list(
         result = await db.execute(query)
         activities = result.scalars().all()
         
-        # Get review statistics for each activity
+        # Get review statistics for all activities (one grouped query)
+        stats = await review_stats_provider.for_activities([activity.id for activity in activities], db)
         activities_data = []
         for activity in activities:
-            review_query = select(
-                func.count(ActivityReview.id).label('count'),
-                func.avg(ActivityReview.rating).label('avg_rating')
-            ).where(ActivityReview.activity_id == activity.id)
-            
-            review_result = await db.execute(review_query)
-            review_stats = review_result.one()
+            review_stats = stats[activity.id]
             
             activities_data.append({
                 "id": activity.id,
@@ -694,7 +629,8 @@ async def get_personalized_recommendations(
                     user_id=user_id, # Bisa None (untuk anonymous)
                     algorithm="hybrid",
                     num_recommendations=limit,
-                    db=db
+                    db=db,
+                    session_id=session_id  # Impression log (reward MAB anonymous)
                 )
                 ml_recommendations = ml_result[0]
                 trending = ml_recommendations
@@ -719,87 +655,11 @@ async def get_personalized_recommendations(
         
         # --- (Bagian bawah sama: Fallback logic & Response Formatting) ---
         
-        # If trending is empty or smaller than requested, fetch popular destinations from DB
-        if not trending or len(trending) < limit:
-            query = select(
-                Destination.id,
-                Destination.name,
-                Destination.description,
-                Destination.address,
-                func.avg(DestinationReview.rating).label('avg_rating'),
-                func.count(DestinationReview.id).label('review_count')
-            ).outerjoin(DestinationReview).group_by(
-                Destination.id,
-                Destination.name,
-                Destination.description,
-                Destination.address
-            ).order_by(
-                desc('avg_rating'),
-                desc('review_count')
-            ).limit(max(limit, 50))
-            
-            result = await db.execute(query)
-            destinations_data = result.all()
+        # If trending is empty or smaller than requested, fill with (memoized) popular destinations
+        trending = await recommendation_hydrator.fill_with_popular(trending, limit, db)
 
-            # Convert to consistent format
-            popular_list = [
-                {
-                    'destination_id': d.id,
-                    'popularity_score': float(d.avg_rating or 0) * (d.review_count or 0),
-                    'avg_rating': float(d.avg_rating or 0),
-                    'interaction_count': d.review_count or 0
-                }
-                for d in destinations_data
-            ]
-
-            # Merge results
-            existing_ids = set([int(x.get('destination_id', 0)) for x in (trending or [])])
-            merged = list(trending or [])
-            for p in popular_list:
-                if int(p['destination_id']) not in existing_ids:
-                    merged.append(p)
-                    existing_ids.add(int(p['destination_id']))
-                if len(merged) >= limit:
-                    break
-            trending = merged
-
-        # Get full details for final response
-        recommendations = []
-        for item in trending[:limit]:
-            # Handle beda format (objek vs dict)
-            dest_id = item.get('destination_id') if isinstance(item, dict) else getattr(item, 'destination_id', None)
-            
-            if not dest_id: continue
-
-            dest_query = select(Destination).where(Destination.id == dest_id)
-            dest_result = await db.execute(dest_query)
-            dest = dest_result.scalar_one_or_none()
-            
-            if not dest: continue
-            
-            # Get category
-            cat_query = select(Category).join(
-                Destination.categories
-            ).where(Destination.id == dest.id).limit(1)
-            cat_result = await db.execute(cat_query)
-            category = cat_result.scalar_one_or_none()
-            
-            # Get Context/Algorithm info if available
-            algo_info = item.get('algorithm', 'popular') if isinstance(item, dict) else 'popular'
-            explanation = item.get('explanation', '') if isinstance(item, dict) else ''
-
-            recommendations.append({
-                "id": dest.id,
-                "name": dest.name,
-                "image": f"/assets/images/{dest.name.lower().replace(' ', '-')}.jpg",
-                "description": dest.description or "Destinasi wisata menarik di Sumedang",
-                "region": dest.address or "Sumedang",
-                "category": category.name if category else "Alam",
-                "rating": round(float(item.get('avg_rating', 0) if item.get('avg_rating') else 0), 1),
-                "reviewCount": item.get('interaction_count', 0),
-                "algorithm": algo_info,
-                "explanation": explanation
-            })
+        # Hydration stage: resolve all card fields in one catalog lookup
+        recommendations = await recommendation_hydrator.hydrate(trending, limit, db)
         
         # Build Context Info for Frontend Debugging
         context_info = None
@@ -826,80 +686,68 @@ async def get_personalized_recommendations(
 # ============== USER INTERACTIONS ==============
 
 @router.post("/interactions/click")
-async def track_click(
-    interaction: InteractionCreate,
-    db: AsyncSession = Depends(get_db)
-):
+async def track_click(interaction: InteractionCreate):
     """
     Track user click on destination/activity card
-    + Auto-update MAB if this is a recommendation interaction
+    (reward MAB dihitung batch oleh impression log dari interaksi ini)
+
+    Event masuk antrian ingestion dan ditulis secara batch di background.
     """
-    try:
-        new_interaction = UserInteraction(
-            user_id=interaction.user_id,
-            session_id=interaction.session_id,
-            interaction_type='click',
-            entity_type=interaction.entity_type,
-            entity_id=interaction.entity_id,
-            extra_data=interaction.extra_data
-        )
-        
-        db.add(new_interaction)
-        await db.commit()
-        
-        # 🎰 MAB AUTO-UPDATE: If user clicked a recommendation
-        if interaction.user_id and interaction.entity_type == 'destination':
-            from app.services.ml_service import ml_service
-            from app.services.reward_calculator import reward_calculator
-            import asyncio
-            
-            # Trigger async reward calculation and MAB update
-            asyncio.create_task(
-                _update_mab_from_interaction(
-                    user_id=interaction.user_id,
-                    destination_id=interaction.entity_id,
-                    db=db
-                )
-            )
-        
-        return {
-            "message": "Click tracked successfully",
-            "interaction_id": new_interaction.id
-        }
-    except Exception as e:
-        await db.rollback()
-        raise HTTPException(status_code=500, detail=f"Failed to track click: {str(e)}")
+    queued = interaction_pipeline.submit(InteractionEvent(
+        user_id=interaction.user_id,
+        session_id=interaction.session_id,
+        interaction_type='click',
+        entity_type=interaction.entity_type,
+        entity_id=interaction.entity_id,
+        extra_data=interaction.extra_data
+    ))
+    if not queued:
+        raise HTTPException(status_code=503, detail="Interaction queue is full, please retry")
+    
+    return {
+        "message": "Click tracked successfully",
+        "interaction_id": None,
+        "queued": True
+    }
 
 
 @router.post("/interactions/view")
-async def track_view(
-    interaction: InteractionCreate,
-    db: AsyncSession = Depends(get_db)
-):
+async def track_view(interaction: InteractionCreate):
     """
     Track user page view with duration
+
+    Event masuk antrian ingestion dan ditulis secara batch di background.
     """
-    try:
-        new_interaction = UserInteraction(
-            user_id=interaction.user_id,
-            session_id=interaction.session_id,
-            interaction_type='view',
-            entity_type=interaction.entity_type,
-            entity_id=interaction.entity_id,
-            duration=interaction.duration,
-            extra_data=interaction.extra_data
-        )
-        
-        db.add(new_interaction)
-        await db.commit()
-        
-        return {
-            "message": "View tracked successfully",
-            "interaction_id": new_interaction.id
-        }
-    except Exception as e:
-        await db.rollback()
-        raise HTTPException(status_code=500, detail=f"Failed to track view: {str(e)}")
+    queued = interaction_pipeline.submit(InteractionEvent(
+        user_id=interaction.user_id,
+        session_id=interaction.session_id,
+        interaction_type='view',
+        entity_type=interaction.entity_type,
+        entity_id=interaction.entity_id,
+        duration=interaction.duration,
+        extra_data=interaction.extra_data
+    ))
+    if not queued:
+        raise HTTPException(status_code=503, detail="Interaction queue is full, please retry")
+    
+    return {
+        "message": "View tracked successfully",
+        "interaction_id": None,
+        "queued": True
+    }
+
+
+@router.get("/interactions/pipeline/metrics")
+async def get_interaction_pipeline_metrics():
+    """Metrics antrian ingestion (depth, rejected/backpressure, batch & latency tulis)"""
+    return interaction_pipeline.get_metrics()
+
+
+@router.get("/interactions/impressions/metrics")
+async def get_impression_log_metrics():
+    """Metrics impression log (buffer, impression yang di-settle, reward rata-rata batch terakhir)"""
+    from app.services.impression_log import impression_log
+    return impression_log.get_metrics()
 
 
 @router.get("/interactions/user/{user_id}")
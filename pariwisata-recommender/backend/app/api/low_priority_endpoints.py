@@ -10,8 +10,7 @@ LOW PRIORITY API ENDPOINTS
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
-from sqlalchemy import func, or_, and_, desc
+from sqlalchemy import func, and_, desc
 from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel, Field
@@ -21,10 +20,12 @@ from app.models.user import User
 from app.models.destinations import Destination
 from app.models.activity import Activity
 from app.models.category import Category
-from app.models.destination_review import DestinationReview
-from app.models.activity_review import ActivityReview
+from app.models.destination_category import destination_categories
 from app.models.user_interaction import UserInteraction
 from app.api.medium_priority_endpoints import get_current_user, require_auth
+from app.services.review_stats import review_stats_provider
+from app.services.destination_catalog import destination_catalog
+from app.services.search_index import search_service
 
 router = APIRouter()
 
@@ -59,41 +60,25 @@ async def search_all(
 ):
     """
     Universal search across destinations and activities
-    Searches in name and description
+    Searches in name, description and category (BM25 ranking, prefix type-ahead)
     """
     results = []
     
     try:
         # Search destinations if not filtered to activities only
         if not type or type == 'destination':
-            dest_query = select(Destination).where(
-                or_(
-                    Destination.name.ilike(f"%{q}%"),
-                    Destination.description.ilike(f"%{q}%")
-                )
-            )
+            hits = await search_service.search_destinations(q, db, limit)
             
-            dest_result = await db.execute(dest_query.limit(limit))
-            destinations = dest_result.scalars().all()
+            # Review stats & kategori utama untuk semua hasil sekaligus
+            dest_ids = [dest_id for dest_id, _ in hits]
+            stats = await review_stats_provider.for_destinations(dest_ids, db)
+            catalog_entries = await destination_catalog.get_many(dest_ids, db)
             
-            for dest in destinations:
-                # Get review stats
-                review_stats = await db.execute(
-                    select(
-                        func.count(DestinationReview.id),
-                        func.avg(DestinationReview.rating)
-                    ).where(DestinationReview.destination_id == dest.id)
-                )
-                count, avg_rating = review_stats.one()
-                
-                # Get category (first one)
-                cat_result = await db.execute(
-                    select(Category)
-                    .join(Destination.categories)
-                    .where(Destination.id == dest.id)
-                    .limit(1)
-                )
-                category_obj = cat_result.scalar_one_or_none()
+            for dest_id in dest_ids:
+                dest = catalog_entries.get(dest_id)
+                if not dest:
+                    continue
+                count, avg_rating = stats[dest.id]
                 
                 results.append({
                     "type": "destination",
@@ -101,35 +86,18 @@ async def search_all(
                     "name": dest.name,
                     "description": dest.description,
                     "image": f"/assets/images/{dest.name.lower().replace(' ', '-')}.jpg",
-                    "category": category_obj.name if category_obj else "Umum",
+                    "category": dest.primary_category or "Umum",
                     "rating": round(float(avg_rating or 0), 1),
                     "reviewCount": count or 0
                 })
         
         # Search activities if not filtered to destinations only
         if not type or type == 'activity':
-            activity_query = select(Activity).where(
-                or_(
-                    Activity.name.ilike(f"%{q}%"),
-                    Activity.description.ilike(f"%{q}%")
-                )
-            )
-            
-            if category:
-                activity_query = activity_query.where(Activity.category.ilike(f"%{category}%"))
-            
-            activity_result = await db.execute(activity_query.limit(limit))
-            activities = activity_result.scalars().all()
+            activities = await search_service.search_activities(q, db, limit, category=category)
             
+            stats = await review_stats_provider.for_activities([activity.id for activity in activities], db)
             for activity in activities:
-                # Get review stats
-                review_stats = await db.execute(
-                    select(
-                        func.count(ActivityReview.id),
-                        func.avg(ActivityReview.rating)
-                    ).where(ActivityReview.activity_id == activity.id)
-                )
-                count, avg_rating = review_stats.one()
+                count, avg_rating = stats[activity.id]
                 
                 results.append({
                     "type": "activity",
@@ -165,28 +133,15 @@ async def search_destinations(
     Advanced search for destinations with filters
     """
     try:
-        query = select(Destination).where(
-            or_(
-                Destination.name.ilike(f"%{q}%"),
-                Destination.description.ilike(f"%{q}%"),
-                Destination.address.ilike(f"%{q}%")
-            )
-        )
-        
-        if region:
-            query = query.where(Destination.address.ilike(f"%{region}%"))
-        
-        result = await db.execute(query.limit(limit))
-        destinations = result.scalars().all()
+        hits = await search_service.search_destinations(q, db, limit, region=region)
+        entries = await destination_catalog.get_many([dest_id for dest_id, _ in hits], db)
+        destinations = [entries[dest_id] for dest_id, _ in hits if dest_id in entries]
         
         # Filter by rating if specified
+        stats = await review_stats_provider.for_destinations([dest.id for dest in destinations], db)
         filtered_destinations = []
         for dest in destinations:
-            review_stats = await db.execute(
-                select(func.avg(DestinationReview.rating))
-                .where(DestinationReview.destination_id == dest.id)
-            )
-            avg_rating = review_stats.scalar() or 0
+            avg_rating = stats[dest.id].avg_rating or 0
             
             if not min_rating or avg_rating >= min_rating:
                 filtered_destinations.append({
@@ -220,31 +175,15 @@ async def search_activities(
     Advanced search for activities with filters
     """
     try:
-        query = select(Activity).where(
-            or_(
-                Activity.name.ilike(f"%{q}%"),
-                Activity.description.ilike(f"%{q}%")
-            )
-        )
-        
-        if category:
-            query = query.where(Activity.category.ilike(f"%{category}%"))
-        
-        result = await db.execute(query.limit(limit))
-        activities = result.scalars().all()
+        activities = await search_service.search_activities(q, db, limit, category=category)
         
         # Note: Price filtering would require parsing price_range string
         # For now, return all matching activities
         
+        stats = await review_stats_provider.for_activities([activity.id for activity in activities], db)
         activities_list = []
         for activity in activities:
-            review_stats = await db.execute(
-                select(
-                    func.count(ActivityReview.id),
-                    func.avg(ActivityReview.rating)
-                ).where(ActivityReview.activity_id == activity.id)
-            )
-            count, avg_rating = review_stats.one()
+            count, avg_rating = stats[activity.id]
             
             activities_list.append({
                 "id": activity.id,
@@ -276,50 +215,50 @@ async def get_related_destinations(
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Get related destinations based on categories and location
+    Get related destinations from the precomputed item neighbor graph
+    (content + collaborative similarity), falling back to shared categories
     """
     try:
+        from app.services.ml_service import ml_service
+        
         # Get the destination
-        result = await db.execute(
-            select(Destination)
-            .options(selectinload(Destination.categories))
-            .where(Destination.id == destination_id)
-        )
-        destination = result.scalar_one_or_none()
+        destination = await destination_catalog.get(destination_id, db)
         
         if not destination:
             raise HTTPException(status_code=404, detail="Destination not found")
         
-        # Get destinations with same categories
-        category_ids = [cat.id for cat in destination.categories]
+        # O(K) lookup di item graph hasil training
+        neighbors = ml_service.hybrid_recommender.get_related_items(destination_id, limit)
         
-        if category_ids:
-            # Find destinations sharing categories
-            related_query = select(Destination).join(Destination.categories).where(
+        if neighbors is not None:
+            related_ids = [neighbor['destination_id'] for neighbor in neighbors]
+        else:
+            # Fallback (model belum di-train): destinasi dengan kategori yang sama
+            category_ids = select(destination_categories.c.category_id).where(
+                destination_categories.c.destination_id == destination_id
+            )
+            related_query = select(destination_categories.c.destination_id).where(
                 and_(
-                    Category.id.in_(category_ids),
-                    Destination.id != destination_id
+                    destination_categories.c.category_id.in_(category_ids),
+                    destination_categories.c.destination_id != destination_id
                 )
             ).distinct().limit(limit)
-        else:
-            # Fallback: get random popular destinations
-            related_query = select(Destination).where(
-                Destination.id != destination_id
-            ).limit(limit)
+            related_ids = (await db.execute(related_query)).scalars().all()
+            
+            if not related_ids:
+                # Fallback: get random popular destinations
+                related_ids = (await db.execute(
+                    select(Destination.id).where(Destination.id != destination_id).limit(limit)
+                )).scalars().all()
         
-        related_result = await db.execute(related_query)
-        related_destinations = related_result.scalars().all()
+        related_entries = await destination_catalog.get_many(related_ids, db)
+        related_destinations = [related_entries[dest_id] for dest_id in related_ids if dest_id in related_entries]
         
         # Format response
+        stats = await review_stats_provider.for_destinations([dest.id for dest in related_destinations], db)
         related_list = []
         for dest in related_destinations:
-            review_stats = await db.execute(
-                select(
-                    func.count(DestinationReview.id),
-                    func.avg(DestinationReview.rating)
-                ).where(DestinationReview.destination_id == dest.id)
-            )
-            count, avg_rating = review_stats.one()
+            count, avg_rating = stats[dest.id]
             
             related_list.append({
                 "id": dest.id,
@@ -373,15 +312,10 @@ async def get_related_activities(
         related_activities = related_result.scalars().all()
         
         # Format response
+        stats = await review_stats_provider.for_activities([act.id for act in related_activities], db)
         related_list = []
         for act in related_activities:
-            review_stats = await db.execute(
-                select(
-                    func.count(ActivityReview.id),
-                    func.avg(ActivityReview.rating)
-                ).where(ActivityReview.activity_id == act.id)
-            )
-            count, avg_rating = review_stats.one()
+            count, avg_rating = stats[act.id]
             
             related_list.append({
                 "id": act.id,
@@ -507,18 +441,13 @@ async def get_personalized_recommendations_for_user(
                 
                 dest_result = await db.execute(dest_query)
                 destinations = dest_result.scalars().all()
+                stats = await review_stats_provider.for_destinations([dest.id for dest in destinations], db)
                 
                 for dest in destinations:
                     if len(recommendations) >= limit:
                         break
                     
-                    review_stats = await db.execute(
-                        select(
-                            func.count(DestinationReview.id),
-                            func.avg(DestinationReview.rating)
-                        ).where(DestinationReview.destination_id == dest.id)
-                    )
-                    count, avg_rating = review_stats.one()
+                    count, avg_rating = stats[dest.id]
                     
                     recommendations.append({
                         "type": "destination",
@@ -536,15 +465,10 @@ async def get_personalized_recommendations_for_user(
             popular_query = select(Destination).limit(limit - len(recommendations))
             popular_result = await db.execute(popular_query)
             popular_destinations = popular_result.scalars().all()
+            stats = await review_stats_provider.for_destinations([dest.id for dest in popular_destinations], db)
             
             for dest in popular_destinations:
-                review_stats = await db.execute(
-                    select(
-                        func.count(DestinationReview.id),
-                        func.avg(DestinationReview.rating)
-                    ).where(DestinationReview.destination_id == dest.id)
-                )
-                count, avg_rating = review_stats.one()
+                count, avg_rating = stats[dest.id]
                 
                 recommendations.append({
                     "type": "destination",
@@ -98,6 +98,9 @@ async def track_rating_added(destination_id: int, user_id: int, rating: float, d
             rating=rating,
             db=db
         )
+        # Faktor collaborative user di-fold-in ulang (tanpa menunggu retrain)
+        from app.services.ml_service import ml_service
+        ml_service.collaborative_recommender.mark_user_updated(user_id)
     except Exception as e:
         print(f"⚠️  Failed to track rating: {e}")
 
@@ -0,0 +1,200 @@
+"""
+Bandit Store
+State contextual MAB dalam array NumPy contiguous: satu baris per context
+(counts & values per arm), dialamatkan lewat index context_key -> baris.
+Seleksi UCB1 dan update reward dilakukan batch dalam satu operasi vektor.
+"""
+
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence
+
+
+class BanditStore:
+    """
+    counts[row, arm]           : jumlah pull per arm
+    values[row, arm]           : rata-rata reward per arm
+    total_selections[row]      : total update untuk context tersebut
+    last_used[row]             : tick akses terakhir (untuk eviction LRU)
+
+    Kapasitas tumbuh 2x saat penuh, sehingga penambahan context amortized O(1).
+    Jika max_rows di-set, context baru menempati baris context yang paling lama
+    tidak dipakai (kecuali key di pinned_keys).
+    """
+
+    INITIAL_CAPACITY = 64
+
+    def __init__(self, n_arms: int, max_rows: Optional[int] = None,
+                 pinned_keys: Sequence[str] = ()):
+        self.n_arms = n_arms
+        self.max_rows = max_rows
+        self.pinned_keys = set(pinned_keys)
+        self.keys: List[str] = []
+        self.key_index: Dict[str, int] = {}
+        self.counts = np.zeros((self.INITIAL_CAPACITY, n_arms))
+        self.values = np.zeros((self.INITIAL_CAPACITY, n_arms))
+        self.total_selections = np.zeros(self.INITIAL_CAPACITY, dtype=np.int64)
+        self.last_used = np.zeros(self.INITIAL_CAPACITY, dtype=np.int64)
+        self._tick = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, context_key: str) -> bool:
+        return context_key in self.key_index
+
+    def _grow(self, min_capacity: int):
+        capacity = self.counts.shape[0]
+        while capacity < min_capacity:
+            capacity *= 2
+        for name in ('counts', 'values'):
+            grown = np.zeros((capacity, self.n_arms))
+            grown[:len(self.keys)] = getattr(self, name)[:len(self.keys)]
+            setattr(self, name, grown)
+        for name in ('total_selections', 'last_used'):
+            grown = np.zeros(capacity, dtype=np.int64)
+            grown[:len(self.keys)] = getattr(self, name)[:len(self.keys)]
+            setattr(self, name, grown)
+
+    def get_row(self, context_key: str) -> Optional[int]:
+        return self.key_index.get(context_key)
+
+    def add_row(self, context_key: str) -> int:
+        """Tambah context baru (baris nol); return index barisnya"""
+        if self.max_rows is not None and len(self.keys) >= self.max_rows:
+            row = self._evict_lru()
+            if row is not None:
+                self.keys[row] = context_key
+                self.key_index[context_key] = row
+                self.touch([row])
+                return row
+
+        row = len(self.keys)
+        if row >= self.counts.shape[0]:
+            self._grow(row + 1)
+        self.keys.append(context_key)
+        self.key_index[context_key] = row
+        self.touch([row])
+        return row
+
+    def _evict_lru(self) -> Optional[int]:
+        """Kosongkan baris yang paling lama tidak dipakai; return index barisnya"""
+        last_used = self.last_used[:len(self.keys)].astype(float)
+        for key in self.pinned_keys:
+            row = self.key_index.get(key)
+            if row is not None:
+                last_used[row] = np.inf
+        row = int(np.argmin(last_used))
+        if np.isinf(last_used[row]):
+            return None
+
+        del self.key_index[self.keys[row]]
+        self.counts[row] = 0
+        self.values[row] = 0
+        self.total_selections[row] = 0
+        self.evictions += 1
+        return row
+
+    def touch(self, rows: Sequence[int]):
+        """Tandai baris sebagai baru dipakai (urutan: yang terakhir paling baru)"""
+        rows = np.asarray(rows, dtype=np.int64)
+        self.last_used[rows] = self._tick + 1 + np.arange(rows.size)
+        self._tick += rows.size
+
+    def pulls(self, rows: Sequence[int]) -> np.ndarray:
+        """Total pull (semua arm) per baris"""
+        return self.counts[np.asarray(rows, dtype=np.int64)].sum(axis=1)
+
+    def select_arms(self, rows: Sequence[int], exploration_param: float) -> np.ndarray:
+        """
+        UCB1 untuk banyak context sekaligus.
+        - Belum ada pull sama sekali -> arm tengah (cold start)
+        - Ada arm yang belum pernah dicoba -> arm pertama dengan count 0
+        - Selain itu -> argmax(value + c * sqrt(2 ln N / n))
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        counts = self.counts[rows]
+        values = self.values[rows]
+        totals = counts.sum(axis=1)
+
+        untried = counts == 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bonus = exploration_param * np.sqrt(2 * np.log(np.maximum(totals, 1))[:, None] / counts)
+        ucb = np.where(untried, -np.inf, values + bonus)
+
+        arms = np.argmax(ucb, axis=1)
+        has_untried = untried.any(axis=1)
+        arms[has_untried] = np.argmax(untried[has_untried], axis=1)
+        arms[totals == 0] = self.n_arms // 2
+        return arms
+
+    def update_rewards(self, rows: Sequence[int], arms: Sequence[int], rewards: Sequence[float]):
+        """
+        Batched update rata-rata reward dengan scatter-add.
+        Hasilnya sama dengan update incremental berurutan:
+        mean_baru = (mean_lama * n_lama + sum(reward)) / (n_lama + k).
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        arms = np.asarray(arms, dtype=np.int64)
+        rewards = np.asarray(rewards, dtype=float)
+        if rows.size == 0:
+            return
+
+        reward_sums = np.zeros_like(self.values[:len(self.keys)])
+        pulls = np.zeros_like(reward_sums)
+        np.add.at(reward_sums, (rows, arms), rewards)
+        np.add.at(pulls, (rows, arms), 1)
+
+        touched = pulls > 0
+        counts = self.counts[:len(self.keys)]
+        values = self.values[:len(self.keys)]
+        new_counts = counts + pulls
+        values[touched] = (values[touched] * counts[touched] + reward_sums[touched]) / new_counts[touched]
+        counts[touched] = new_counts[touched]
+        np.add.at(self.total_selections, rows, 1)
+
+    def brain(self, context_key: str) -> Dict[str, Any]:
+        """Representasi dict satu context (format state JSON lama)"""
+        row = self.key_index[context_key]
+        return {
+            'counts': self.counts[row].tolist(),
+            'values': self.values[row].tolist(),
+            'total_selections': int(self.total_selections[row])
+        }
+
+    def to_state(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Export ke format JSON {context_key: {counts, values, total_selections}},
+        terurut dari yang paling lama dipakai agar urutan LRU bertahan saat import.
+        """
+        n = len(self.keys)
+        counts = self.counts[:n].tolist()
+        values = self.values[:n].tolist()
+        totals = self.total_selections[:n].tolist()
+        order = np.argsort(self.last_used[:n], kind='stable').tolist()
+        return {
+            self.keys[row]: {'counts': counts[row], 'values': values[row], 'total_selections': totals[row]}
+            for row in order
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Dict[str, Any]], n_arms: int,
+                   max_rows: Optional[int] = None,
+                   pinned_keys: Sequence[str] = ()) -> "BanditStore":
+        """
+        Import dari format JSON. Array dengan panjang berbeda dari n_arms
+        (state lama dengan jumlah arm lain) dipotong/di-pad ke n_arms.
+        Jika state melebihi max_rows, context yang diimport terakhir menggeser
+        yang pertama (LRU).
+        """
+        store = cls(n_arms, max_rows=max_rows, pinned_keys=pinned_keys)
+        if state:
+            store._grow(len(state) if max_rows is None else min(len(state), max_rows))
+        for key, brain in state.items():
+            row = store.add_row(key)
+            counts = np.asarray(brain.get('counts', []), dtype=float)[:n_arms]
+            values = np.asarray(brain.get('values', []), dtype=float)[:n_arms]
+            store.counts[row, :len(counts)] = counts
+            store.values[row, :len(values)] = values
+            store.total_selections[row] = int(brain.get('total_selections', 0))
+        return store
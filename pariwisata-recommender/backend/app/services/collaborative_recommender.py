@@ -4,25 +4,32 @@ import pickle
 from datetime import datetime
 from pathlib import Path
 from sklearn.decomposition import NMF
-from sklearn.metrics.pairwise import cosine_similarity
-from scipy.sparse import csr_matrix
+from scipy.sparse import csr_matrix, coo_matrix
 from typing import List, Dict, Any, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.services.base_recommender import BaseRecommender
+from app.services.scoring_utils import top_k_indices
+from app.services.neighbor_index import NeighborIndex
+from app.services.user_fold_in import UserFactorTable
+from app.services.destination_catalog import destination_catalog, CatalogEntry
+from app.services.model_artifacts import ModelArtifact, artifact_dir, load_artifact, save_artifact
 from app.models.user import User
-from app.models.destinations import Destination
 from app.models.rating import Rating
+from app.models.destination_review import DestinationReview
 
 class CollaborativeRecommender(BaseRecommender):
     """Collaborative Filtering menggunakan Matrix Factorization (NMF) - DUPLICATE SAFE VERSION"""
     
     MODEL_DIR = Path(__file__).resolve().parents[2] / "data" / "models"
     MODEL_FILE = "collaborative_model.pkl"
+    NEIGHBOR_K = 20  # Jumlah tetangga user yang disimpan di NeighborIndex
 
-    def __init__(self):
+    def __init__(self, model_dir: Optional[Path] = None):
         import os
         super().__init__()
+        # Direktori artifact (model registry memberi direktori per versi)
+        self.MODEL_DIR = Path(model_dir) if model_dir is not None else type(self).MODEL_DIR
         self.nmf_model = NMF(n_components=20, random_state=42, max_iter=50, verbose=True)
         self.user_item_matrix = None
         self.user_factors = None
@@ -31,7 +38,11 @@ class CollaborativeRecommender(BaseRecommender):
         self.item_encoder = {}
         self.user_decoder = {}
         self.item_decoder = {}
-        self.user_similarities = None
+        self.neighbor_index = None  # NeighborIndex top-K user (pengganti matrix n_users x n_users)
+        self.neighbor_workers = int(os.getenv("NEIGHBOR_INDEX_WORKERS", "1"))
+        self.fold_in = None  # UserFactorTable: user baru / rating berubah sejak training
+        self.rated_matrix = None  # CSR (n_users x n_items): entri non-zero = item sudah di-rate
+        self.item_ids = np.empty(0, dtype=np.int64)  # kolom matrix -> destination_id
         self.model_info = {}  # Track model metadata
 
         # Tentukan path model dari env atau default
@@ -60,158 +71,7 @@ class CollaborativeRecommender(BaseRecommender):
         """Train collaborative filtering model - HANDLES DUPLICATES SAFELY"""
         try:
             print("🤖 Starting Collaborative Filtering Training...")
-            
-            # Load ratings data
-            result = await db.execute(select(Rating))
-            ratings = result.scalars().all()
-            
-            if len(ratings) < 10:
-                raise ValueError("Not enough ratings for collaborative filtering (minimum 10 required)")
-            
-            # Convert ke DataFrame
-            ratings_data = []
-            for rating in ratings:
-                ratings_data.append({
-                    'user_id': rating.user_id,
-                    'destination_id': rating.destination_id,
-                    'rating': rating.rating,
-                    'created_at': rating.created_at
-                })
-            
-            ratings_df = pd.DataFrame(ratings_data)
-            print(f"📊 Raw ratings data: {len(ratings_df)} entries")
-            
-            # === DUPLICATE DETECTION & HANDLING ===
-            duplicates = ratings_df.duplicated(subset=['user_id', 'destination_id'], keep=False)
-            if duplicates.any():
-                duplicate_count = duplicates.sum()
-                print(f"⚠️ Found {duplicate_count} duplicate (user_id, destination_id) pairs")
-                
-                # Show some examples
-                duplicate_pairs = ratings_df[duplicates].groupby(['user_id', 'destination_id']).size().head()
-                print("📋 Sample duplicates:")
-                for (user_id, dest_id), count in duplicate_pairs.items():
-                    print(f"   User {user_id} → Destination {dest_id}: {count} ratings")
-                
-                # Strategy: Keep latest rating (most recent created_at)
-                if 'created_at' in ratings_df.columns:
-                    print("📅 Resolving duplicates by keeping latest rating...")
-                    ratings_df = ratings_df.sort_values('created_at')
-                    ratings_df = ratings_df.drop_duplicates(
-                        subset=['user_id', 'destination_id'], 
-                        keep='last'
-                    )
-                    print(f"✅ After deduplication: {len(ratings_df)} entries")
-                else:
-                    print("📊 Resolving duplicates by averaging ratings...")
-                    ratings_df = ratings_df.groupby(['user_id', 'destination_id'])['rating'].mean().reset_index()
-                    print(f"✅ After deduplication: {len(ratings_df)} entries")
-            else:
-                print("✅ No duplicate ratings found")
-            
-            # === SAFETY CHECK: Verify no duplicates remain ===
-            remaining_duplicates = ratings_df.duplicated(subset=['user_id', 'destination_id'])
-            if remaining_duplicates.any():
-                print(f"❌ ERROR: {remaining_duplicates.sum()} duplicates still remain!")
-                raise ValueError("Failed to resolve all duplicates")
-            
-            # === ROBUST PIVOT: Use pivot_table instead of pivot ===
-            print("🔄 Creating user-item matrix...")
-            try:
-                self.user_item_matrix = ratings_df.pivot_table(
-                    index='user_id',
-                    columns='destination_id',
-                    values='rating',
-                    aggfunc='mean',  # Extra safety: handle any remaining duplicates
-                    fill_value=0
-                )
-                print(f"✅ User-item matrix created: {self.user_item_matrix.shape}")
-            except Exception as pivot_error:
-                print(f"❌ Pivot error: {pivot_error}")
-                # Emergency fallback: manual pivot
-                print("🚨 Attempting emergency fallback...")
-                ratings_df = ratings_df.groupby(['user_id', 'destination_id'])['rating'].first().reset_index()
-                self.user_item_matrix = ratings_df.pivot(
-                    index='user_id',
-                    columns='destination_id', 
-                    values='rating'
-                ).fillna(0)
-                print(f"🆘 Fallback successful: {self.user_item_matrix.shape}")
-            
-            # Create encoders/decoders
-            unique_users = self.user_item_matrix.index.tolist()
-            unique_items = self.user_item_matrix.columns.tolist()
-            
-            self.user_encoder = {user_id: idx for idx, user_id in enumerate(unique_users)}
-            self.item_encoder = {item_id: idx for idx, item_id in enumerate(unique_items)}
-            self.user_decoder = {idx: user_id for user_id, idx in self.user_encoder.items()}
-            self.item_decoder = {idx: item_id for item_id, idx in self.item_encoder.items()}
-            
-            n_users = len(unique_users)
-            n_items = len(unique_items)
-            print(f"👥 Users: {n_users}, 🏖️ Destinations: {n_items}")
-            
-            # Validate matrix dimensions
-            if self.user_item_matrix.shape[0] < 2 or self.user_item_matrix.shape[1] < 2:
-                raise ValueError(f"Insufficient data for matrix factorization. Matrix shape: {self.user_item_matrix.shape}")
-            
-            # Train NMF model
-            matrix_values = self.user_item_matrix.values
-            
-            # Calculate sparsity
-            sparsity = (matrix_values == 0).sum() / matrix_values.size
-            print(f"📈 Matrix sparsity: {sparsity:.2%}")
-            
-            # Adjust NMF components based on data size and sparsity
-            if sparsity > 0.99:
-                print("⚠️ Very sparse matrix, reducing NMF components")
-                n_components = min(10, self.user_item_matrix.shape[0] - 1, self.user_item_matrix.shape[1] - 1)
-                self.nmf_model = NMF(n_components=n_components, random_state=42, max_iter=500)
-            elif sparsity > 0.95:
-                n_components = min(25, self.user_item_matrix.shape[0] - 1, self.user_item_matrix.shape[1] - 1)
-                self.nmf_model = NMF(n_components=n_components, random_state=42, max_iter=500)
-            
-            # Fit NMF model
-            print("🧠 Training NMF model...")
-            self.user_factors = self.nmf_model.fit_transform(matrix_values)
-            self.item_factors = self.nmf_model.components_.T
-            
-            # Calculate user-user similarities (OPTIMIZED for large datasets)
-            print("🤝 Computing user similarities (memory-efficient)...")
-            # For large user sets, skip full similarity matrix to avoid memory issues
-            # We'll compute similarities on-demand during recommendation
-            if n_users > 10000:
-                print(f"⚡ Skipping precomputed similarity matrix for {n_users} users (too large)")
-                self.user_similarities = None  # Compute on-demand instead
-            else:
-                self.user_similarities = cosine_similarity(self.user_factors)
-            
-            self.is_trained = True
-            
-            # Update model info for status tracking
-            self.model_info = {
-                'trained_at': datetime.now().isoformat(),
-                'n_samples': len(ratings_df),
-                'accuracy': 0.82  # Collaborative filtering baseline accuracy
-            }
-            
-            # Auto-save model setelah training berhasil
-            self._save_model()
-            
-            print("✅ Collaborative filtering training completed successfully!")
-            
-            return {
-                "status": "success",
-                "users_count": len(unique_users),
-                "items_count": len(unique_items),
-                "ratings_count": len(ratings_df),
-                "matrix_shape": self.user_item_matrix.shape,
-                "sparsity": float(sparsity),
-                "nmf_components": self.nmf_model.n_components,
-                "duplicates_removed": duplicate_count if duplicates.any() else 0,
-                "trained_at": self.model_info['trained_at'],
-                "accuracy": self.model_info['accuracy']
-            }
+            return self.fit(**await self.load_training_data(db))
             
         except Exception as e:
             print(f"❌ Collaborative training error: {str(e)}")
@@ -220,50 +80,220 @@ class CollaborativeRecommender(BaseRecommender):
             traceback.print_exc()
             raise Exception(f"Collaborative training failed: {str(e)}")
 
+    @staticmethod
+    def rating_source(user_id: Optional[int] = None):
+        """
+        Query (user_id, destination_id, rating, created_at): tabel ratings digabung
+        rating di destination_reviews (review anonim diabaikan). Sumber yang sama
+        untuk training dan fold-in; duplikat per (user, item) diselesaikan oleh
+        _deduplicate_keep_latest.
+        """
+        ratings = select(Rating.user_id, Rating.destination_id, Rating.rating, Rating.created_at)
+        reviews = (
+            select(DestinationReview.user_id, DestinationReview.destination_id,
+                   DestinationReview.rating, DestinationReview.created_at)
+            .where(DestinationReview.user_id.isnot(None))
+        )
+        if user_id is not None:
+            ratings = ratings.where(Rating.user_id == user_id)
+            reviews = reviews.where(DestinationReview.user_id == user_id)
+        return ratings.union_all(reviews)
+
+    @staticmethod
+    async def load_training_data(db: AsyncSession) -> Dict[str, np.ndarray]:
+        """Ambil ratings (+ rating review) secara kolumnar (tanpa ORM object per baris) sebagai input fit()"""
+        result = await db.execute(CollaborativeRecommender.rating_source())
+        rows = result.all()
+        
+        if len(rows) < 10:
+            raise ValueError("Not enough ratings for collaborative filtering (minimum 10 required)")
+        
+        n_rows = len(rows)
+        return {
+            'user_ids': np.fromiter((r[0] for r in rows), dtype=np.int64, count=n_rows),
+            'item_ids': np.fromiter((r[1] for r in rows), dtype=np.int64, count=n_rows),
+            'ratings': np.fromiter((r[2] for r in rows), dtype=np.float64, count=n_rows),
+            'created_at': np.array([r[3] for r in rows], dtype='datetime64[ns]')
+        }
+
+    def fit(self, user_ids: np.ndarray, item_ids: np.ndarray, ratings: np.ndarray,
+            created_at: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """
+        Fit NMF dari array kolumnar (user_id, destination_id, rating, created_at).
+        User-item matrix dibangun langsung sebagai scipy.sparse CSR, tanpa pivot dense.
+        """
+        print(f"📊 Raw ratings data: {len(ratings)} entries")
+        
+        # === DUPLICATE DETECTION & HANDLING (vectorized keep-latest) ===
+        user_ids, item_ids, ratings, duplicate_count = self._deduplicate_keep_latest(
+            user_ids, item_ids, ratings, created_at
+        )
+        if duplicate_count:
+            print(f"⚠️ Found {duplicate_count} duplicate (user_id, destination_id) pairs")
+            print(f"✅ After deduplication (keep latest): {len(ratings)} entries")
+        else:
+            print("✅ No duplicate ratings found")
+        
+        # === SPARSE USER-ITEM MATRIX ===
+        print("🔄 Creating sparse user-item matrix...")
+        unique_users, user_idx = np.unique(user_ids, return_inverse=True)
+        unique_items, item_idx = np.unique(item_ids, return_inverse=True)
+        n_users = len(unique_users)
+        n_items = len(unique_items)
+        
+        self.user_item_matrix = coo_matrix(
+            (ratings, (user_idx, item_idx)), shape=(n_users, n_items)
+        ).tocsr()
+        self.user_item_matrix.eliminate_zeros()
+        print(f"✅ User-item matrix created: {self.user_item_matrix.shape}")
+        
+        # Create encoders/decoders
+        self.user_encoder = {int(user_id): idx for idx, user_id in enumerate(unique_users)}
+        self.item_encoder = {int(item_id): idx for idx, item_id in enumerate(unique_items)}
+        self.user_decoder = {idx: user_id for user_id, idx in self.user_encoder.items()}
+        self.item_decoder = {idx: item_id for item_id, idx in self.item_encoder.items()}
+        
+        print(f"👥 Users: {n_users}, 🏖️ Destinations: {n_items}")
+        
+        # Validate matrix dimensions
+        if n_users < 2 or n_items < 2:
+            raise ValueError(f"Insufficient data for matrix factorization. Matrix shape: {self.user_item_matrix.shape}")
+        
+        # Calculate sparsity (tanpa materialisasi dense)
+        sparsity = self._sparsity()
+        print(f"📈 Matrix sparsity: {sparsity:.2%}")
+        
+        # Adjust NMF components based on data size and sparsity
+        if sparsity > 0.99:
+            print("⚠️ Very sparse matrix, reducing NMF components")
+            n_components = min(10, n_users - 1, n_items - 1)
+            self.nmf_model = NMF(n_components=n_components, random_state=42, max_iter=500)
+        elif sparsity > 0.95:
+            n_components = min(25, n_users - 1, n_items - 1)
+            self.nmf_model = NMF(n_components=n_components, random_state=42, max_iter=500)
+        
+        # Fit NMF model langsung pada input sparse
+        print("🧠 Training NMF model...")
+        self.user_factors = self.nmf_model.fit_transform(self.user_item_matrix)
+        self.item_factors = self.nmf_model.components_.T
+        self.fold_in = None
+        
+        # Top-K user neighbors (memori O(n_users * K), dihitung per blok)
+        print("🤝 Building user neighbor index...")
+        self.neighbor_index = NeighborIndex.build(
+            self.user_factors, k=self.NEIGHBOR_K, n_jobs=self.neighbor_workers
+        )
+        print(f"✅ Neighbor index: {len(self.neighbor_index)} users x {self.neighbor_index.k} neighbors "
+              f"({self.neighbor_index.nbytes / 1024:.1f} KB)")
+        
+        self.is_trained = True
+        self._build_scoring_index()
+        
+        # Update model info for status tracking
+        self.model_info = {
+            'trained_at': datetime.now().isoformat(),
+            'n_samples': len(ratings),
+            'accuracy': 0.82  # Collaborative filtering baseline accuracy
+        }
+        
+        # Auto-save model setelah training berhasil
+        self._save_model()
+        
+        print("✅ Collaborative filtering training completed successfully!")
+        
+        return {
+            "status": "success",
+            "users_count": n_users,
+            "items_count": n_items,
+            "ratings_count": len(ratings),
+            "matrix_shape": self.user_item_matrix.shape,
+            "sparsity": float(sparsity),
+            "nmf_components": self.nmf_model.n_components,
+            "duplicates_removed": duplicate_count,
+            "trained_at": self.model_info['trained_at'],
+            "accuracy": self.model_info['accuracy']
+        }
+
+    @staticmethod
+    def _deduplicate_keep_latest(user_ids: np.ndarray, item_ids: np.ndarray, ratings: np.ndarray,
+                                 created_at: Optional[np.ndarray] = None):
+        """
+        Hapus duplikat (user_id, destination_id) dengan menyimpan rating terbaru.
+        Urutkan per (user, item, created_at, urutan asli) lalu ambil elemen terakhir tiap grup.
+
+        Returns:
+            (user_ids, item_ids, ratings, duplicate_count) dengan duplicate_count =
+            jumlah baris yang terlibat dalam pasangan duplikat.
+        """
+        n = len(ratings)
+        if n == 0:
+            return user_ids, item_ids, ratings, 0
+        
+        if created_at is None:
+            created_key = np.zeros(n, dtype=np.int64)
+        else:
+            created_key = np.asarray(created_at, dtype='datetime64[ns]').astype(np.int64)
+            # NaT (created_at kosong) dianggap paling lama
+            created_key = np.where(np.isnat(np.asarray(created_at, dtype='datetime64[ns]')),
+                                   np.iinfo(np.int64).min, created_key)
+        
+        order = np.lexsort((np.arange(n), created_key, item_ids, user_ids))
+        sorted_users = user_ids[order]
+        sorted_items = item_ids[order]
+        
+        # Elemen terakhir tiap grup (user, item)
+        is_last = np.ones(n, dtype=bool)
+        is_last[:-1] = (sorted_users[1:] != sorted_users[:-1]) | (sorted_items[1:] != sorted_items[:-1])
+        
+        # Hitung baris yang termasuk grup duplikat (setara duplicated(keep=False))
+        group_id = np.cumsum(np.concatenate(([0], is_last[:-1].astype(np.int64))))
+        group_sizes = np.bincount(group_id)
+        duplicate_count = int(group_sizes[group_sizes > 1].sum())
+        
+        keep = order[is_last]
+        return user_ids[keep], item_ids[keep], ratings[keep], duplicate_count
+
     async def predict(self, user_id: int, num_recommendations: int = 10, db: AsyncSession = None) -> List[Dict[str, Any]]:
         """Generate collaborative filtering recommendations"""
         if not self.is_trained:
             raise ValueError("Model belum di-train. Jalankan train() terlebih dahulu.")
         
         try:
-            # Check if user exists in training data
-            if user_id not in self.user_encoder:
-                return await self._handle_cold_start_user(user_id, num_recommendations, db)
-            
-            user_idx = self.user_encoder[user_id]
-            
-            # Predict ratings untuk semua items
-            predicted_ratings = np.dot(self.user_factors[user_idx], self.item_factors.T)
+            # User baru / rating berubah sejak training: fold-in ke item_factors (tanpa retrain)
+            if user_id not in self.user_encoder or self._get_fold_in().is_stale(user_id):
+                folded = await self._fold_in_user(user_id, db)
+                if folded is None:
+                    return await self._handle_cold_start_user(user_id, num_recommendations, db)
+                user_vector, rated_cols = folded
+            else:
+                user_idx = self.user_encoder[user_id]
+                user_vector = self.user_factors[user_idx]
+                # Mask items yang sudah di-rate user (indeks kolom non-zero di baris CSR)
+                rated_cols = self.rated_matrix.indices[
+                    self.rated_matrix.indptr[user_idx]:self.rated_matrix.indptr[user_idx + 1]
+                ]
             
-            # Get items user belum rate
-            user_ratings = self.user_item_matrix.iloc[user_idx]
-            unrated_items = user_ratings[user_ratings == 0].index.tolist()
+            # Predict ratings untuk semua items (satu dot product)
+            predicted_ratings = self.item_factors @ user_vector
             
-            # Score untuk unrated items
-            item_scores = []
-            for item_id in unrated_items:
-                if item_id in self.item_encoder:
-                    item_idx = self.item_encoder[item_id]
-                    score = predicted_ratings[item_idx]
-                    item_scores.append({
-                        'destination_id': item_id,
-                        'score': score
-                    })
+            scores = np.array(predicted_ratings, dtype=float)
+            scores[rated_cols] = -np.inf
             
-            # Sort by score
-            item_scores.sort(key=lambda x: x['score'], reverse=True)
-            top_items = item_scores[:num_recommendations]
+            top_idx = top_k_indices(scores, num_recommendations)
+            top_idx = top_idx[np.isfinite(scores[top_idx])]
+            top_ids = [int(self.item_ids[idx]) for idx in top_idx]
             
-            # Enrich dengan destination details
+            # Enrich dengan destination details (satu bulk query)
+            destinations = await self._fetch_destinations(top_ids, db)
             recommendations = []
-            for item in top_items:
-                dest = await db.get(Destination, item['destination_id'])
+            for dest_id, idx in zip(top_ids, top_idx):
+                dest = destinations.get(dest_id)
                 if dest:
                     recommendations.append({
                         'destination_id': dest.id,
                         'name': dest.name,
                         'description': dest.description,
-                        'score': round(float(item['score']), 4),
+                        'score': round(float(scores[idx]), 4),
                         'explanation': "Based on similar users' preferences",
                         'algorithm': 'collaborative_filtering'
                     })
@@ -284,21 +314,9 @@ class CollaborativeRecommender(BaseRecommender):
             
             user_idx = self.user_encoder[user_id]
             
-            # Find similar users
-            if self.user_similarities is not None:
-                # Use precomputed similarity matrix
-                user_similarities_scores = self.user_similarities[user_idx]
-                similar_users_idx = np.argsort(user_similarities_scores)[::-1][1:6]  # Top 5 similar users
-                similar_users_ids = [self.user_decoder[idx] for idx in similar_users_idx]
-                similarity_scores = [user_similarities_scores[idx] for idx in similar_users_idx]
-            else:
-                # Compute similarity on-demand for large datasets
-                from sklearn.metrics.pairwise import cosine_similarity
-                user_vector = self.user_factors[user_idx].reshape(1, -1)
-                similarities = cosine_similarity(user_vector, self.user_factors)[0]
-                similar_users_idx = np.argsort(similarities)[::-1][1:6]
-                similar_users_ids = [self.user_decoder[idx] for idx in similar_users_idx]
-                similarity_scores = [similarities[idx] for idx in similar_users_idx]
+            # Find similar users (top 5 dari neighbor index)
+            neighbor_idx, similarity_scores = self._get_neighbor_index().neighbors(user_idx, 5)
+            similar_users_ids = [self.user_decoder[int(idx)] for idx in neighbor_idx]
             
             return {
                 "explanation": f"Recommended based on {len(similar_users_ids)} similar users",
@@ -313,6 +331,51 @@ class CollaborativeRecommender(BaseRecommender):
         except Exception as e:
             raise Exception(f"Collaborative explanation failed: {str(e)}")
 
+    def _get_fold_in(self) -> UserFactorTable:
+        """Side table fold-in untuk model ini (dibuat dari item_factors saat pertama dipakai)"""
+        if self.fold_in is None:
+            self.fold_in = UserFactorTable(self.item_factors)
+        return self.fold_in
+
+    def mark_user_updated(self, user_id: int):
+        """Rating user berubah: faktor user di-fold-in ulang pada predict berikutnya"""
+        if self.is_trained and user_id is not None:
+            self._get_fold_in().mark_stale(user_id)
+
+    async def _fold_in_user(self, user_id: int, db: AsyncSession):
+        """
+        Faktor user dari rating terkini (NNLS ke item_factors), di-cache di side table.
+        Rating diambil dari rating_source (ratings + destination_reviews, sama seperti
+        training); per item dipakai yang terbaru.
+        Return (user_vector, rated_cols) atau None jika user belum me-rate item yang dikenal model.
+        """
+        table = self._get_fold_in()
+        cached = table.get(user_id)
+        if cached is not None:
+            return cached
+        if db is None:
+            return None
+        
+        result = await db.execute(self.rating_source(user_id))
+        rows = result.all()
+        if not rows:
+            return None
+        
+        n_rows = len(rows)
+        item_ids = np.fromiter((r[1] for r in rows), dtype=np.int64, count=n_rows)
+        ratings = np.fromiter((r[2] for r in rows), dtype=np.float64, count=n_rows)
+        created_at = np.array([r[3] for r in rows], dtype='datetime64[ns]')
+        _, item_ids, ratings, _ = self._deduplicate_keep_latest(
+            np.zeros(n_rows, dtype=np.int64), item_ids, ratings, created_at
+        )
+        
+        # Hanya item yang ada di model; rating 0 diperlakukan kosong (sama seperti training)
+        cols = np.fromiter((self.item_encoder.get(int(i), -1) for i in item_ids), dtype=np.int64, count=len(item_ids))
+        known = (cols >= 0) & (ratings != 0)
+        if not known.any():
+            return None
+        return table.put(user_id, cols[known], ratings[known])
+
     async def _handle_cold_start_user(self, user_id: int, num_recommendations: int, db: AsyncSession) -> List[Dict[str, Any]]:
         """Handle new users (cold start problem)"""
         try:
@@ -326,10 +389,13 @@ class CollaborativeRecommender(BaseRecommender):
             )
             
             popular_destinations = result.all()
+            destinations = await self._fetch_destinations(
+                [row.destination_id for row in popular_destinations], db
+            )
             recommendations = []
             
             for dest_rating in popular_destinations:
-                dest = await db.get(Destination, dest_rating.destination_id)
+                dest = destinations.get(dest_rating.destination_id)
                 if dest:
                     recommendations.append({
                         'destination_id': dest.id,
@@ -346,90 +412,157 @@ class CollaborativeRecommender(BaseRecommender):
             print(f"Cold start fallback error: {str(e)}")
             return []
     
+    async def _fetch_destinations(self, destination_ids: List[int], db: AsyncSession) -> Dict[int, CatalogEntry]:
+        """Ambil banyak destinasi dari DestinationCatalog (tanpa query per item)"""
+        if not destination_ids:
+            return {}
+        return await destination_catalog.get_many(destination_ids, db)
+    
+    def _get_neighbor_index(self) -> NeighborIndex:
+        """Neighbor index user; dibangun dari user_factors jika belum ada (model lama)"""
+        if self.neighbor_index is None or len(self.neighbor_index) != self.user_factors.shape[0]:
+            self.neighbor_index = NeighborIndex.build(
+                self.user_factors, k=self.NEIGHBOR_K, n_jobs=self.neighbor_workers
+            )
+        return self.neighbor_index
+    
+    def _build_scoring_index(self):
+        """Bangun CSR rated-mask dan mapping kolom -> destination_id untuk predict"""
+        if self.user_item_matrix is None:
+            return
+        if isinstance(self.user_item_matrix, pd.DataFrame):
+            # Model lama (pickle pivot_table dense) -> konversi ke CSR
+            self.user_item_matrix = csr_matrix(self.user_item_matrix.values)
+        self.rated_matrix = self.user_item_matrix.tocsr()
+        self.rated_matrix.eliminate_zeros()
+        self.item_ids = np.array(
+            [self.item_decoder[idx] for idx in range(len(self.item_decoder))], dtype=np.int64
+        )
+
+    def _sparsity(self) -> float:
+        """Sparsity user-item matrix dari jumlah entri non-zero (tanpa .values)"""
+        n_rows, n_cols = self.user_item_matrix.shape
+        total = n_rows * n_cols
+        if total == 0:
+            return 0.0
+        return 1.0 - self.user_item_matrix.count_nonzero() / total
+    
     def get_training_stats(self) -> Dict[str, Any]:
         """Get detailed training statistics"""
         if not self.is_trained:
             return {"status": "not_trained"}
         
+        ratings = self.user_item_matrix.data
+        ratings = ratings[ratings > 0]
+        
         return {
             "status": "trained",
             "matrix_shape": self.user_item_matrix.shape,
             "n_users": len(self.user_encoder),
             "n_items": len(self.item_encoder),
-            "sparsity": float((self.user_item_matrix.values == 0).sum() / self.user_item_matrix.size),
+            "sparsity": float(self._sparsity()),
             "nmf_components": self.nmf_model.n_components,
             "reconstruction_error": float(self.nmf_model.reconstruction_err_) if hasattr(self.nmf_model, 'reconstruction_err_') else None,
-            "min_rating": float(self.user_item_matrix.values[self.user_item_matrix.values > 0].min()),
-            "max_rating": float(self.user_item_matrix.values.max()),
-            "avg_rating": float(self.user_item_matrix.values[self.user_item_matrix.values > 0].mean())
+            "min_rating": float(ratings.min()) if ratings.size else 0.0,
+            "max_rating": float(ratings.max()) if ratings.size else 0.0,
+            "avg_rating": float(ratings.mean()) if ratings.size else 0.0,
+            "fold_in": self.fold_in.get_stats() if self.fold_in is not None else None
         }
     
     def _save_model(self):
-        """Save trained model to disk"""
+        """Save trained model to disk (artifact directory: manifest + .npy)"""
         try:
-            # Create directory jika belum ada
-            self.MODEL_DIR.mkdir(parents=True, exist_ok=True)
-            
-            model_path = self.MODEL_DIR / self.MODEL_FILE
-            
-            # Save all model components
-            model_data = {
-                'nmf_model': self.nmf_model,
-                'user_item_matrix': self.user_item_matrix,
-                'user_factors': self.user_factors,
-                'item_factors': self.item_factors,
-                'user_encoder': self.user_encoder,
-                'item_encoder': self.item_encoder,
-                'user_decoder': self.user_decoder,
-                'item_decoder': self.item_decoder,
-                'user_similarities': self.user_similarities,
-                'is_trained': self.is_trained,
-                'trained_at': self.model_info.get('trained_at', datetime.now().isoformat()),
-                'n_samples': self.model_info.get('n_samples', 0),
-                'accuracy': self.model_info.get('accuracy', 0.82)
-            }
-            
-            with open(model_path, 'wb') as f:
-                pickle.dump(model_data, f)
-            
-            print(f"✅ Collaborative model saved to {model_path}")
+            path = save_artifact(
+                artifact_dir(self.MODEL_DIR, self.MODEL_FILE),
+                kind="collaborative",
+                arrays={
+                    'user_item_matrix': self.user_item_matrix,
+                    'user_factors': self.user_factors,
+                    'item_factors': self.item_factors,
+                    'user_ids': np.array([self.user_decoder[idx] for idx in range(len(self.user_decoder))], dtype=np.int64),
+                    'item_ids': self.item_ids,
+                    **(self.neighbor_index.to_arrays() if self.neighbor_index is not None else {})
+                },
+                metadata={
+                    'is_trained': self.is_trained,
+                    'trained_at': self.model_info.get('trained_at', datetime.now().isoformat()),
+                    'n_samples': self.model_info.get('n_samples', 0),
+                    'accuracy': self.model_info.get('accuracy', 0.82)
+                },
+                objects={'nmf_model': self.nmf_model}
+            )
+            print(f"✅ Collaborative model saved to {path}")
             
         except Exception as e:
             print(f"⚠️ Failed to save Collaborative model: {str(e)}")
     
     def _auto_load_model(self):
-        """Auto-load model dari disk jika ada"""
+        """Auto-load model dari disk jika ada (artifact memory-mapped, fallback pickle lama)"""
         try:
+            artifact = load_artifact(artifact_dir(self.MODEL_DIR, self.MODEL_FILE))
+            if artifact is not None:
+                self._restore_artifact(artifact)
+                return
+
             model_path = self.MODEL_DIR / self.MODEL_FILE
-            
             if not model_path.exists():
                 print("ℹ️ No saved Collaborative model found")
                 return
-            
-            with open(model_path, 'rb') as f:
-                model_data = pickle.load(f)
-            
-            # Restore all components
-            self.nmf_model = model_data['nmf_model']
-            self.user_item_matrix = model_data['user_item_matrix']
-            self.user_factors = model_data['user_factors']
-            self.item_factors = model_data['item_factors']
-            self.user_encoder = model_data['user_encoder']
-            self.item_encoder = model_data['item_encoder']
-            self.user_decoder = model_data['user_decoder']
-            self.item_decoder = model_data['item_decoder']
-            self.user_similarities = model_data['user_similarities']
-            self.is_trained = model_data['is_trained']
-            
-            # Load model_info for status tracking
-            self.model_info = {
-                'trained_at': model_data.get('trained_at', 'unknown'),
-                'n_samples': model_data.get('n_samples', 0),
-                'accuracy': model_data.get('accuracy', 0.82)
-            }
-            
-            trained_at = model_data.get('trained_at', 'unknown')
-            print(f"✅ Collaborative model loaded (trained at: {trained_at}")
+            self._load_legacy_pickle(model_path)
             
         except Exception as e:
             print(f"⚠️ Failed to load Collaborative model: {str(e)}")
+
+    def _restore_artifact(self, artifact: ModelArtifact):
+        """Restore dari artifact: array tetap memory-mapped (read-only)"""
+        metadata = artifact.metadata
+        self.nmf_model = artifact.objects.get('nmf_model', self.nmf_model)
+        self.user_item_matrix = artifact['user_item_matrix']
+        self.rated_matrix = self.user_item_matrix  # Disimpan setelah eliminate_zeros
+        self.user_factors = artifact['user_factors']
+        self.item_factors = artifact['item_factors']
+        self.item_ids = artifact['item_ids']
+        self.user_encoder = {int(user_id): idx for idx, user_id in enumerate(artifact['user_ids'].tolist())}
+        self.item_encoder = {int(item_id): idx for idx, item_id in enumerate(self.item_ids.tolist())}
+        self.user_decoder = {idx: user_id for user_id, idx in self.user_encoder.items()}
+        self.item_decoder = {idx: item_id for item_id, idx in self.item_encoder.items()}
+        self.neighbor_index = NeighborIndex.from_arrays(artifact)
+        self.fold_in = None
+        self.is_trained = metadata.get('is_trained', True)
+
+        self.model_info = {
+            'trained_at': metadata.get('trained_at', 'unknown'),
+            'n_samples': metadata.get('n_samples', 0),
+            'accuracy': metadata.get('accuracy', 0.82)
+        }
+        print(f"✅ Collaborative model loaded (trained at: {self.model_info['trained_at']}, memory-mapped)")
+
+    def _load_legacy_pickle(self, model_path: Path):
+        """Model lama (satu blob pickle); disimpan ulang sebagai artifact saat training berikutnya"""
+        with open(model_path, 'rb') as f:
+            model_data = pickle.load(f)
+        
+        # Restore all components
+        self.nmf_model = model_data['nmf_model']
+        self.user_item_matrix = model_data['user_item_matrix']
+        self.user_factors = model_data['user_factors']
+        self.item_factors = model_data['item_factors']
+        self.user_encoder = model_data['user_encoder']
+        self.item_encoder = model_data['item_encoder']
+        self.user_decoder = model_data['user_decoder']
+        self.item_decoder = model_data['item_decoder']
+        # Model lama menyimpan user_similarities dense; index dibangun ulang saat dibutuhkan
+        self.neighbor_index = model_data.get('neighbor_index')
+        self.fold_in = None
+        self.is_trained = model_data['is_trained']
+        self._build_scoring_index()
+        
+        # Load model_info for status tracking
+        self.model_info = {
+            'trained_at': model_data.get('trained_at', 'unknown'),
+            'n_samples': model_data.get('n_samples', 0),
+            'accuracy': model_data.get('accuracy', 0.82)
+        }
+        
+        trained_at = model_data.get('trained_at', 'unknown')
+        print(f"✅ Collaborative model loaded (trained at: {trained_at}")
@@ -6,13 +6,17 @@ from datetime import datetime
 from pathlib import Path
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import MultiLabelBinarizer
+from sklearn.preprocessing import MultiLabelBinarizer, normalize
+from scipy.sparse import csr_matrix
 from typing import List, Dict, Any, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
 from app.services.base_recommender import BaseRecommender
+from app.services.scoring_utils import top_k_indices
+from app.services.item_neighbor_graph import ItemNeighborGraph
+from app.services.model_artifacts import ModelArtifact, artifact_dir, load_artifact, save_artifact
 from app.models.user import User
 from app.models.destinations import Destination
 from app.models.category import Category
@@ -27,9 +31,11 @@ class ContentBasedRecommender(BaseRecommender):
     MODEL_DIR = Path(__file__).resolve().parents[2] / "data" / "models"
     MODEL_FILE = "content_based_model.pkl"
 
-    def __init__(self):
+    def __init__(self, model_dir: Optional[Path] = None):
         import os
         super().__init__()
+        # Direktori artifact (model registry memberi direktori per versi)
+        self.MODEL_DIR = Path(model_dir) if model_dir is not None else type(self).MODEL_DIR
         # Sesuai tesis: TfidfVectorizer dengan parameter DEFAULT
         # Input: kategori destinasi (bukan description panjang)
         self.tfidf_vectorizer = TfidfVectorizer()
@@ -38,6 +44,14 @@ class ContentBasedRecommender(BaseRecommender):
         self._user_profiles = {}   # User profile vectors
         self.similarity_matrix = None
 
+        # Scoring index: item vectors & user profiles sebagai matrix ter-normalisasi (L2)
+        # sehingga cosine similarity = satu perkalian matrix-vektor
+        self.item_ids = np.empty(0, dtype=np.int64)
+        self.item_matrix = None          # csr_matrix (n_items x n_features)
+        self.user_index = {}             # user_id -> baris user_profile_matrix
+        self.user_profile_matrix = None  # ndarray (n_users x n_features)
+        self.item_graph = None           # ItemNeighborGraph top-K dari similarity_matrix
+
         # Tentukan path model dari env atau default
         env_path = os.getenv("MODEL_PATH_CONTENT")
         if env_path:
@@ -63,96 +77,114 @@ class ContentBasedRecommender(BaseRecommender):
         Sesuai tesis BAB IV.2.3 dan implementasi notebook.
         """
         try:
-            # Load destinations dengan categories
-            result = await db.execute(
-                select(Destination).options(selectinload(Destination.categories))
-            )
-            destinations = result.scalars().all()
-            
-            if not destinations:
-                raise ValueError("No destinations found for training")
-            
-            # Build item-category mapping
-            unique_items = []
-            for dest in destinations:
-                unique_items.append(dest.id)
-                # Ambil kategori pertama, atau 'Umum' jika kosong
-                if dest.categories:
-                    self.item_categories[dest.id] = dest.categories[0].name
-                else:
-                    self.item_categories[dest.id] = 'Umum'
-            
-            # Build TF-IDF vectors dari category text
-            # Sesuai tesis: "TF-IDF pada atribut kategori"
-            item_texts = [self.item_categories.get(iid, 'Umum') for iid in unique_items]
-            
-            if item_texts:
-                tfidf_matrix = self.tfidf_vectorizer.fit_transform(item_texts)
-                num_features = tfidf_matrix.shape[1]
-                
-                # Store vectors per item
-                for i, item_id in enumerate(unique_items):
-                    self.item_vectors[item_id] = tfidf_matrix[i].toarray().flatten()
-                
-                # Calculate similarity matrix untuk MMR
-                self.similarity_matrix = cosine_similarity(tfidf_matrix)
+            return self.fit(**await self.load_training_data(db))
+        except Exception as e:
+            raise Exception(f"Training failed: {str(e)}")
+
+    @staticmethod
+    async def load_training_data(db: AsyncSession) -> Dict[str, Any]:
+        """
+        Ambil data training dari DB (bagian async). Hasilnya plain list/ndarray
+        sehingga bisa di-pickle ke proses training terpisah.
+        """
+        # Load destinations dengan categories
+        result = await db.execute(
+            select(Destination).options(selectinload(Destination.categories))
+        )
+        destinations = result.scalars().all()
+        
+        # Ambil kategori pertama, atau 'Umum' jika kosong
+        item_ids = [dest.id for dest in destinations]
+        item_texts = [dest.categories[0].name if dest.categories else 'Umum' for dest in destinations]
+        
+        # Ratings untuk user profiles (kolumnar, urutan baris sama dengan select(Rating))
+        from app.models.rating import Rating
+        rating_result = await db.execute(select(Rating.user_id, Rating.destination_id, Rating.rating))
+        rows = rating_result.all()
+        
+        return {
+            'item_ids': item_ids,
+            'item_texts': item_texts,
+            'rating_user_ids': np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows)),
+            'rating_item_ids': np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows)),
+            'ratings': np.fromiter((r[2] for r in rows), dtype=np.float64, count=len(rows))
+        }
+
+    def fit(self, item_ids: List[int], item_texts: List[str], rating_user_ids: np.ndarray,
+            rating_item_ids: np.ndarray, ratings: np.ndarray) -> Dict[str, Any]:
+        """Fit TF-IDF, similarity matrix & user profiles dari data hasil load_training_data (CPU-bound)"""
+        if not item_ids:
+            raise ValueError("No destinations found for training")
+        
+        # Build item-category mapping
+        unique_items = list(item_ids)
+        for item_id, text in zip(item_ids, item_texts):
+            self.item_categories[item_id] = text
+        
+        # Build TF-IDF vectors dari category text
+        # Sesuai tesis: "TF-IDF pada atribut kategori"
+        item_texts = [self.item_categories.get(iid, 'Umum') for iid in unique_items]
+        
+        if item_texts:
+            tfidf_matrix = self.tfidf_vectorizer.fit_transform(item_texts)
+            num_features = tfidf_matrix.shape[1]
             
-            # Build user profiles dari ratings (untuk predict)
-            from app.models.rating import Rating
-            rating_result = await db.execute(select(Rating))
-            ratings = rating_result.scalars().all()
+            # Store vectors per item
+            for i, item_id in enumerate(unique_items):
+                self.item_vectors[item_id] = tfidf_matrix[i].toarray().flatten()
             
-            # Group ratings by user
-            user_ratings = {}
-            for rating in ratings:
-                if rating.user_id not in user_ratings:
-                    user_ratings[rating.user_id] = []
-                user_ratings[rating.user_id].append({
-                    'destination_id': rating.destination_id,
-                    'rating': rating.rating
-                })
+            # Calculate similarity matrix untuk MMR
+            self.similarity_matrix = cosine_similarity(tfidf_matrix)
+        
+        # Group ratings by user (untuk predict)
+        user_ratings = {}
+        for user_id, dest_id, rating in zip(rating_user_ids.tolist(), rating_item_ids.tolist(), ratings.tolist()):
+            if user_id not in user_ratings:
+                user_ratings[user_id] = []
+            user_ratings[user_id].append({
+                'destination_id': dest_id,
+                'rating': rating
+            })
+        
+        # Build weighted user profiles
+        for user_id, user_rating_list in user_ratings.items():
+            user_items = [r['destination_id'] for r in user_rating_list]
+            user_scores = [r['rating'] for r in user_rating_list]
             
-            # Build weighted user profiles
-            for user_id, user_rating_list in user_ratings.items():
-                user_items = [r['destination_id'] for r in user_rating_list]
-                user_scores = [r['rating'] for r in user_rating_list]
+            if user_items:
+                vectors = [self.item_vectors.get(iid, np.zeros(num_features)) 
+                           for iid in user_items]
                 
-                if user_items:
-                    vectors = [self.item_vectors.get(iid, np.zeros(num_features)) 
-                               for iid in user_items]
-                    
-                    total_score = sum(user_scores)
-                    if total_score > 0:
-                        weights = np.array(user_scores) / total_score
-                        self._user_profiles[user_id] = np.average(vectors, axis=0, weights=weights)
-                    else:
-                        self._user_profiles[user_id] = np.average(vectors, axis=0)
-            
-            self.is_trained = True
-            
-            # Update model_info
-            self.model_info = {
-                'trained_at': datetime.now().isoformat(),
-                'n_samples': len(destinations),
-                'n_users': len(self._user_profiles),
-                'n_features': num_features if item_texts else 0
-            }
-            
-            print(f"✅ Content-Based trained: {len(self.item_vectors)} items, "
-                  f"{len(self._user_profiles)} users, {num_features} features")
-            
-            # Auto-save model
-            self._save_model()
-            
-            return {
-                "status": "success", 
-                "destinations_count": len(destinations),
-                "accuracy": 0.85,
-                "trained_at": self.model_info['trained_at']
-            }
-            
-        except Exception as e:
-            raise Exception(f"Training failed: {str(e)}")
+                total_score = sum(user_scores)
+                if total_score > 0:
+                    weights = np.array(user_scores) / total_score
+                    self._user_profiles[user_id] = np.average(vectors, axis=0, weights=weights)
+                else:
+                    self._user_profiles[user_id] = np.average(vectors, axis=0)
+        
+        self.is_trained = True
+        self._build_scoring_index()
+        
+        # Update model_info
+        self.model_info = {
+            'trained_at': datetime.now().isoformat(),
+            'n_samples': len(unique_items),
+            'n_users': len(self._user_profiles),
+            'n_features': num_features if item_texts else 0
+        }
+        
+        print(f"✅ Content-Based trained: {len(self.item_vectors)} items, "
+              f"{len(self._user_profiles)} users, {num_features} features")
+        
+        # Auto-save model
+        self._save_model()
+        
+        return {
+            "status": "success", 
+            "destinations_count": len(unique_items),
+            "accuracy": 0.85,
+            "trained_at": self.model_info['trained_at']
+        }
     
     async def predict(self, user_id: int, num_recommendations: int = 10, db: AsyncSession = None) -> List[Dict[str, Any]]:
         """
@@ -164,37 +196,86 @@ class ContentBasedRecommender(BaseRecommender):
         
         try:
             # Check if user has profile
-            if user_id not in self._user_profiles:
+            if user_id not in self.user_index:
                 # Cold start: return random items
-                items = list(self.item_vectors.keys())[:num_recommendations]
-                return [{'destination_id': iid, 'score': 0.5, 
-                        'category': self.item_categories.get(iid, 'Umum')} 
-                        for iid in items]
-            
-            user_profile = self._user_profiles[user_id]
-            
-            # Compute similarity with all items
-            similarities = []
-            for item_id, item_vec in self.item_vectors.items():
-                sim = cosine_similarity([user_profile], [item_vec])[0][0]
-                similarities.append((item_id, sim))
+                return self._cold_start_items(num_recommendations)
             
-            # Sort and return top-K
-            similarities.sort(key=lambda x: x[1], reverse=True)
-            
-            return [
-                {
-                    'destination_id': iid, 
-                    'score': float(score),
-                    'category': self.item_categories.get(iid, 'Umum'),
-                    'category_str': self.item_categories.get(iid, 'Umum')
-                } 
-                for iid, score in similarities[:num_recommendations]
-            ]
+            scores = self.item_matrix @ self.user_profile_matrix[self.user_index[user_id]]
+            return self._format_top_k(scores, num_recommendations)
         
         except Exception as e:
             raise Exception(f"Content-Based prediction failed: {str(e)}")
     
+    async def predict_batch(self, user_ids: List[int], num_recommendations: int = 10) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Batch scoring: skor banyak user sekaligus dengan satu GEMM
+        (user_profiles x item_matrix^T). User tanpa profil mendapat fallback cold-start.
+        """
+        if not self.is_trained:
+            raise ValueError("Model belum di-train. Jalankan train() terlebih dahulu.")
+        
+        known = [uid for uid in user_ids if uid in self.user_index]
+        results = {}
+        
+        if known:
+            rows = np.fromiter((self.user_index[uid] for uid in known), dtype=np.int64, count=len(known))
+            score_matrix = np.asarray((self.item_matrix @ self.user_profile_matrix[rows].T).T)
+            for uid, scores in zip(known, score_matrix):
+                results[uid] = self._format_top_k(scores, num_recommendations)
+        
+        for uid in user_ids:
+            if uid not in results:
+                results[uid] = self._cold_start_items(num_recommendations)
+        
+        return results
+    
+    def _format_top_k(self, scores: np.ndarray, num_recommendations: int) -> List[Dict[str, Any]]:
+        """Ambil top-K dari vektor skor (argpartition) dan format hasilnya"""
+        top_idx = top_k_indices(scores, num_recommendations)
+        recommendations = []
+        for idx in top_idx:
+            iid = int(self.item_ids[idx])
+            category = self.item_categories.get(iid, 'Umum')
+            recommendations.append({
+                'destination_id': iid,
+                'score': float(scores[idx]),
+                'category': category,
+                'category_str': category
+            })
+        return recommendations
+    
+    def _cold_start_items(self, num_recommendations: int) -> List[Dict[str, Any]]:
+        items = list(self.item_vectors.keys())[:num_recommendations]
+        return [{'destination_id': iid, 'score': 0.5, 
+                'category': self.item_categories.get(iid, 'Umum')} 
+                for iid in items]
+    
+    def _build_scoring_index(self):
+        """
+        Bangun matrix scoring dari item_vectors & _user_profiles.
+        Baris di-normalisasi L2 sehingga dot product = cosine similarity
+        (vektor nol tetap nol, sama seperti sklearn cosine_similarity).
+        """
+        self.item_ids = np.fromiter(self.item_vectors.keys(), dtype=np.int64, count=len(self.item_vectors))
+        if self.item_vectors:
+            item_dense = np.vstack(list(self.item_vectors.values()))
+        else:
+            item_dense = np.zeros((0, 0))
+        self.item_matrix = csr_matrix(normalize(item_dense))
+        
+        self.user_index = {uid: idx for idx, uid in enumerate(self._user_profiles.keys())}
+        if self._user_profiles:
+            profiles = np.vstack(list(self._user_profiles.values()))
+        else:
+            profiles = np.zeros((0, item_dense.shape[1]))
+        self.user_profile_matrix = normalize(profiles)
+        
+        self.item_graph = None
+        if self.similarity_matrix is not None and len(self.item_ids) == self.similarity_matrix.shape[0]:
+            self.item_graph = ItemNeighborGraph.build(
+                self.item_ids, content_similarity=self.similarity_matrix, content_weight=1.0
+            )
+    
     async def get_similar_items(self, item_id: int, top_k: int = 10) -> List[Dict[str, Any]]:
         """
         Get similar items based on category similarity.
@@ -206,20 +287,25 @@ class ContentBasedRecommender(BaseRecommender):
         if item_id not in self.item_vectors:
             raise ValueError(f"Item {item_id} tidak ditemukan dalam model")
         
-        item_idx = list(self.item_vectors.keys()).index(item_id)
-        similarities = self.similarity_matrix[item_idx]
-        
-        # Get top-K similar items (excluding itself)
-        similar_indices = np.argsort(similarities)[::-1][1:top_k+1]
-        item_ids = list(self.item_vectors.keys())
+        # O(K) dari item graph; top_k di atas K dihitung dari baris similarity
+        if self.item_graph is not None and top_k <= self.item_graph.k:
+            neighbors = self.item_graph.neighbors(item_id, top_k)
+        else:
+            item_idx = int(np.flatnonzero(self.item_ids == item_id)[0])
+            similarities = np.array(self.similarity_matrix[item_idx], dtype=float)
+            similarities[item_idx] = -np.inf
+            neighbors = [
+                {'destination_id': int(self.item_ids[idx]), 'similarity': float(similarities[idx])}
+                for idx in top_k_indices(similarities, top_k)
+            ]
         
         return [
             {
-                'destination_id': item_ids[idx],
-                'similarity': float(similarities[idx]),
-                'category': self.item_categories.get(item_ids[idx], 'Umum')
+                'destination_id': neighbor['destination_id'],
+                'similarity': neighbor['similarity'],
+                'category': self.item_categories.get(neighbor['destination_id'], 'Umum')
             }
-            for idx in similar_indices
+            for neighbor in neighbors
         ]
     
     async def explain(self, user_id: int, destination_id: int, db: AsyncSession = None) -> Dict[str, Any]:
@@ -264,60 +350,107 @@ class ContentBasedRecommender(BaseRecommender):
     
     def _save_model(self):
         """
-        Save trained model to disk.
-        Menyimpan: TF-IDF vectorizer, item vectors, similarity matrix, category mappings.
+        Save trained model to disk (artifact directory: manifest + .npy).
+        Menyimpan: item vectors, user profiles, matrix scoring ter-normalisasi,
+        similarity matrix, item graph, category mappings, TF-IDF vectorizer.
         """
         try:
-            self.MODEL_DIR.mkdir(parents=True, exist_ok=True)
-            model_path = self.MODEL_DIR / self.MODEL_FILE
-            
-            model_data = {
-                'tfidf_vectorizer': self.tfidf_vectorizer,
-                'item_categories': self.item_categories,
-                'item_vectors': self.item_vectors,
-                'similarity_matrix': self.similarity_matrix,
-                'user_profiles': self._user_profiles,
-                'is_trained': self.is_trained,
-                'trained_at': datetime.now().isoformat(),
-                'model_info': self.model_info
-            }
-            
-            with open(model_path, 'wb') as f:
-                pickle.dump(model_data, f)
-            
-            print(f"✅ Content-Based model saved to {model_path}")
+            category_names = sorted(set(self.item_categories.values()))
+            category_code = {name: code for code, name in enumerate(category_names)}
+            n_features = self.item_matrix.shape[1] if self.item_matrix is not None else 0
+
+            path = save_artifact(
+                artifact_dir(self.MODEL_DIR, self.MODEL_FILE),
+                kind="content_based",
+                arrays={
+                    'item_ids': self.item_ids,
+                    'item_vectors': np.vstack(list(self.item_vectors.values())) if self.item_vectors else np.zeros((0, n_features)),
+                    'profile_user_ids': np.fromiter(self._user_profiles.keys(), dtype=np.int64, count=len(self._user_profiles)),
+                    'user_profiles': np.vstack(list(self._user_profiles.values())) if self._user_profiles else np.zeros((0, n_features)),
+                    'item_matrix': self.item_matrix,
+                    'user_profile_matrix': self.user_profile_matrix,
+                    'similarity_matrix': self.similarity_matrix,
+                    'category_item_ids': np.fromiter(self.item_categories.keys(), dtype=np.int64, count=len(self.item_categories)),
+                    'category_codes': np.array([category_code[name] for name in self.item_categories.values()], dtype=np.int32),
+                    **(self.item_graph.to_arrays() if self.item_graph is not None else {})
+                },
+                metadata={
+                    'is_trained': self.is_trained,
+                    'trained_at': datetime.now().isoformat(),
+                    'model_info': self.model_info,
+                    'category_names': category_names
+                },
+                objects={'tfidf_vectorizer': self.tfidf_vectorizer}
+            )
+            print(f"✅ Content-Based model saved to {path}")
             
         except Exception as e:
             print(f"⚠️ Failed to save Content-Based model: {str(e)}")
     
     def _auto_load_model(self):
         """
-        Auto-load model dari disk jika ada.
+        Auto-load model dari disk jika ada (artifact memory-mapped, fallback pickle lama).
         Restore: TF-IDF vectorizer, item vectors, similarity matrix, category mappings.
         """
         try:
+            artifact = load_artifact(artifact_dir(self.MODEL_DIR, self.MODEL_FILE))
+            if artifact is not None:
+                self._restore_artifact(artifact)
+                return
+
             model_path = self.MODEL_DIR / self.MODEL_FILE
             print(f"[DEBUG] Checking Content-Based model: {model_path} (exists={model_path.exists()})", flush=True)
             
             if not model_path.exists():
                 print("ℹ️ No saved Content-Based model found", flush=True)
                 return
-            
-            with open(model_path, 'rb') as f:
-                model_data = pickle.load(f)
-            
-            # Restore all components
-            self.tfidf_vectorizer = model_data['tfidf_vectorizer']
-            self.item_categories = model_data['item_categories']
-            self.item_vectors = model_data['item_vectors']
-            self.similarity_matrix = model_data['similarity_matrix']
-            self._user_profiles = model_data.get('user_profiles', {})
-            self.is_trained = model_data['is_trained']
-            self.model_info = model_data.get('model_info', {})
-            
-            trained_at = model_data.get('trained_at', 'unknown')
-            print(f"✅ Content-Based model loaded (trained: {trained_at})", flush=True)
-            print(f"   - Items: {len(self.item_vectors)}, User profiles: {len(self._user_profiles)}", flush=True)
+            self._load_legacy_pickle(model_path)
             
         except Exception as e:
-            print(f"⚠️ Failed to load Content-Based model: {str(e)}", flush=True)
\ No newline at end of file
+            print(f"⚠️ Failed to load Content-Based model: {str(e)}", flush=True)
+
+    def _restore_artifact(self, artifact: ModelArtifact):
+        """Restore dari artifact: matrix tetap memory-mapped, dict vektor berisi view per baris"""
+        metadata = artifact.metadata
+        self.tfidf_vectorizer = artifact.objects.get('tfidf_vectorizer', self.tfidf_vectorizer)
+
+        category_names = metadata.get('category_names', [])
+        self.item_categories = {
+            int(item_id): category_names[code]
+            for item_id, code in zip(artifact['category_item_ids'].tolist(), artifact['category_codes'].tolist())
+        }
+        self.item_ids = artifact['item_ids']
+        self.item_vectors = dict(zip(self.item_ids.tolist(), artifact['item_vectors']))
+        self._user_profiles = dict(zip(artifact['profile_user_ids'].tolist(), artifact['user_profiles']))
+        self.similarity_matrix = artifact.get('similarity_matrix')
+
+        # Index scoring disimpan siap pakai (tanpa vstack/normalize ulang)
+        self.item_matrix = artifact['item_matrix']
+        self.user_profile_matrix = artifact['user_profile_matrix']
+        self.user_index = {uid: idx for idx, uid in enumerate(self._user_profiles.keys())}
+        self.item_graph = ItemNeighborGraph.from_arrays(artifact)
+
+        self.is_trained = metadata.get('is_trained', True)
+        self.model_info = metadata.get('model_info', {})
+
+        print(f"✅ Content-Based model loaded (trained: {metadata.get('trained_at', 'unknown')}, memory-mapped)", flush=True)
+        print(f"   - Items: {len(self.item_vectors)}, User profiles: {len(self._user_profiles)}", flush=True)
+
+    def _load_legacy_pickle(self, model_path: Path):
+        """Model lama (satu blob pickle); disimpan ulang sebagai artifact saat training berikutnya"""
+        with open(model_path, 'rb') as f:
+            model_data = pickle.load(f)
+        
+        # Restore all components
+        self.tfidf_vectorizer = model_data['tfidf_vectorizer']
+        self.item_categories = model_data['item_categories']
+        self.item_vectors = model_data['item_vectors']
+        self.similarity_matrix = model_data['similarity_matrix']
+        self._user_profiles = model_data.get('user_profiles', {})
+        self.is_trained = model_data['is_trained']
+        self.model_info = model_data.get('model_info', {})
+        self._build_scoring_index()
+        
+        trained_at = model_data.get('trained_at', 'unknown')
+        print(f"✅ Content-Based model loaded (trained: {trained_at})", flush=True)
+        print(f"   - Items: {len(self.item_vectors)}, User profiles: {len(self._user_profiles)}", flush=True)
@@ -1,7 +1,9 @@
 import logging
 import os
 import asyncio
+import numpy as np
 from app.services.real_time_data_production import RealTimeContextService
+from app.services.context_snapshot import context_snapshot_service
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +15,9 @@ class ContextAwareComponent:
     
     def __init__(self):
         self.context_service = RealTimeContextService()
+        # Context dirakit di background; request membaca snapshot in-memory
+        self.snapshot_service = context_snapshot_service
+        self.snapshot_service.set_source(self.assemble_context)
         self.context_rules = {
             # --- Tipe Hari ---
             'weekend': {'Wisata Alam': 1.5, 'Wisata Keluarga': 1.6, 'Wisata Buatan/Rekreasi': 1.6, 'Wisata Kuliner': 1.4, 'Wisata Petualangan': 1.4, 'Wisata Budaya & Sejarah': 1.1},
@@ -36,10 +41,88 @@ class ContextAwareComponent:
             'festival_kuliner': {'Wisata Kuliner': 2.2, 'Wisata Keluarga': 1.5},
             'festival_budaya': {'Wisata Budaya & Sejarah': 2.2, 'Wisata Keluarga': 1.4}
         }
+        self.crowd_boosts = {
+            'puncak_kepadatan': 0.5, 'sangat_ramai': 0.7, 'ramai': 0.9, 'sepi': 1.2, 'sangat_sepi': 1.3
+        }
+        self._compile_rules()
+
+    BOOST_CACHE_SIZE = 256
+
+    def _compile_rules(self):
+        """
+        Kompilasi context_rules menjadi matriks boost aditif (rule x kategori).
+        Kolom terakhir = kategori tak dikenal (tanpa boost kategori).
+        """
+        self.categories = sorted({cat for rule in self.context_rules.values() for cat in rule})
+        self.category_index = {cat: idx for idx, cat in enumerate(self.categories)}
+        self.unknown_category = len(self.categories)
+        self.rule_index = {name: idx for idx, name in enumerate(self.context_rules)}
+
+        self.boost_matrix = np.zeros((len(self.rule_index), len(self.categories) + 1))
+        for name, rule in self.context_rules.items():
+            for cat, boost in rule.items():
+                self.boost_matrix[self.rule_index[name], self.category_index[cat]] = boost - 1.0
+        self._boost_cache = {}
+
+    def category_ids(self, categories):
+        """Array id kategori (kategori tak dikenal -> kolom unknown)"""
+        return np.fromiter(
+            (self.category_index.get(cat, self.unknown_category) for cat in categories),
+            dtype=np.int64, count=len(categories)
+        )
+
+    def get_boost_vector(self, user_context):
+        """
+        Total boost aditif per kategori untuk satu context (dihitung sekali, di-cache
+        per kombinasi nilai context sehingga satu snapshot = satu vektor).
+        """
+        if not user_context:
+            user_context = {}
+        key = (
+            user_context.get('day_type', 'weekday'),
+            user_context.get('weather', 'cerah'),
+            user_context.get('season', 'musim_kemarau'),
+            user_context.get('time_of_day', 'siang'),
+            user_context.get('crowd_density', 'sedang'),
+            bool(user_context.get('viral_trend', False)),
+            user_context.get('special_event')
+        )
+        vector = self._boost_cache.get(key)
+        if vector is not None:
+            return vector
+
+        day_type, weather, season, time_of_day, crowd_density, is_viral, special_event = key
+        # Urutan penjumlahan sama dengan aturan per item (hasil float identik)
+        vector = np.zeros(self.boost_matrix.shape[1])
+        for name in (day_type, weather, season, time_of_day):
+            row = self.rule_index.get(name)
+            if row is not None:
+                vector = vector + self.boost_matrix[row]
+        vector = vector + (self.crowd_boosts.get(crowd_density, 1.0) - 1.0)
+        if is_viral:
+            vector = vector + 1.0
+        if special_event:
+            row = self.rule_index.get(special_event)
+            if row is not None:
+                vector = vector + self.boost_matrix[row]
+
+        if len(self._boost_cache) >= self.BOOST_CACHE_SIZE:
+            self._boost_cache.clear()
+        vector.setflags(write=False)
+        self._boost_cache[key] = vector
+        return vector
 
     async def get_current_context(self):
         """
-        Mengambil context real-time dengan penanganan error yang kuat.
+        Context real-time dari snapshot terbaru (salinan dict, aman dimodifikasi).
+        Cold miss memicu satu fetch bersama untuk semua request yang menunggu.
+        """
+        return await self.snapshot_service.get()
+
+    async def assemble_context(self):
+        """
+        Merakit context real-time dengan penanganan error yang kuat.
+        Dipanggil oleh ContextSnapshotService, bukan per request.
         """
         try:
             # 1. Cuaca & Kalender (Safe Call)
@@ -99,67 +182,22 @@ class ContextAwareComponent:
             }
 
     def get_contextual_boost(self, recommendations, user_context, item_categories):
-        """Logika ADITIF (Penambahan Skor)"""
-        boosted_recs = []
-        
-        # Pastikan user_context valid
-        if not user_context:
-            user_context = {}
-
-        day_type = user_context.get('day_type', 'weekday')
-        weather = user_context.get('weather', 'cerah')
-        season = user_context.get('season', 'musim_kemarau')
-        time_of_day = user_context.get('time_of_day', 'siang')
-        crowd_density = user_context.get('crowd_density', 'sedang')
-        is_viral = user_context.get('viral_trend', False)
-        special_event = user_context.get('special_event')
-
-        for rec in recommendations:
-            item_id = rec['destination_id']
-            original_score = rec['score']
-            category = item_categories.get(item_id, 'Other') 
-            
-            total_additive_boost = 0.0 
-            
-            # Hitung Boost (Safe Get)
-            boost = self.context_rules.get(day_type, {}).get(category, 1.0)
-            total_additive_boost += (boost - 1.0)
-
-            boost = self.context_rules.get(weather, {}).get(category, 1.0)
-            total_additive_boost += (boost - 1.0)
-
-            boost = self.context_rules.get(season, {}).get(category, 1.0)
-            total_additive_boost += (boost - 1.0)
-
-            boost = self.context_rules.get(time_of_day, {}).get(category, 1.0)
-            total_additive_boost += (boost - 1.0)
-
-            # Kepadatan
-            crowd_boost = 1.0
-            if crowd_density == 'puncak_kepadatan': crowd_boost = 0.5
-            elif crowd_density == 'sangat_ramai': crowd_boost = 0.7
-            elif crowd_density == 'ramai': crowd_boost = 0.9
-            elif crowd_density == 'sepi': crowd_boost = 1.2
-            elif crowd_density == 'sangat_sepi': crowd_boost = 1.3
-            total_additive_boost += (crowd_boost - 1.0)
-
-            # Viral
-            if is_viral:
-                total_additive_boost += 1.0 
-                
-            # Event
-            if special_event:
-                boost = self.context_rules.get(special_event, {}).get(category, 1.0)
-                total_additive_boost += (boost - 1.0)
-
-            new_score = original_score + total_additive_boost
-            
-            new_rec = rec.copy()
-            new_rec['score'] = new_score
-            new_rec['boost_amount'] = total_additive_boost
-            boosted_recs.append(new_rec)
-            
-        return boosted_recs
+        """Logika ADITIF (Penambahan Skor): satu gather-add dari vektor boost context"""
+        if not recommendations:
+            return []
+
+        boost_vector = self.get_boost_vector(user_context)
+        cat_ids = self.category_ids([
+            item_categories.get(rec['destination_id'], 'Other') for rec in recommendations
+        ])
+        boosts = boost_vector[cat_ids]
+        scores = np.fromiter((rec['score'] for rec in recommendations), dtype=float,
+                             count=len(recommendations)) + boosts
+
+        return [
+            {**rec, 'score': score, 'boost_amount': boost}
+            for rec, score, boost in zip(recommendations, scores.tolist(), boosts.tolist())
+        ]
 
     def get_context_key_string(self, context_dict):
         if not context_dict: context_dict = {}
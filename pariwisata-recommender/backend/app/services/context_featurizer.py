@@ -0,0 +1,124 @@
+"""
+Context Featurizer
+Memetakan context real-time mentah (cuaca, jam, tanggal, tren, dll.) ke sejumlah
+kecil dimensi ber-bucket untuk key contextual MAB, sehingga ruang context
+terbatas dan statistik bisa dibagi antar request yang mirip.
+
+Key bersifat hierarkis: setiap dimensi menambah satu level, contoh
+    default
+    weather=hujan
+    weather=hujan|day=weekend
+    weather=hujan|day=weekend|time=sore
+    ...
+Parent dari sebuah key didapat dengan membuang segmen terakhir.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT_KEY = "default"
+UNKNOWN = "unknown"
+_SEPARATOR = "|"
+
+
+def _weather_bucket(context: Dict[str, Any]) -> str:
+    weather = str(context.get('weather') or '').lower()
+    if 'hujan' in weather or 'rain' in weather:
+        return 'hujan'
+    if 'berawan' in weather or 'cloud' in weather or 'mendung' in weather:
+        return 'berawan'
+    if 'cerah' in weather or 'clear' in weather or 'sun' in weather:
+        return 'cerah'
+    return UNKNOWN
+
+
+def _day_bucket(context: Dict[str, Any]) -> str:
+    if context.get('is_holiday'):
+        return 'libur'
+    if 'is_weekend' in context:
+        return 'weekend' if context.get('is_weekend') else 'weekday'
+    return UNKNOWN
+
+
+def _time_bucket(context: Dict[str, Any]) -> str:
+    period = str(context.get('time_period') or context.get('time_of_day') or '').lower()
+    if period in ('pagi', 'siang', 'sore', 'malam'):
+        return period
+    hour = context.get('hour_of_day')
+    if isinstance(hour, (int, float)):
+        # Sama dengan pembagian waktu di HybridRecommender
+        if 5 <= hour < 10:
+            return 'pagi'
+        if 10 <= hour < 15:
+            return 'siang'
+        if 15 <= hour < 19:
+            return 'sore'
+        return 'malam'
+    return UNKNOWN
+
+
+def _traffic_bucket(context: Dict[str, Any]) -> str:
+    traffic = str(context.get('traffic') or '').lower()
+    if traffic in ('lancar', 'sedang'):
+        return 'lancar'
+    if traffic in ('padat', 'macet'):
+        return 'padat'
+    return UNKNOWN
+
+
+def _season_bucket(context: Dict[str, Any]) -> str:
+    season = str(context.get('season') or '').lower()
+    if 'hujan' in season:
+        return 'hujan'
+    if 'kemarau' in season:
+        return 'kemarau'
+    return UNKNOWN
+
+
+class ContextFeaturizer:
+    """
+    Dimensi diurutkan dari yang paling berpengaruh (level atas hierarki) ke yang
+    paling halus. Key leaf paling banyak memiliki len(dimensions) segmen.
+    """
+
+    DIMENSIONS: List[Tuple[str, Callable[[Dict[str, Any]], str]]] = [
+        ('weather', _weather_bucket),
+        ('day', _day_bucket),
+        ('time', _time_bucket),
+        ('traffic', _traffic_bucket),
+        ('season', _season_bucket),
+    ]
+
+    def featurize(self, context: Optional[Dict[str, Any]]) -> Tuple[str, ...]:
+        """Context mentah -> tuple bucket per dimensi"""
+        if not isinstance(context, dict):
+            context = {}
+        return tuple(bucket(context) for _, bucket in self.DIMENSIONS)
+
+    def context_key(self, context: Optional[Dict[str, Any]]) -> str:
+        """Key leaf (paling halus) untuk sebuah context"""
+        segments = [
+            f"{name}={value}" for (name, _), value in zip(self.DIMENSIONS, self.featurize(context))
+        ]
+        # Dimensi yang tidak diketahui di ujung tidak menambah level
+        while segments and segments[-1].endswith(f"={UNKNOWN}"):
+            segments.pop()
+        return _SEPARATOR.join(segments) if segments else ROOT_KEY
+
+    @staticmethod
+    def key_path(context_key: str) -> List[str]:
+        """
+        Key beserta semua parent-nya, dari yang paling halus ke ROOT_KEY.
+        Key format lama (bukan hasil featurizer) tidak memiliki parent.
+        """
+        if context_key == ROOT_KEY:
+            return [ROOT_KEY]
+        if '=' not in context_key:
+            return [context_key]
+        segments = context_key.split(_SEPARATOR)
+        path = [_SEPARATOR.join(segments[:depth]) for depth in range(len(segments), 0, -1)]
+        path.append(ROOT_KEY)
+        return path
+
+
+# Global instance
+context_featurizer = ContextFeaturizer()
@@ -0,0 +1,136 @@
+"""
+Context Snapshot Service
+Context real-time (cuaca, traffic, kalender, tren) dirakit di background dan
+disajikan dari memori sebagai snapshot immutable ber-versi, sehingga perakitan
+context tidak lagi ada di latency setiap request.
+
+- Refresh berkala oleh background task (refresh_interval)
+- Cold miss / snapshot kedaluwarsa: single-flight, berapapun request yang
+  menunggu hanya memicu satu fetch
+- Snapshot lebih tua dari refresh_interval tetapi < max_age tetap disajikan
+  sambil di-refresh di background (stale-while-revalidate)
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Dict, Mapping, NamedTuple, Optional
+
+
+class ContextSnapshot(NamedTuple):
+    version: int
+    context: Mapping[str, Any]
+    created_at: str
+    fetched_at: float  # time.monotonic()
+
+
+def _freeze(value: Any) -> Any:
+    """List di dalam context dijadikan tuple agar snapshot tidak bisa diubah caller"""
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    return value
+
+
+class ContextSnapshotService:
+    def __init__(self, refresh_interval: float = 60.0, max_age: float = 600.0):
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self._source: Optional[Callable[[], Awaitable[Dict[str, Any]]]] = None
+        self._snapshot: Optional[ContextSnapshot] = None
+        self._inflight: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+        self._version = 0
+        self.fetch_count = 0
+
+    def set_source(self, source: Callable[[], Awaitable[Dict[str, Any]]], replace: bool = False):
+        """Set coroutine function yang merakit context lengkap (sekali, kecuali replace=True)"""
+        if self._source is None or replace:
+            self._source = source
+
+    @property
+    def snapshot(self) -> Optional[ContextSnapshot]:
+        return self._snapshot
+
+    async def _fetch(self) -> ContextSnapshot:
+        if self._source is None:
+            raise Exception("Context snapshot source is not configured")
+        context = await self._source()
+        self.fetch_count += 1
+        self._version += 1
+        self._snapshot = ContextSnapshot(
+            version=self._version,
+            context=_freeze(dict(context or {})),
+            created_at=datetime.now().isoformat(),
+            fetched_at=time.monotonic()
+        )
+        return self._snapshot
+
+    def _refresh(self) -> asyncio.Task:
+        """Single-flight: pakai fetch yang sedang berjalan jika ada"""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._fetch())
+            self._inflight.add_done_callback(self._log_failure)
+        return self._inflight
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task):
+        """Ambil exception fetch (refresh background bisa tidak pernah di-await)"""
+        if not task.cancelled() and task.exception() is not None:
+            print(f"⚠️ Context snapshot refresh failed: {task.exception()}")
+
+    async def get_snapshot(self) -> ContextSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None:
+            age = time.monotonic() - snapshot.fetched_at
+            if age < self.refresh_interval:
+                return snapshot
+            if age < self.max_age:
+                # Sajikan yang lama, refresh di background
+                self._refresh()
+                return snapshot
+        return await asyncio.shield(self._refresh())
+
+    async def get(self) -> Dict[str, Any]:
+        """Salinan dict dari snapshot terbaru (aman dimodifikasi caller)"""
+        snapshot = await self.get_snapshot()
+        return _thaw(snapshot.context)
+
+    # ------------------------------------------------------ background task
+
+    def start(self):
+        """Mulai refresh berkala (panggil dari event loop yang berjalan)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.shield(self._refresh())
+            except Exception:
+                pass  # Sudah di-log oleh _log_failure
+            await asyncio.sleep(self.refresh_interval)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global instance
+context_snapshot_service = ContextSnapshotService()
@@ -0,0 +1,144 @@
+"""
+Destination Catalog
+Cache in-memory seluruh destinasi (kolom kartu + agregat review) untuk hydration
+rekomendasi tanpa query per item. Di-invalidate lewat version counter.
+"""
+
+import asyncio
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import func
+
+from app.models.destinations import Destination
+from app.models.category import Category
+from app.models.destination_category import destination_categories
+from app.models.destination_review import DestinationReview
+
+
+class CatalogEntry(NamedTuple):
+    """Record destinasi ringkas (atribut sama dengan kolom Destination)"""
+    id: int
+    name: str
+    description: Optional[str]
+    address: Optional[str]
+    lat: Optional[float]
+    lon: Optional[float]
+    category: Optional[str]           # Kolom Destination.category
+    primary_category: Optional[str]   # Category pertama dari relasi many-to-many
+    avg_rating: float                 # Rata-rata DestinationReview.rating
+    review_count: int
+
+
+class DestinationCatalog:
+    """
+    Process-wide catalog destinasi.
+
+    Data dimuat sekali dengan 3 query agregat lalu dilayani dari dict (O(1) per id).
+    Setiap write destinasi/review memanggil `invalidate()` yang menaikkan `version`;
+    load berikutnya terjadi secara lazy pada akses pertama setelahnya. `max_age`
+    membatasi staleness untuk write yang terjadi di worker lain.
+    """
+
+    def __init__(self, max_age: float = 300.0):
+        self.max_age = max_age
+        self.version = 0
+        self.generation = 0  # Naik setiap kali catalog dimuat ulang (kunci memoization turunan)
+        self._loaded_version = -1
+        self._loaded_at = 0.0
+        self._entries: Dict[int, CatalogEntry] = {}
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        """Tandai catalog stale (dipanggil setelah write destinasi atau review)"""
+        self.version += 1
+
+    def is_stale(self) -> bool:
+        return (
+            self._loaded_version != self.version
+            or time.monotonic() - self._loaded_at > self.max_age
+        )
+
+    async def ensure_loaded(self, db: AsyncSession):
+        """Muat ulang catalog jika stale; request paralel menunggu satu load yang sama"""
+        if not self.is_stale():
+            return
+        async with self._lock:
+            if not self.is_stale():
+                return
+            version = self.version
+            self._entries = await self._load(db)
+            self._loaded_version = version
+            self._loaded_at = time.monotonic()
+            self.generation += 1
+            print(f"📚 Destination catalog loaded: {len(self._entries)} destinations (v{version})")
+
+    async def _load(self, db: AsyncSession) -> Dict[int, CatalogEntry]:
+        dest_result = await db.execute(
+            select(
+                Destination.id, Destination.name, Destination.description, Destination.address,
+                Destination.lat, Destination.lon, Destination.category
+            )
+        )
+
+        # Kategori utama: category dengan id terkecil per destinasi
+        cat_result = await db.execute(
+            select(destination_categories.c.destination_id, Category.name)
+            .join(Category, Category.id == destination_categories.c.category_id)
+            .order_by(destination_categories.c.destination_id, Category.id)
+        )
+        primary_categories: Dict[int, str] = {}
+        for dest_id, cat_name in cat_result.all():
+            primary_categories.setdefault(dest_id, cat_name)
+
+        stats_result = await db.execute(
+            select(
+                DestinationReview.destination_id,
+                func.avg(DestinationReview.rating),
+                func.count(DestinationReview.id)
+            ).group_by(DestinationReview.destination_id)
+        )
+        review_stats = {
+            dest_id: (float(avg or 0), int(count or 0))
+            for dest_id, avg, count in stats_result.all()
+        }
+
+        entries = {}
+        for row in dest_result.all():
+            avg_rating, review_count = review_stats.get(row.id, (0.0, 0))
+            entries[row.id] = CatalogEntry(
+                id=row.id,
+                name=row.name,
+                description=row.description,
+                address=row.address,
+                lat=row.lat,
+                lon=row.lon,
+                category=row.category,
+                primary_category=primary_categories.get(row.id),
+                avg_rating=avg_rating,
+                review_count=review_count
+            )
+        return entries
+
+    async def get(self, destination_id: int, db: AsyncSession) -> Optional[CatalogEntry]:
+        await self.ensure_loaded(db)
+        return self._entries.get(destination_id)
+
+    async def get_many(self, destination_ids: Iterable[int], db: AsyncSession) -> Dict[int, CatalogEntry]:
+        """Bulk lookup; id yang tidak ada di catalog dilewati"""
+        await self.ensure_loaded(db)
+        entries = self._entries
+        return {
+            dest_id: entries[dest_id]
+            for dest_id in destination_ids
+            if dest_id in entries
+        }
+
+    async def all(self, db: AsyncSession) -> List[CatalogEntry]:
+        await self.ensure_loaded(db)
+        return list(self._entries.values())
+
+
+# Global instance
+destination_catalog = DestinationCatalog()
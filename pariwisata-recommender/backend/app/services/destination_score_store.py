@@ -0,0 +1,151 @@
+"""
+Destination Score Store
+Statistik interaksi per destinasi (view/click/favorite/review/rating) di memori.
+Setiap update dicatat ke journal append-only dan di-snapshot berkala lewat
+JournaledState, sehingga request handler tidak pernah membaca/menulis file.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.services.journal_persistence import JournaledState
+
+
+# Weight untuk setiap jenis interaksi
+INTERACTION_WEIGHTS = {
+    'view': 0.1,
+    'click': 0.3,
+    'favorite': 0.5,
+    'review': 0.7,
+    'rating': 1.0
+}
+
+
+class DestinationScoreStore:
+    """
+    scores[destination_id] = {total_score, interaction_count, avg_rating, rating_count,
+    view_count, click_count, favorite_count, popularity_score, last_updated}
+
+    Update dijalankan tanpa await di tengahnya, sehingga atomik terhadap request
+    lain di event loop yang sama. Snapshot ditulis ke `snapshot_file` dengan format
+    {"last_seq", "destination_scores"}; file lama (dict skor langsung) tetap terbaca.
+    """
+
+    def __init__(self, snapshot_file: str = "data/cache/destination_scores.json"):
+        self.scores: Dict[int, Dict[str, Any]] = {}
+        self.version = 0
+
+        self.persistence = JournaledState(
+            snapshot_file, state_key="destination_scores", label="Destination scores"
+        )
+        self.persistence.bind_state(lambda: self.scores)
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def load(self):
+        try:
+            state = self.persistence.load_snapshot() or {}
+            self.scores = {int(dest_id): dict(score) for dest_id, score in state.items()}
+            replayed = self.persistence.replay_journal(
+                lambda entry: self._apply(
+                    entry['destination_id'], entry['interaction_type'],
+                    entry.get('rating_value'), entry['timestamp']
+                )
+            )
+            if replayed:
+                print(f"♻️ Destination score journal replayed ({replayed} updates)")
+        except Exception as e:
+            print(f"⚠️ Failed to load destination scores: {e}")
+            self.scores = {}
+        self.version += 1
+
+    def _apply(self, destination_id: int, interaction_type: str,
+               rating_value: Optional[float], timestamp: str) -> Dict[str, Any]:
+        dest_score = self.scores.get(destination_id)
+        if dest_score is None:
+            dest_score = self.scores[destination_id] = {
+                'total_score': 0,
+                'interaction_count': 0,
+                'avg_rating': 0,
+                'rating_count': 0,
+                'view_count': 0,
+                'click_count': 0,
+                'favorite_count': 0,
+                'last_updated': timestamp
+            }
+
+        # Incremental update
+        dest_score['interaction_count'] += 1
+        dest_score['total_score'] += INTERACTION_WEIGHTS.get(interaction_type, 0.1)
+
+        # Update specific counters
+        if interaction_type == 'view':
+            dest_score['view_count'] = dest_score.get('view_count', 0) + 1
+        elif interaction_type == 'click':
+            dest_score['click_count'] = dest_score.get('click_count', 0) + 1
+        elif interaction_type == 'favorite':
+            dest_score['favorite_count'] = dest_score.get('favorite_count', 0) + 1
+        elif interaction_type == 'rating' and rating_value:
+            # Incremental average rating calculation
+            old_avg = dest_score['avg_rating']
+            old_count = dest_score['rating_count']
+            new_count = old_count + 1
+            dest_score['avg_rating'] = (old_avg * old_count + rating_value) / new_count
+            dest_score['rating_count'] = new_count
+
+        dest_score['last_updated'] = timestamp
+
+        # Calculate popularity score (weighted combination)
+        dest_score['popularity_score'] = (
+            dest_score['total_score'] +
+            (dest_score['avg_rating'] * 2) +  # Rating lebih penting
+            (dest_score['rating_count'] * 0.5)
+        )
+        self.version += 1
+        return dest_score
+
+    def record(self, destination_id: int, interaction_type: str,
+               rating_value: Optional[float] = None) -> Dict[str, Any]:
+        """Update skor in-memory lalu catat ke journal (write-behind); return salinan skor"""
+        timestamp = datetime.now().isoformat()
+        dest_score = self._apply(int(destination_id), interaction_type, rating_value, timestamp)
+        self.persistence.record({
+            'destination_id': int(destination_id),
+            'interaction_type': interaction_type,
+            'rating_value': rating_value,
+            'timestamp': timestamp
+        })
+        return dict(dest_score)
+
+    def get(self, destination_id: int) -> Optional[Dict[str, Any]]:
+        return self.scores.get(destination_id)
+
+    def items(self) -> List[tuple]:
+        return list(self.scores.items())
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Salinan semua skor dengan key string (format destination_scores.json lama)"""
+        return {str(dest_id): dict(score) for dest_id, score in self.scores.items()}
+
+    def prune(self, cutoff: datetime) -> int:
+        """Hapus destinasi yang tidak di-update sejak cutoff, lalu tulis snapshot baru"""
+        stale = [
+            dest_id for dest_id, score in self.scores.items()
+            if datetime.fromisoformat(score['last_updated']) < cutoff
+        ]
+        for dest_id in stale:
+            del self.scores[dest_id]
+        if stale:
+            self.version += 1
+        self.persistence.compact_sync()
+        return len(stale)
+
+    def start_background_flush(self):
+        """Mulai write-behind flush task (dipanggil saat startup aplikasi)"""
+        self.persistence.start()
+
+    async def stop_background_flush(self):
+        """Hentikan flush task dan tulis sisa update (dipanggil saat shutdown)"""
+        await self.persistence.stop()
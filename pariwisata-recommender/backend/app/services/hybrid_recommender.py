@@ -1,19 +1,24 @@
 import numpy as np
 from app.services.context_aware_component import ContextAwareComponent
-from app.services.social_trend_service import SocialTrendService  # [BARU] Import Social Trend
-import pandas as pd
+from app.services.social_trend_service import social_trend_service  # [BARU] Import Social Trend
 import pickle
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Callable, List, Dict, Any, Optional, Sequence, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.services.base_recommender import BaseRecommender
 from app.services.content_based_recommender import ContentBasedRecommender
 from app.services.collaborative_recommender import CollaborativeRecommender
+from app.services.mmr_reranker import MMRReranker, build_reranker
+from app.services.item_neighbor_graph import ItemNeighborGraph
+from app.services.model_artifacts import artifact_dir, load_artifact, save_artifact
 from app.models.user import User
 from app.models.rating import Rating
-from app.models.destinations import Destination # [BARU] Import model Destination
+from app.models.destinations import Destination
+from app.models.category import Category
+from app.models.destination_category import destination_categories
+from app.services.destination_catalog import destination_catalog
 
 class HybridRecommender(BaseRecommender):
     """Hybrid Recommendation System combining Content-Based and Collaborative Filtering"""
@@ -22,13 +27,17 @@ class HybridRecommender(BaseRecommender):
     MODEL_DIR = Path(__file__).resolve().parents[2] / "data" / "models"
     MODEL_FILE = "hybrid_model.pkl"
 
-    def __init__(self):
+    COMPONENTS = ('content_based', 'collaborative')
+
+    def __init__(self, model_dir: Optional[Path] = None):
         import os
         super().__init__()
+        # Direktori artifact (model registry memberi direktori per versi)
+        self.MODEL_DIR = Path(model_dir) if model_dir is not None else type(self).MODEL_DIR
         self.context_component = ContextAwareComponent()
-        self.content_recommender = ContentBasedRecommender()
-        self.collaborative_recommender = CollaborativeRecommender()
-        self.social_trend_service = SocialTrendService() # [BARU] Inisialisasi service trending
+        self.content_recommender = ContentBasedRecommender(model_dir)
+        self.collaborative_recommender = CollaborativeRecommender(model_dir)
+        self.social_trend_service = social_trend_service # [BARU] Service trending (satu per proses)
 
         # Weight parameters - sesuai tesis BAB III.4.8 (Balanced Hybrid: αCF = 0.5, αCB = 0.5)
         self.content_weight = 0.5  # Content-Based weight
@@ -36,6 +45,8 @@ class HybridRecommender(BaseRecommender):
 
         self.default_lambda = 0.7  # Default fallback value
         self.similarity_matrix = None
+        self.mmr_reranker = None  # MMR engine (destination_id -> row index)
+        self.item_graph = None    # ItemNeighborGraph blended content + collaborative
         self.model_info = {}  # Track model metadata
 
         # Tentukan path model dari env atau default (point to backend/data/models)
@@ -54,48 +65,144 @@ class HybridRecommender(BaseRecommender):
             self._model_loaded = True
 
 
-    async def train(self, db: AsyncSession, **kwargs):
-        """Train both content-based and collaborative recommenders"""
+    async def train(self, db: AsyncSession, components: Sequence[str] = COMPONENTS, **kwargs):
+        """
+        Train content-based dan/atau collaborative recommender, lalu bangun ulang
+        komponen hybrid (similarity untuk MMR, item graph). Komponen yang tidak
+        di-train harus sudah dimuat (mis. dari versi model sebelumnya).
+        """
         try:
-            print("🤖 Training Hybrid Recommender...")
-            
-            results = {}
-            
-            # Train content-based recommender
-            print("📚 Training content-based recommender...")
-            await self.content_recommender.train(db)
-            results['content_based'] = "trained"
-            
-            # Train collaborative recommender  
-            print("🤝 Training collaborative recommender...")
-            await self.collaborative_recommender.train(db)
-            results['collaborative'] = "trained"
-            
-            # Store similarity matrix untuk MMR
-            if self.content_recommender.is_trained:
-                self.similarity_matrix = self.content_recommender.similarity_matrix
-                print("📊 Similarity matrix stored for MMR")
-            
-            self.is_trained = True
-            
-            # Update model info for status tracking
-            self.model_info = {
-                'trained_at': datetime.now().isoformat(),
-                'n_samples': 0, 
-                'accuracy': 0.88 
-            }
-            
-            # Auto-save model setelah training berhasil
-            self._save_model()
-            
-            print("✅ Hybrid recommender training completed!")
-            
-            return results
-            
+            return self.fit(await self.load_training_data(db, components), components)
         except Exception as e:
             print(f"❌ Hybrid training failed: {str(e)}")
             raise Exception(f"Hybrid training failed: {str(e)}")
 
+    @staticmethod
+    async def load_training_data(db: AsyncSession, components: Sequence[str] = COMPONENTS) -> Dict[str, Dict[str, Any]]:
+        """
+        Stage ekstraksi bersama: destinasi, kategori dan ratings dibaca sekali
+        (kolumnar), lalu dibagi menjadi input fit per komponen (picklable, untuk
+        training executor). Semua komponen memakai snapshot ratings yang sama
+        (ratings + rating review, seperti fold-in).
+        """
+        data = {}
+        n_rows = 0
+        if components:
+            rating_result = await db.execute(CollaborativeRecommender.rating_source())
+            rows = rating_result.all()
+            n_rows = len(rows)
+            user_ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n_rows)
+            item_ids = np.fromiter((r[1] for r in rows), dtype=np.int64, count=n_rows)
+            ratings = np.fromiter((r[2] for r in rows), dtype=np.float64, count=n_rows)
+            created_at = np.array([r[3] for r in rows], dtype='datetime64[ns]')
+
+        if 'content_based' in components:
+            # User profile: satu rating (terbaru) per (user, item), seperti matrix collaborative
+            profile_users, profile_items, profile_ratings, _ = CollaborativeRecommender._deduplicate_keep_latest(
+                user_ids, item_ids, ratings, created_at
+            )
+            dest_result = await db.execute(select(Destination.id))
+            dest_ids = dest_result.scalars().all()
+
+            # Kategori pertama (id terkecil) per destinasi, atau 'Umum' jika kosong
+            cat_result = await db.execute(
+                select(destination_categories.c.destination_id, Category.name)
+                .join(Category, Category.id == destination_categories.c.category_id)
+                .order_by(destination_categories.c.destination_id, Category.id)
+            )
+            first_categories: Dict[int, str] = {}
+            for dest_id, cat_name in cat_result.all():
+                first_categories.setdefault(dest_id, cat_name)
+
+            data['content_based'] = {
+                'item_ids': list(dest_ids),
+                'item_texts': [first_categories.get(dest_id, 'Umum') for dest_id in dest_ids],
+                'rating_user_ids': profile_users,
+                'rating_item_ids': profile_items,
+                'ratings': profile_ratings
+            }
+
+        if 'collaborative' in components:
+            if n_rows < 10:
+                raise ValueError("Not enough ratings for collaborative filtering (minimum 10 required)")
+            data['collaborative'] = {
+                'user_ids': user_ids,
+                'item_ids': item_ids,
+                'ratings': ratings,
+                'created_at': created_at
+            }
+        return data
+
+    def fit(self, data: Dict[str, Dict[str, Any]], components: Sequence[str] = COMPONENTS,
+            progress: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+        """
+        Bagian CPU-bound dari train(): fit sub-model dari snapshot data lalu rakit
+        komponen hybrid dan simpan artifact. `progress(stage, status)` dipanggil
+        di awal/akhir setiap stage. Training executor menjalankan stage yang sama
+        (fit_component per komponen secara paralel, lalu assemble).
+        """
+        report = progress or (lambda stage, status: None)
+        print("🤖 Training Hybrid Recommender...")
+        
+        results = {}
+        for component in self.COMPONENTS:
+            if component in components:
+                report(component, 'started')
+                results[component] = self.fit_component(component, data[component])
+                report(component, 'completed')
+        
+        report('hybrid', 'started')
+        self.assemble()
+        report('hybrid', 'completed')
+        
+        return results
+
+    def fit_component(self, component: str, data: Dict[str, Any]) -> str:
+        """Fit satu sub-model (menyimpan artifact-nya sendiri); independen dari komponen lain"""
+        if component == 'content_based':
+            print("📚 Training content-based recommender...")
+            try:
+                self.content_recommender.fit(**data)
+            except Exception as e:
+                raise Exception(f"Training failed: {str(e)}")
+        elif component == 'collaborative':
+            print("🤝 Training collaborative recommender...")
+            try:
+                self.collaborative_recommender.fit(**data)
+            except Exception as e:
+                raise Exception(f"Collaborative training failed: {str(e)}")
+        else:
+            raise Exception(f"Unknown model component: {component}")
+        return "trained"
+
+    def assemble(self):
+        """Stage akhir: rakit komponen hybrid (similarity untuk MMR, item graph) dari sub-model lalu simpan"""
+        # Store similarity matrix untuk MMR
+        if self.content_recommender.is_trained:
+            self.similarity_matrix = self.content_recommender.similarity_matrix
+            self.mmr_reranker = None
+            self._get_mmr_reranker()
+            print("📊 Similarity matrix stored for MMR")
+        
+        # Graph similar-destinations (content + collaborative) untuk related items
+        self.item_graph = None
+        if self._get_item_graph() is not None:
+            print(f"🕸️ Item neighbor graph built: {len(self.item_graph)} items x {self.item_graph.k} neighbors")
+        
+        self.is_trained = True
+        
+        # Update model info for status tracking
+        self.model_info = {
+            'trained_at': datetime.now().isoformat(),
+            'n_samples': 0, 
+            'accuracy': 0.88 
+        }
+        
+        # Auto-save model setelah training berhasil
+        self._save_model()
+        
+        print("✅ Hybrid recommender training completed!")
+
     async def predict(self, user_id: Optional[int], num_recommendations: int = 10, 
                  db: AsyncSession = None, lambda_mmr: float = None, 
                  mab_optimizer=None, context: Dict[str, Any] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
@@ -178,9 +285,12 @@ class HybridRecommender(BaseRecommender):
                 # Mengambil lebih banyak kandidat untuk diversity (MMR)
                 trending_data = self.social_trend_service.get_top_trending(limit=num_recommendations * 3)
                 
-                # 2. Enrich dengan detail database
+                # 2. Enrich dengan detail dari DestinationCatalog (bulk, tanpa query per item)
+                destinations = await destination_catalog.get_many(
+                    [item['destination_id'] for item in trending_data], db
+                )
                 for item in trending_data:
-                    dest = await db.get(Destination, item['destination_id'])
+                    dest = destinations.get(item['destination_id'])
                     if dest:
                         # Normalisasi skor trending (biasanya > 10) ke skala rating (0-5)
                         # Logarithmic scaling agar skor viral tidak merusak MMR
@@ -293,78 +403,61 @@ class HybridRecommender(BaseRecommender):
         if not recommendations or self.similarity_matrix is None:
             return recommendations[:num_final_recs]
         
-        # Convert ke DataFrame for easier manipulation
-        candidates_df = pd.DataFrame(recommendations)
-        
-        if 'destination_id' not in candidates_df.columns or 'score' not in candidates_df.columns:
+        if any('destination_id' not in rec or 'score' not in rec for rec in recommendations):
             return recommendations[:num_final_recs]
         
-        reranked_recs = []
-        remaining_candidates = candidates_df.copy()
-        
-        # Select first item (highest relevance score)
-        if not remaining_candidates.empty:
-            first_idx = remaining_candidates['score'].idxmax()
-            first_rec = remaining_candidates.loc[first_idx].to_dict()
-            reranked_recs.append(first_rec)
-            remaining_candidates = remaining_candidates.drop(first_idx)
-        
-        # Iteratively select remaining items using MMR
-        while len(reranked_recs) < num_final_recs and not remaining_candidates.empty:
-            best_mmr_score = -float('inf')
-            best_item = None
-            best_idx = None
-            
-            for idx, candidate_row in remaining_candidates.iterrows():
-                candidate_id = candidate_row['destination_id']
-                relevance_score = candidate_row['score']
-                
-                # Calculate max similarity to already selected items
-                max_similarity = 0
-                if len(reranked_recs) > 0:
-                    for selected_item in reranked_recs:
-                        selected_id = selected_item['destination_id']
-                        
-                        try:
-                            # Get similarity using item_vectors mapping
-                            # item_vectors: {destination_id: TF-IDF vector}
-                            if (candidate_id in self.content_recommender.item_vectors and 
-                                selected_id in self.content_recommender.item_vectors):
-                                
-                                # Get list of all item IDs (preserves order for similarity_matrix indexing)
-                                item_ids = list(self.content_recommender.item_vectors.keys())
-                                
-                                # Find matrix indices
-                                candidate_matrix_idx = item_ids.index(candidate_id)
-                                selected_matrix_idx = item_ids.index(selected_id)
-                                
-                                # Get similarity from pre-computed matrix
-                                sim = self.similarity_matrix[candidate_matrix_idx, selected_matrix_idx]
-                                max_similarity = max(max_similarity, sim)
-                            else:
-                                # Items not in model, assume no similarity
-                                max_similarity = max(max_similarity, 0)
-                                
-                        except (KeyError, IndexError, ValueError, TypeError):
-                            # Fallback: no similarity
-                            max_similarity = max(max_similarity, 0)
-                
-                # Calculate MMR Score: (1-λ) * relevance - λ * max_similarity
-                # λ=0.0 → Pure relevance, λ=1.0 → Pure diversity
-                mmr_score = (1 - lambda_val) * relevance_score - lambda_val * max_similarity
-                
-                if mmr_score > best_mmr_score:
-                    best_mmr_score = mmr_score
-                    best_item = candidate_row.to_dict()
-                    best_idx = idx
-            
-            if best_item is not None:
-                reranked_recs.append(best_item)
-                remaining_candidates = remaining_candidates.drop(best_idx)
-            else:
-                break
+        reranker = self._get_mmr_reranker()
+        if reranker is None:
+            return recommendations[:num_final_recs]
         
-        return reranked_recs
+        return reranker.rerank(recommendations, lambda_val, num_final_recs)
+
+    def rerank_batch_with_mmr(self, candidate_lists: List[List[Dict[str, Any]]], lambda_vals,
+                              num_final_recs: int) -> List[List[Dict[str, Any]]]:
+        """Batch MMR: re-rank banyak daftar kandidat dalam satu pass vektor"""
+        reranker = self._get_mmr_reranker() if self.similarity_matrix is not None else None
+        if reranker is None:
+            return [cands[:num_final_recs] for cands in candidate_lists]
+        return reranker.rerank_batch(candidate_lists, lambda_vals, num_final_recs)
+
+    def _get_mmr_reranker(self) -> Optional[MMRReranker]:
+        """Ambil MMR engine, bangun ulang jika similarity matrix berubah"""
+        if self.mmr_reranker is None or self.mmr_reranker.similarity_matrix is not self.similarity_matrix:
+            self.mmr_reranker = build_reranker(
+                self.similarity_matrix,
+                list(self.content_recommender.item_vectors.keys())
+            )
+        return self.mmr_reranker
+
+    def _get_item_graph(self) -> Optional[ItemNeighborGraph]:
+        """Item neighbor graph; dibangun dari komponen yang sudah di-train jika belum ada"""
+        if self.item_graph is None:
+            content = self.content_recommender
+            collab = self.collaborative_recommender
+            content_ready = content.is_trained and content.similarity_matrix is not None
+            collab_ready = collab.is_trained and collab.item_factors is not None
+            if not content_ready and not collab_ready:
+                return None
+            
+            total_weight = self.content_weight + self.collaborative_weight
+            self.item_graph = ItemNeighborGraph.build(
+                content.item_ids if content_ready else collab.item_ids,
+                content_similarity=content.similarity_matrix if content_ready else None,
+                item_factors=collab.item_factors if collab_ready else None,
+                factor_item_ids=collab.item_ids if collab_ready else None,
+                content_weight=self.content_weight / total_weight if total_weight else 0.5
+            )
+        return self.item_graph
+
+    def get_related_items(self, destination_id: int, top_k: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """
+        Similar destinations dari item graph (O(K)).
+        None jika graph belum tersedia atau destinasi tidak ada di graph.
+        """
+        graph = self._get_item_graph()
+        if graph is None or destination_id not in graph:
+            return None
+        return graph.neighbors(destination_id, top_k)
 
     async def explain(self, user_id: int, destination_id: int, db: AsyncSession = None) -> Dict[str, Any]:
         """Explain hybrid recommendation"""
@@ -440,51 +533,55 @@ class HybridRecommender(BaseRecommender):
             raise Exception(f"Get user profile failed: {str(e)}")
     
     def _save_model(self):
-        """Save trained model to disk"""
+        """Save trained model to disk (artifact directory: manifest + .npy)"""
         try:
-            # Create directory jika belum ada
-            self.MODEL_DIR.mkdir(parents=True, exist_ok=True)
-            
-            model_path = self.MODEL_DIR / self.MODEL_FILE
-            
             # Save hybrid-specific components only
             # (content_recommender dan collaborative_recommender sudah auto-save sendiri)
-            model_data = {
-                'content_weight': self.content_weight,
-                'collaborative_weight': self.collaborative_weight,
-                'default_lambda': self.default_lambda,
-                'similarity_matrix': self.similarity_matrix,
-                'is_trained': self.is_trained,
-                'trained_at': self.model_info.get('trained_at', datetime.now().isoformat()),
-                'n_samples': self.model_info.get('n_samples', 0),
-                'accuracy': self.model_info.get('accuracy', 0.88)
-            }
-            
-            with open(model_path, 'wb') as f:
-                pickle.dump(model_data, f)
-            
-            print(f"✅ Hybrid model saved to {model_path}")
+            path = save_artifact(
+                artifact_dir(self.MODEL_DIR, self.MODEL_FILE),
+                kind="hybrid",
+                arrays={
+                    'similarity_matrix': self.similarity_matrix,
+                    **(self.item_graph.to_arrays() if self.item_graph is not None else {})
+                },
+                metadata={
+                    'content_weight': self.content_weight,
+                    'collaborative_weight': self.collaborative_weight,
+                    'default_lambda': self.default_lambda,
+                    'is_trained': self.is_trained,
+                    'trained_at': self.model_info.get('trained_at', datetime.now().isoformat()),
+                    'n_samples': self.model_info.get('n_samples', 0),
+                    'accuracy': self.model_info.get('accuracy', 0.88)
+                }
+            )
+            print(f"✅ Hybrid model saved to {path}")
             
         except Exception as e:
             print(f"⚠️ Failed to save Hybrid model: {str(e)}")
     
     def _auto_load_model(self):
-        """Auto-load model dari disk jika ada"""
+        """Auto-load model dari disk jika ada (artifact memory-mapped, fallback pickle lama)"""
         try:
+            artifact = load_artifact(artifact_dir(self.MODEL_DIR, self.MODEL_FILE))
             model_path = self.MODEL_DIR / self.MODEL_FILE
-            
-            if not model_path.exists():
+            if artifact is not None:
+                model_data = dict(artifact.metadata)
+                self.similarity_matrix = artifact.get('similarity_matrix')
+                self.item_graph = ItemNeighborGraph.from_arrays(artifact)
+            elif model_path.exists():
+                # Model lama (satu blob pickle)
+                with open(model_path, 'rb') as f:
+                    model_data = pickle.load(f)
+                self.similarity_matrix = model_data['similarity_matrix']
+                self.item_graph = model_data.get('item_graph')  # Model lama: dibangun saat pertama dipakai
+            else:
                 print("ℹ️ No saved Hybrid model found")
                 return
             
-            with open(model_path, 'rb') as f:
-                model_data = pickle.load(f)
-            
             # Restore hybrid-specific components
             self.content_weight = model_data['content_weight']
             self.collaborative_weight = model_data['collaborative_weight']
             self.default_lambda = model_data['default_lambda']
-            self.similarity_matrix = model_data['similarity_matrix']
             self.is_trained = model_data['is_trained']
             
             # Load model_info for status tracking
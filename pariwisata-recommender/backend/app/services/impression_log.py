@@ -0,0 +1,240 @@
+"""
+Impression Log
+Setiap respons hybrid dicatat sebagai impression (request id, user/session,
+destinasi yang ditampilkan, arm MAB yang dipilih, context key) di buffer
+in-memory ber-kapasitas tetap. Job periodik:
+- mengambil impression yang attribution window-nya sudah lewat
+- join dengan interaksi & rating baru secara bulk (beberapa query set-based)
+- menghitung reward NDCG + diversity + novelty secara vektor
+- menerapkan update MAB batch ke arm & context yang benar
+"""
+
+import asyncio
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, or_, select
+
+from app.core.db import AsyncSessionLocal
+from app.models.rating import Rating
+from app.models.user_interaction import UserInteraction
+from app.services.context_featurizer import context_featurizer
+from app.services.reward_calculator import RewardCalculator, reward_calculator
+
+
+class Impression(NamedTuple):
+    request_id: str
+    user_id: Optional[int]
+    session_id: Optional[str]
+    shown_ids: Tuple[int, ...]
+    categories: Tuple[str, ...]
+    arm_index: int
+    context_key: str
+    created_at: datetime
+
+
+class ImpressionLog:
+    """
+    Buffer dibatasi `capacity` (impression tertua dibuang jika penuh). Impression
+    di-settle setelah `attribution_window` detik: interaksi/rating pada item yang
+    ditampilkan dalam window tersebut menjadi relevance untuk NDCG.
+    """
+
+    def __init__(self, capacity: int = 20000, attribution_window: float = 1800.0,
+                 settle_interval: float = 60.0, calculator: RewardCalculator = reward_calculator):
+        self.attribution_window = timedelta(seconds=attribution_window)
+        self.settle_interval = settle_interval
+        self.calculator = calculator
+        self.capacity = capacity
+        self._buffer: deque = deque(maxlen=capacity)
+        self._retry: List[Impression] = []  # Sudah jatuh tempo, gagal di-settle (dicoba lagi lebih dulu)
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+        self.metrics: Dict[str, Any] = {
+            'recorded': 0,
+            'dropped': 0,
+            'settled': 0,
+            'engaged': 0,
+            'last_settle_size': 0,
+            'last_mean_reward': None,
+            'last_settled_at': None
+        }
+
+    def __len__(self) -> int:
+        return len(self._buffer) + len(self._retry)
+
+    def record(self, user_id: Optional[int], session_id: Optional[str],
+               recommendations: List[Dict[str, Any]], arm_index: Optional[int],
+               context: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Catat satu respons hybrid; return request id (None jika tidak bisa di-attribute)"""
+        if arm_index is None or not recommendations or (user_id is None and not session_id):
+            return None
+        if len(self._buffer) == self._buffer.maxlen:
+            self.metrics['dropped'] += 1
+
+        request_id = uuid.uuid4().hex
+        self._buffer.append(Impression(
+            request_id=request_id,
+            user_id=user_id,
+            session_id=session_id if user_id is None else None,
+            shown_ids=tuple(int(rec['destination_id']) for rec in recommendations),
+            categories=tuple(rec.get('category_str') or rec.get('category') or 'Other' for rec in recommendations),
+            arm_index=int(arm_index),
+            context_key=context_featurizer.context_key(context),
+            created_at=datetime.now()
+        ))
+        self.metrics['recorded'] += 1
+        return request_id
+
+    def _take_due(self, now: datetime) -> List[Impression]:
+        """Keluarkan impression yang window-nya sudah tertutup (buffer terurut waktu)"""
+        due, self._retry = self._retry, []
+        cutoff = now - self.attribution_window
+        while self._buffer and self._buffer[0].created_at <= cutoff:
+            due.append(self._buffer.popleft())
+        return due
+
+    # ---------------------------------------------------------------- settle
+
+    async def settle(self, mab_optimizer, now: Optional[datetime] = None) -> int:
+        """Hitung reward untuk semua impression yang jatuh tempo dan update MAB (batch)"""
+        async with self._lock:
+            impressions = self._take_due(now or datetime.now())
+            if not impressions:
+                return 0
+            try:
+                async with AsyncSessionLocal() as db:
+                    rewards, engaged = await self._compute_rewards(impressions, db)
+            except Exception:
+                # Dicoba lagi di putaran berikutnya. Tidak dikembalikan ke buffer:
+                # record() bisa sudah mengisinya selama query, dan extendleft pada
+                # deque penuh diam-diam membuang impression terbaru
+                overflow = max(0, len(impressions) - self.capacity)
+                self._retry = impressions[overflow:]
+                self.metrics['dropped'] += overflow
+                raise
+
+            mab_optimizer.update_rewards_by_key(
+                [imp.arm_index for imp in impressions],
+                rewards.tolist(),
+                [imp.context_key for imp in impressions]
+            )
+
+            self.metrics['settled'] += len(impressions)
+            self.metrics['engaged'] += int(engaged)
+            self.metrics['last_settle_size'] = len(impressions)
+            self.metrics['last_mean_reward'] = round(float(rewards.mean()), 4)
+            self.metrics['last_settled_at'] = datetime.now().isoformat()
+            print(f"🎯 MAB updated from {len(impressions)} impressions "
+                  f"({int(engaged)} engaged, mean reward={rewards.mean():.3f})")
+            return len(impressions)
+
+    async def _compute_rewards(self, impressions: List[Impression], db) -> Tuple[np.ndarray, int]:
+        width = max(len(imp.shown_ids) for imp in impressions)
+        shown = np.zeros((len(impressions), width), dtype=np.int64)
+        mask = np.zeros((len(impressions), width), dtype=bool)
+        for row, imp in enumerate(impressions):
+            shown[row, :len(imp.shown_ids)] = imp.shown_ids
+            mask[row, :len(imp.shown_ids)] = True
+
+        item_ids = sorted(set(shown[mask].tolist()))
+        user_ids = sorted({imp.user_id for imp in impressions if imp.user_id is not None})
+        session_ids = sorted({imp.session_id for imp in impressions if imp.session_id})
+        since = min(imp.created_at for imp in impressions)
+
+        # 1. Interaksi baru pada item yang ditampilkan (user login atau session anonim)
+        owner_filter = []
+        if user_ids:
+            owner_filter.append(UserInteraction.user_id.in_(user_ids))
+        if session_ids:
+            owner_filter.append(UserInteraction.session_id.in_(session_ids))
+        result = await db.execute(
+            select(UserInteraction.user_id, UserInteraction.session_id,
+                   UserInteraction.entity_id, UserInteraction.created_at)
+            .where(UserInteraction.entity_type == 'destination')
+            .where(UserInteraction.entity_id.in_(item_ids))
+            .where(UserInteraction.created_at >= since)
+            .where(or_(*owner_filter))
+        )
+        interaction_times: Dict[Tuple[Any, int], List[datetime]] = {}
+        for user_id, session_id, entity_id, created_at in result.all():
+            owner = ('u', user_id) if user_id is not None else ('s', session_id)
+            interaction_times.setdefault((owner, entity_id), []).append(created_at)
+
+        # 2. Rating baru dari user login
+        rating_times: Dict[Tuple[Any, int], List[Tuple[datetime, float]]] = {}
+        if user_ids:
+            result = await db.execute(
+                select(Rating.user_id, Rating.destination_id, Rating.created_at, Rating.rating)
+                .where(Rating.user_id.in_(user_ids))
+                .where(Rating.destination_id.in_(item_ids))
+                .where(Rating.created_at >= since)
+            )
+            for user_id, dest_id, created_at, rating in result.all():
+                rating_times.setdefault((('u', user_id), dest_id), []).append((created_at, rating))
+
+        # 3. Popularitas item (jumlah interaksi) untuk novelty
+        result = await db.execute(
+            select(UserInteraction.entity_id, func.count(UserInteraction.id))
+            .where(UserInteraction.entity_type == 'destination')
+            .where(UserInteraction.entity_id.in_(item_ids))
+            .group_by(UserInteraction.entity_id)
+        )
+        popularity_of = dict(result.all())
+
+        relevance = np.zeros(shown.shape)
+        popularity = np.zeros(shown.shape)
+        category_ids = np.zeros(shown.shape, dtype=np.int64)
+        category_index: Dict[str, int] = {}
+        engaged = 0
+        for row, imp in enumerate(impressions):
+            owner = ('u', imp.user_id) if imp.user_id is not None else ('s', imp.session_id)
+            start, end = imp.created_at, imp.created_at + self.attribution_window
+            for col, (dest_id, category) in enumerate(zip(imp.shown_ids, imp.categories)):
+                ratings = [(t, r) for t, r in rating_times.get((owner, dest_id), ()) if t and start <= t <= end]
+                clicks = sum(1 for t in interaction_times.get((owner, dest_id), ()) if t and start <= t <= end)
+                relevance[row, col] = RewardCalculator.relevance_from_feedback(
+                    max(ratings)[1] if ratings else None, clicks
+                )
+                popularity[row, col] = popularity_of.get(dest_id, 0)
+                category_ids[row, col] = category_index.setdefault(category, len(category_index))
+            engaged += bool(relevance[row].any())
+
+        rewards = self.calculator.calculate_rewards_batch(relevance, category_ids, popularity, mask)
+        return rewards, engaged
+
+    # ------------------------------------------------------- background task
+
+    def start(self, mab_optimizer):
+        """Mulai settle periodik (panggil dari event loop yang berjalan)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run(mab_optimizer))
+
+    async def _run(self, mab_optimizer):
+        while True:
+            await asyncio.sleep(self.settle_interval)
+            try:
+                await self.settle(mab_optimizer)
+            except Exception as e:
+                print(f"⚠️ Impression settle failed: {e}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {**self.metrics, 'buffered': len(self._buffer), 'retrying': len(self._retry), 'capacity': self._buffer.maxlen}
+
+
+# Global instance
+impression_log = ImpressionLog()
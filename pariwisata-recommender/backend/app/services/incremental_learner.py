@@ -8,13 +8,14 @@ from typing import Dict, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import func, desc
-import json
 import os
 
 from app.models.rating import Rating
 from app.models.user_interaction import UserInteraction
 from app.models.destinations import Destination
 from app.models.destination_review import DestinationReview
+from app.services.destination_score_store import DestinationScoreStore
+from app.services.trend_engine import trend_engine
 
 
 class IncrementalLearner:
@@ -27,8 +28,10 @@ class IncrementalLearner:
         self.cache_dir = "data/cache"
         os.makedirs(self.cache_dir, exist_ok=True)
         
+        # Skor per destinasi di memori (journal + snapshot ke destination_scores.json)
+        self.score_store = DestinationScoreStore(os.path.join(self.cache_dir, "destination_scores.json"))
+        
         # Cache untuk mengurangi database queries
-        self.destination_scores = {}
         self.trending_items = []
         self.last_cache_update = None
         self.cache_ttl = timedelta(hours=1)  # Cache valid untuk 1 jam
@@ -49,66 +52,9 @@ class IncrementalLearner:
             rating_value: Rating value if interaction_type is 'rating'
             db: Database session
         """
-        # Weight untuk setiap jenis interaksi
-        interaction_weights = {
-            'view': 0.1,
-            'click': 0.3,
-            'favorite': 0.5,
-            'review': 0.7,
-            'rating': 1.0
-        }
-        
-        weight = interaction_weights.get(interaction_type, 0.1)
-        
-        # Load current scores
-        scores = self._load_scores()
-        
-        if destination_id not in scores:
-            scores[destination_id] = {
-                'total_score': 0,
-                'interaction_count': 0,
-                'avg_rating': 0,
-                'rating_count': 0,
-                'view_count': 0,
-                'click_count': 0,
-                'favorite_count': 0,
-                'last_updated': datetime.now().isoformat()
-            }
-        
-        dest_score = scores[destination_id]
-        
-        # Incremental update
-        dest_score['interaction_count'] += 1
-        dest_score['total_score'] += weight
-        
-        # Update specific counters
-        if interaction_type == 'view':
-            dest_score['view_count'] = dest_score.get('view_count', 0) + 1
-        elif interaction_type == 'click':
-            dest_score['click_count'] = dest_score.get('click_count', 0) + 1
-        elif interaction_type == 'favorite':
-            dest_score['favorite_count'] = dest_score.get('favorite_count', 0) + 1
-        elif interaction_type == 'rating' and rating_value:
-            # Incremental average rating calculation
-            old_avg = dest_score['avg_rating']
-            old_count = dest_score['rating_count']
-            new_count = old_count + 1
-            new_avg = (old_avg * old_count + rating_value) / new_count
-            
-            dest_score['avg_rating'] = new_avg
-            dest_score['rating_count'] = new_count
-        
-        dest_score['last_updated'] = datetime.now().isoformat()
-        
-        # Calculate popularity score (weighted combination)
-        dest_score['popularity_score'] = (
-            dest_score['total_score'] + 
-            (dest_score['avg_rating'] * 2) +  # Rating lebih penting
-            (dest_score['rating_count'] * 0.5)
-        )
-        
-        # Save updated scores
-        self._save_scores(scores)
+        # Update in-memory (tanpa I/O); persistence ditulis oleh background flush
+        dest_score = self.score_store.record(destination_id, interaction_type, rating_value)
+        trend_engine.record(destination_id, interaction_type)
         
         # Invalidate cache
         self.last_cache_update = None
@@ -129,13 +75,11 @@ class IncrementalLearner:
         if self._is_cache_valid():
             return self.trending_items[:limit]
         
-        scores = self._load_scores()
-        
         # Filter by recent activity
         cutoff_time = datetime.now() - timedelta(hours=time_window_hours)
         
         trending = []
-        for dest_id, score_data in scores.items():
+        for dest_id, score_data in self.score_store.items():
             last_updated = datetime.fromisoformat(score_data['last_updated'])
             if last_updated >= cutoff_time:
                 trending.append({
@@ -232,20 +176,8 @@ class IncrementalLearner:
         print(f"✅ Incremental update: Interaction '{interaction_type}' on destination {destination_id}")
     
     def _load_scores(self) -> Dict:
-        """Load scores from cache file"""
-        cache_file = os.path.join(self.cache_dir, "destination_scores.json")
-        if os.path.exists(cache_file):
-            with open(cache_file, 'r') as f:
-                return json.load(f)
-        return {}
-    
-    def _save_scores(self, scores: Dict):
-        """Save scores to cache file"""
-        cache_file = os.path.join(self.cache_dir, "destination_scores.json")
-        # Convert int keys to str for JSON
-        scores_str_keys = {str(k): v for k, v in scores.items()}
-        with open(cache_file, 'w') as f:
-            json.dump(scores_str_keys, f, indent=2)
+        """Salinan skor in-memory (key string, format destination_scores.json)"""
+        return self.score_store.as_dict()
     
     def _is_cache_valid(self) -> bool:
         """Check if cache is still valid"""
@@ -263,14 +195,12 @@ class IncrementalLearner:
         Apply incremental learning boost to base recommendations.
         This combines ML model output with real-time learning.
         """
-        scores = self._load_scores()
-        
         for rec in base_recommendations:
             dest_id = rec.get('destination_id') or rec.get('id')
             
-            # Get incremental score - convert to string for JSON lookup
-            if str(dest_id) in scores:
-                dest_score = scores[str(dest_id)]
+            # Get incremental score (in-memory, tanpa baca file)
+            dest_score = self.score_store.get(int(dest_id)) if dest_id is not None else None
+            if dest_score is not None:
                 popularity_boost = dest_score.get('popularity_score', 0) / 100  # Normalize
                 
                 # Apply boost to recommendation score
@@ -292,17 +222,10 @@ class IncrementalLearner:
         Clean up old data from cache.
         Run periodically (e.g., daily cron job).
         """
-        scores = self._load_scores()
         cutoff_time = datetime.now() - timedelta(days=30)
-        
-        cleaned = {}
-        for dest_id, score_data in scores.items():
-            last_updated = datetime.fromisoformat(score_data['last_updated'])
-            if last_updated >= cutoff_time:
-                cleaned[dest_id] = score_data
-        
-        self._save_scores(cleaned)
-        print(f"🧹 Cleaned up old scores. {len(scores) - len(cleaned)} entries removed.")
+        removed = self.score_store.prune(cutoff_time)
+        self.last_cache_update = None
+        print(f"🧹 Cleaned up old scores. {removed} entries removed.")
 
 
 # Global instance
@@ -0,0 +1,196 @@
+"""
+Interaction Ingestion Pipeline
+Endpoint tracking (click/view) hanya memasukkan event ke antrian asyncio
+ber-kapasitas tetap lalu langsung return. Satu consumer di background:
+- mengumpulkan event menjadi batch (batch_size atau flush_interval)
+- menulis batch ke user_interactions dengan satu INSERT multi-row
+- meneruskan batch ke subscriber (incremental learner, MAB, trend counter)
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+from sqlalchemy import insert
+
+from app.core.db import AsyncSessionLocal
+from app.models.user_interaction import UserInteraction
+
+
+class InteractionEvent(NamedTuple):
+    user_id: Optional[int]
+    session_id: Optional[str]
+    interaction_type: str
+    entity_type: str
+    entity_id: int
+    duration: Optional[float] = None
+    extra_data: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+Subscriber = Callable[[List[InteractionEvent]], Awaitable[None]]
+
+
+class InteractionPipeline:
+    """
+    Antrian dibatasi `max_queue`: jika penuh, `submit` return False (backpressure)
+    dan caller memutuskan responsnya. Saat shutdown, `stop()` menulis semua event
+    yang masih ada di antrian sebelum return.
+    """
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 0.5, write_retries: int = 2):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.write_retries = write_retries
+        self.subscribers: List[Subscriber] = []
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self.metrics: Dict[str, Any] = {
+            'enqueued': 0,
+            'rejected': 0,
+            'written': 0,
+            'failed': 0,
+            'batches': 0,
+            'last_batch_size': 0,
+            'last_write_ms': 0.0,
+            'queue_high_watermark': 0
+        }
+
+    def subscribe(self, subscriber: Subscriber):
+        """Daftarkan callback async yang menerima setiap batch setelah tersimpan"""
+        if subscriber not in self.subscribers:
+            self.subscribers.append(subscriber)
+
+    # ----------------------------------------------------------- lifecycle
+
+    def start(self):
+        """Mulai consumer (panggil dari event loop yang berjalan)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._stopping = False
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Drain: tulis semua event di antrian, lalu hentikan consumer"""
+        self._stopping = True
+        if self._task is not None:
+            await self._task
+            self._task = None
+        if self._queue is not None and not self._queue.empty():
+            await self._process(self._take_batch(self._queue.qsize()))
+
+    # -------------------------------------------------------------- submit
+
+    def submit(self, event: InteractionEvent) -> bool:
+        """Masukkan event ke antrian tanpa menunggu; False jika antrian penuh"""
+        if self._task is None or self._task.done():
+            self.start()
+        if event.created_at is None:
+            event = event._replace(created_at=datetime.now())
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.metrics['rejected'] += 1
+            return False
+
+        self.metrics['enqueued'] += 1
+        depth = self._queue.qsize()
+        if depth > self.metrics['queue_high_watermark']:
+            self.metrics['queue_high_watermark'] = depth
+        return True
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue': self.max_queue,
+            'running': self._task is not None and not self._task.done()
+        }
+
+    # ------------------------------------------------------------ consumer
+
+    def _take_batch(self, limit: int) -> List[InteractionEvent]:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while not (self._stopping and self._queue.empty()):
+            try:
+                first = await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and not self._stopping:
+                batch.extend(self._take_batch(self.batch_size - len(batch)))
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            if self._stopping:
+                batch.extend(self._take_batch(self.batch_size - len(batch)))
+
+            await self._process(batch)
+
+    async def _process(self, batch: List[InteractionEvent]):
+        if not batch:
+            return
+        if await self._write(batch):
+            for subscriber in self.subscribers:
+                try:
+                    await subscriber(batch)
+                except Exception as e:
+                    print(f"⚠️ Interaction subscriber failed: {e}")
+
+    async def _write(self, batch: List[InteractionEvent]) -> bool:
+        """Satu INSERT multi-row untuk seluruh batch (retry jika gagal)"""
+        rows = [event._asdict() for event in batch]
+        for attempt in range(self.write_retries + 1):
+            started = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(insert(UserInteraction), rows)
+                    await db.commit()
+            except Exception as e:
+                print(f"⚠️ Failed to write {len(batch)} interactions (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(0.1 * (attempt + 1))
+                continue
+
+            self.metrics['written'] += len(batch)
+            self.metrics['batches'] += 1
+            self.metrics['last_batch_size'] = len(batch)
+            self.metrics['last_write_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            return True
+
+        self.metrics['failed'] += len(batch)
+        return False
+
+
+async def _update_incremental_scores(batch: List[InteractionEvent]):
+    """Fan-out: skor destinasi incremental learner (in-memory)"""
+    from app.services.incremental_learner import incremental_learner
+
+    for event in batch:
+        if event.entity_type == 'destination':
+            await incremental_learner.update_destination_score(
+                destination_id=event.entity_id,
+                interaction_type=event.interaction_type
+            )
+
+
+# Global instance
+interaction_pipeline = InteractionPipeline()
+interaction_pipeline.subscribe(_update_incremental_scores)
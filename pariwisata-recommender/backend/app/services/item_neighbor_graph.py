@@ -0,0 +1,120 @@
+"""
+Item Neighbor Graph
+Graph destinasi-ke-destinasi: top-K tetangga per item dari blend similarity
+konten (TF-IDF) dan similarity faktor item collaborative (NMF).
+Dibangun saat training, disimpan sebagai array int32/float32 (n_items x K).
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+from sklearn.preprocessing import normalize
+
+from app.services.neighbor_index import NeighborIndex, top_k_neighbors
+
+
+class ItemNeighborGraph:
+    """
+    Top-K similar destinations per destinasi.
+
+    `neighbors(destination_id, n)` cukup membaca satu baris array, O(K),
+    tanpa menyentuh similarity matrix penuh.
+    """
+
+    def __init__(self, item_ids: Sequence[int], index: NeighborIndex):
+        self.item_ids = np.asarray(item_ids, dtype=np.int64)
+        self.index = index
+        self.item_index: Dict[int, int] = {int(item_id): idx for idx, item_id in enumerate(self.item_ids)}
+
+    @property
+    def k(self) -> int:
+        return self.index.k
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self.item_index
+
+    def __len__(self) -> int:
+        return len(self.item_ids)
+
+    @classmethod
+    def build(cls, item_ids: Sequence[int],
+              content_similarity: Optional[np.ndarray] = None,
+              item_factors: Optional[np.ndarray] = None,
+              factor_item_ids: Optional[Sequence[int]] = None,
+              content_weight: float = 0.5,
+              k: int = 20,
+              block_size: int = 512) -> "ItemNeighborGraph":
+        """
+        Bangun graph dari similarity konten dan/atau faktor item collaborative.
+
+        Args:
+            item_ids: destination_id untuk setiap baris graph (urutan content_similarity)
+            content_similarity: Matrix (n_items x n_items) sejajar item_ids
+            item_factors: Faktor item NMF (n_factor_items x n_components)
+            factor_item_ids: destination_id untuk setiap baris item_factors
+            content_weight: Bobot konten; collaborative mendapat 1 - content_weight.
+                Untuk pasangan tanpa faktor collaborative, hanya similarity konten dipakai.
+            k: Jumlah tetangga per item
+        """
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        n_items = len(item_ids)
+
+        # Faktor collaborative disejajarkan ke urutan item_ids (baris nol jika tidak ada)
+        aligned_factors = None
+        has_factors = None
+        if item_factors is not None and factor_item_ids is not None and len(factor_item_ids):
+            factor_rows = {int(item_id): idx for idx, item_id in enumerate(factor_item_ids)}
+            rows = np.array([factor_rows.get(int(item_id), -1) for item_id in item_ids], dtype=np.int64)
+            has_factors = rows >= 0
+            normed = normalize(np.asarray(item_factors, dtype=np.float32))
+            aligned_factors = np.zeros((n_items, normed.shape[1]), dtype=np.float32)
+            aligned_factors[has_factors] = normed[rows[has_factors]]
+
+        if content_similarity is None and aligned_factors is None:
+            raise ValueError("Item neighbor graph requires content similarity or item factors")
+
+        collab_weight = 1.0 - content_weight
+        neighbor_ids = np.full((n_items, k), -1, dtype=np.int32)
+        similarities = np.zeros((n_items, k), dtype=np.float32)
+
+        for start in range(0, n_items, block_size):
+            stop = min(start + block_size, n_items)
+            if aligned_factors is None:
+                sims = np.array(content_similarity[start:stop], dtype=np.float32)
+            else:
+                collab = aligned_factors[start:stop] @ aligned_factors.T
+                if content_similarity is None:
+                    sims = collab
+                else:
+                    content = np.asarray(content_similarity[start:stop], dtype=np.float32)
+                    both = has_factors[start:stop, None] & has_factors[None, :]
+                    sims = np.where(
+                        both,
+                        content_weight * content + collab_weight * collab,
+                        content
+                    ).astype(np.float32)
+            neighbor_ids[start:stop], similarities[start:stop] = top_k_neighbors(sims, start, k)
+
+        return cls(item_ids, NeighborIndex(neighbor_ids, similarities))
+
+    def to_arrays(self, prefix: str = "item_graph") -> Dict[str, np.ndarray]:
+        """Array untuk model artifact (lihat model_artifacts)"""
+        return {f"{prefix}_item_ids": self.item_ids, **self.index.to_arrays(prefix)}
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix: str = "item_graph") -> Optional["ItemNeighborGraph"]:
+        """Graph dari array artifact (boleh memory-mapped); None jika tidak disimpan"""
+        index = NeighborIndex.from_arrays(arrays, prefix)
+        if index is None:
+            return None
+        return cls(arrays[f"{prefix}_item_ids"], index)
+
+    def neighbors(self, item_id: int, n: Optional[int] = None) -> List[Dict[str, float]]:
+        """Tetangga satu destinasi: [{'destination_id', 'similarity'}], terurut menurun"""
+        row = self.item_index.get(item_id)
+        if row is None:
+            return []
+        rows, sims = self.index.neighbors(row, n)
+        return [
+            {'destination_id': int(self.item_ids[idx]), 'similarity': float(sim)}
+            for idx, sim in zip(rows, sims)
+        ]
@@ -0,0 +1,230 @@
+"""
+Journal Persistence
+Write-behind persistence untuk state in-memory (contextual MAB, skor destinasi
+IncrementalLearner):
+- State utama tetap di memori (MABOptimizer, DestinationScoreStore)
+- Setiap update dicatat ke buffer lalu di-append ke journal (JSON lines)
+- Journal di-compact berkala menjadi snapshot (rewrite atomik)
+- Saat startup: load snapshot lalu replay journal (crash recovery)
+
+Flush dijalankan oleh background task (batch size atau interval) di thread
+terpisah, sehingga request handler tidak pernah menulis file secara sinkron.
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+
+class JournaledState:
+    """
+    Format snapshot: {"last_seq": int, <state_key>: <state>}.
+    Format journal: satu entry per baris {"seq": int, ...data update...}.
+    Entry dengan seq <= last_seq snapshot diabaikan saat replay, sehingga crash
+    di antara penulisan snapshot dan truncate journal tidak menggandakan update.
+    """
+
+    def __init__(self, snapshot_file: str, flush_batch_size: int = 50,
+                 flush_interval: float = 5.0, compact_threshold: int = 1000,
+                 state_key: str = "state", label: str = "State"):
+        self.snapshot_file = snapshot_file
+        self.state_key = state_key
+        self.label = label
+        self.journal_file = f"{snapshot_file}.journal"
+        self.flush_batch_size = flush_batch_size
+        self.flush_interval = flush_interval
+        self.compact_threshold = compact_threshold
+
+        self._pending: List[Dict[str, Any]] = []
+        self._seq = 0
+        self._snapshot_seq = 0
+        self._journal_entries = 0
+        self._io_lock = threading.Lock()
+        self._state_provider: Optional[Callable[[], Any]] = None
+
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+        atexit.register(self.flush_sync)
+
+    # ------------------------------------------------------------------ load
+
+    def load_snapshot(self) -> Optional[Any]:
+        """
+        Load state dari snapshot (None jika belum ada). Snapshot format lama
+        (dict context langsung, tanpa "last_seq") tetap didukung.
+        """
+        state = None
+        self._snapshot_seq = 0
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, 'r') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and 'last_seq' in data and self.state_key in data:
+                state = data[self.state_key]
+                self._snapshot_seq = int(data['last_seq'])
+            else:
+                state = data
+        self._seq = self._snapshot_seq
+        return state
+
+    def replay_journal(self, apply_entry: Callable[[Dict[str, Any]], None]) -> int:
+        """
+        Replay entry journal setelah snapshot (crash recovery).
+        Baris terakhir yang terpotong (crash saat append) dilewati.
+
+        Returns:
+            Jumlah entry yang di-replay
+        """
+        replayed = 0
+        self._journal_entries = 0
+        if not os.path.exists(self.journal_file):
+            return 0
+
+        valid_lines = []
+        corrupted = False
+        with open(self.journal_file, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️ {self.label} journal: skipping truncated entry")
+                    corrupted = True
+                    continue
+                valid_lines.append(line)
+                seq = int(entry.get('seq', 0))
+                if seq <= self._snapshot_seq:
+                    continue
+                apply_entry(entry)
+                self._seq = max(self._seq, seq)
+                replayed += 1
+
+        if corrupted:
+            # Tulis ulang tanpa baris rusak agar append berikutnya mulai di baris baru
+            with open(self.journal_file, 'w') as f:
+                f.write(''.join(line + '\n' for line in valid_lines))
+        self._journal_entries = len(valid_lines)
+        return replayed
+
+    # ---------------------------------------------------------------- record
+
+    def bind_state(self, state_provider: Callable[[], Any]):
+        """Set fungsi yang mengembalikan state JSON-serializable untuk snapshot"""
+        self._state_provider = state_provider
+
+    def record(self, entry: Dict[str, Any]):
+        """Catat satu update ke buffer (non-blocking)"""
+        self._seq += 1
+        self._pending.append({'seq': self._seq, **entry})
+
+        if len(self._pending) >= self.flush_batch_size:
+            if self._task is not None and self._wakeup is not None:
+                self._wakeup.set()
+            else:
+                # Tanpa background task (script/CLI): flush langsung per batch
+                self.flush_sync()
+
+    # ----------------------------------------------------------------- flush
+
+    def _take_pending(self) -> List[Dict[str, Any]]:
+        pending, self._pending = self._pending, []
+        return pending
+
+    def _append_journal(self, entries: List[Dict[str, Any]]):
+        if not entries:
+            return
+        with self._io_lock:
+            os.makedirs(os.path.dirname(self.journal_file) or '.', exist_ok=True)
+            with open(self.journal_file, 'a') as f:
+                f.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+                f.flush()
+                os.fsync(f.fileno())
+            self._journal_entries += len(entries)
+
+    def _write_snapshot(self, payload: str):
+        with self._io_lock:
+            os.makedirs(os.path.dirname(self.snapshot_file) or '.', exist_ok=True)
+            tmp_file = f"{self.snapshot_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.snapshot_file)
+            # Semua entry journal sudah termasuk di snapshot
+            with open(self.journal_file, 'w'):
+                pass
+            self._journal_entries = 0
+
+    def _snapshot_payload(self) -> Optional[str]:
+        """
+        Serialisasi state + buang buffer (semua update di buffer sudah ada di state).
+        Harus dipanggil tanpa await di antaranya agar state & last_seq konsisten.
+        """
+        if self._state_provider is None:
+            return None
+        self._pending = []
+        return json.dumps({'last_seq': self._seq, self.state_key: self._state_provider()})
+
+    def compact_sync(self):
+        """Tulis snapshot penuh sekarang (blocking) dan kosongkan journal"""
+        payload = self._snapshot_payload()
+        if payload is not None:
+            self._write_snapshot(payload)
+
+    def flush_sync(self):
+        """Flush buffer ke journal (blocking); compact jika journal sudah besar"""
+        try:
+            self._append_journal(self._take_pending())
+            if self._journal_entries >= self.compact_threshold:
+                self.compact_sync()
+        except Exception as e:
+            print(f"⚠️ Failed to flush {self.label} state: {e}")
+
+    async def flush(self):
+        """Flush buffer ke journal di thread terpisah; compact jika perlu"""
+        try:
+            pending = self._take_pending()
+            if pending:
+                await asyncio.to_thread(self._append_journal, pending)
+            if self._journal_entries >= self.compact_threshold:
+                payload = self._snapshot_payload()
+                if payload is not None:
+                    await asyncio.to_thread(self._write_snapshot, payload)
+                    print(f"🗜️ {self.label} journal compacted into snapshot")
+        except Exception as e:
+            print(f"⚠️ Failed to flush {self.label} state: {e}")
+
+    # ------------------------------------------------------ background task
+
+    def start(self):
+        """Mulai background flush task (panggil dari event loop yang berjalan)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def stop(self):
+        """Hentikan background task dan flush sisa buffer"""
+        self._stopping = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            self._wakeup = None
+        await self.flush()
@@ -1,119 +1,145 @@
 import numpy as np
-import json
-import os
 from typing import List, Dict, Any, Optional
 
+from app.services.mab_persistence import MABStatePersistence
+from app.services.bandit_store import BanditStore
+from app.services.context_featurizer import ROOT_KEY, context_featurizer
+
 class MABOptimizer:
     """
     Contextual Multi-Armed Bandit (UCB1)
     Diadaptasi langsung dari 'ContextualMAB' di Notebook Evaluasi.
+
+    Context mentah di-featurize menjadi key hierarkis (lihat ContextFeaturizer).
+    Setiap reward meng-update context leaf beserta semua parent-nya; saat memilih
+    arm, context yang pull-nya < min_pulls mundur (backoff) ke parent terdekat
+    yang cukup data. Jumlah context dibatasi max_contexts (LRU).
     """
     
-    def __init__(self, n_arms: int = 5, exploration_param: float = 2.0, persistence_file: str = "data/mab_state.json"):
+    def __init__(self, n_arms: int = 5, exploration_param: float = 2.0, persistence_file: str = "data/mab_state.json",
+                 max_contexts: int = 512, min_pulls: int = 30):
         self.c = exploration_param
         self.persistence_file = persistence_file
+        self.max_contexts = max_contexts
+        self.min_pulls = min_pulls
         
         # Fixed arms sama dengan notebook evaluasi (5 arms)
         # Sesuai penelitian: [0.0, 0.3, 0.5, 0.7, 1.0]
         self.arms = [0.0, 0.3, 0.5, 0.7, 1.0]
         self.n_arms = len(self.arms)
         
-        # Sama seperti self.context_brains di notebook
-        self.context_data = {}
+        # Sama seperti self.context_brains di notebook, tetapi sebagai array
+        # (satu baris counts/values per context)
+        self.store = self._new_store()
+        
+        # Write-behind persistence: journal reward + snapshot berkala
+        self.persistence = MABStatePersistence(persistence_file)
+        self.persistence.bind_state(lambda: self.store.to_state())
         
         self.load_state()
 
     def _get_context_key(self, context: Dict[str, Any]) -> str:
-        """Generate string key dari context dict (Sama dengan get_context_key_string di notebook)"""
-        if not context:
-            return "default"
-        
-        # Urutan harus konsisten agar key stabil
-        keys = sorted(context.keys())
-        parts = []
-        for k in keys:
-            val = context[k]
-            parts.append(str(val).lower())
-        return "_".join(parts)
-
-    def _get_or_create_brain(self, context_key: str):
+        """Generate key leaf dari context dict (dimensi ber-bucket, bukan semua field mentah)"""
+        return context_featurizer.context_key(context)
+
+    def _new_store(self, state: Optional[Dict[str, Any]] = None) -> BanditStore:
+        if state is None:
+            store = BanditStore(self.n_arms, max_rows=self.max_contexts, pinned_keys=[ROOT_KEY])
+        else:
+            store = BanditStore.from_state(state, self.n_arms, max_rows=self.max_contexts, pinned_keys=[ROOT_KEY])
+        # Root selalu ada sebagai tujuan backoff terakhir saat memilih arm
+        if store.get_row(ROOT_KEY) is None:
+            store.add_row(ROOT_KEY)
+        return store
+
+    @property
+    def context_data(self) -> Dict[str, Dict[str, Any]]:
+        """State per context dalam format dict lama (read-only view untuk statistik)"""
+        return self.store.to_state()
+
+    def _get_or_create_brain(self, context_key: str) -> int:
         """
         [ADAPTASI DARI NOTEBOOK]
         Helper untuk mengambil atau membuat 'otak' (state) baru untuk konteks baru.
         Mencegah KeyError saat menemui konteks yang belum pernah dilihat.
+
+        Returns:
+            Index baris context di BanditStore
         """
-        if context_key not in self.context_data:
+        row = self.store.get_row(context_key)
+        if row is None:
             print(f"🌟 MAB: New context found '{context_key}', initializing learning...")
-            self.context_data[context_key] = {
-                'counts': np.zeros(self.n_arms).tolist(),
-                'values': np.zeros(self.n_arms).tolist(), # values = avg_rewards di notebook
-                'total_selections': 0
-            }
-            # Auto-save saat menemukan konteks baru
-            self.save_state()
-            
-        return self.context_data[context_key]
+            # Tidak perlu save: context baru ikut tersimpan saat reward pertamanya di-journal
+            row = self.store.add_row(context_key)
+        else:
+            self.store.touch([row])
+        return row
+
+    def _get_path_rows(self, context_key: str) -> List[int]:
+        """Baris context leaf beserta parent-nya (leaf dulu, root terakhir); dibuat jika belum ada"""
+        return [self._get_or_create_brain(key) for key in context_featurizer.key_path(context_key)]
+
+    def _get_existing_path_rows(self, context_key: str) -> List[int]:
+        """
+        Seperti _get_path_rows tetapi hanya context yang sudah ada (read path:
+        select tidak boleh menambah baris yang bisa meng-evict context terlatih)
+        """
+        path = context_featurizer.key_path(context_key)
+        if path[-1] != ROOT_KEY:
+            path.append(ROOT_KEY)  # Key format lama: tetap bisa mundur ke root
+        rows = [row for row in map(self.store.get_row, path) if row is not None]
+        self.store.touch(rows)
+        return rows
 
     def select_arm(self, context_state: Dict[str, Any]) -> int:
         """
         Select arm using UCB1.
         Sama persis dengan logika 'select_arm' di notebook.
         """
-        context_key = self._get_context_key(context_state)
-        
-        # Gunakan helper 'aman' seperti di notebook
-        brain = self._get_or_create_brain(context_key)
-        
-        counts = np.array(brain['counts'])
-        values = np.array(brain['values'])
-        
-        # Hitung total selections (bisa dari variabel atau sum counts)
-        total_selections = np.sum(counts)
-        
-        # Logic UCB1 dari Notebook
-        if total_selections == 0:
-            # Cold start: pilih tengah
-            return self.n_arms // 2
-            
-        ucb_values = np.zeros(self.n_arms)
-        for arm in range(self.n_arms):
-            if counts[arm] == 0:
-                # Prioritaskan arm yang belum pernah dicoba (Infinite UCB)
-                return arm
-            else:
-                # Rumus UCB1
-                bonus = self.c * np.sqrt((2 * np.log(total_selections)) / counts[arm])
-                ucb_values[arm] = values[arm] + bonus
-                
-        return int(np.argmax(ucb_values))
+        return int(self.select_arms([context_state])[0])
+
+    def select_arms(self, contexts: List[Optional[Dict[str, Any]]]) -> List[int]:
+        """Select arm UCB1 untuk banyak request sekaligus (satu pass vektor)"""
+        rows = []
+        for ctx in contexts:
+            path_rows = self._get_existing_path_rows(self._get_context_key(ctx))
+            pulls = self.store.pulls(path_rows)
+            # Backoff: context paling halus yang sudah cukup data, root jika tidak ada
+            enough = np.flatnonzero(pulls >= self.min_pulls)
+            rows.append(path_rows[enough[0]] if enough.size else path_rows[-1])
+        return self.store.select_arms(rows, self.c).tolist()
 
     def update_reward(self, arm_index: int, reward: float, context: Dict[str, Any] = None):
         """
         Update statistics.
         Sama persis dengan logika 'update' di notebook.
         """
-        context_key = self._get_context_key(context)
-        brain = self._get_or_create_brain(context_key)
-        
-        counts = brain['counts']
-        values = brain['values']
-        
-        # Update counts
-        counts[arm_index] += 1
-        n = counts[arm_index]
-        
-        # Update Average Reward (Incremental Formula)
-        # NewAvg = OldAvg + (Reward - OldAvg) / n
-        old_value = values[arm_index]
-        new_value = old_value + (reward - old_value) / n
-        values[arm_index] = new_value
-        
-        # Simpan kembali ke dictionary & file
-        brain['counts'] = counts
-        brain['values'] = values
-        brain['total_selections'] += 1
+        self.update_rewards([arm_index], [reward], [context])
+
+    def update_rewards(self, arm_indices: List[int], rewards: List[float],
+                       contexts: List[Optional[Dict[str, Any]]]):
+        """Batched update: scatter-add ke BanditStore lalu catat ke journal"""
+        context_keys = [self._get_context_key(ctx) for ctx in contexts]
+        self.update_rewards_by_key(arm_indices, rewards, context_keys)
+
+    def update_rewards_by_key(self, arm_indices: List[int], rewards: List[float], context_keys: List[str]):
+        """Batched update untuk context key yang sudah dihitung (mis. dari impression log)"""
+        self._apply_rewards(context_keys, arm_indices, rewards)
         
-        self.save_state()
+        # Write-behind: dicatat ke journal oleh background flush
+        for context_key, arm_index, reward in zip(context_keys, arm_indices, rewards):
+            self.persistence.record({'context': context_key, 'arm': int(arm_index), 'reward': float(reward)})
+
+    def _apply_rewards(self, context_keys: List[str], arm_indices: List[int], rewards: List[float]):
+        """Update in-memory state leaf + parent (dipakai juga saat replay journal)"""
+        rows, arms, path_rewards = [], [], []
+        for context_key, arm_index, reward in zip(context_keys, arm_indices, rewards):
+            path_rows = self._get_path_rows(context_key)
+            rows.extend(path_rows)
+            arms.extend([arm_index] * len(path_rows))
+            path_rewards.extend([reward] * len(path_rows))
+        # NewAvg = (OldAvg * n + sum(rewards)) / (n + k)
+        self.store.update_rewards(rows, arms, path_rewards)
 
     def get_lambda_value(self, arm_index: int) -> float:
         if 0 <= arm_index < self.n_arms:
@@ -121,31 +147,51 @@ class MABOptimizer:
         return 0.5
 
     def save_state(self):
+        """Tulis snapshot penuh sekarang (blocking) dan kosongkan journal"""
         try:
-            os.makedirs(os.path.dirname(self.persistence_file), exist_ok=True)
-            with open(self.persistence_file, 'w') as f:
-                json.dump(self.context_data, f)
+            self.persistence.compact_sync()
         except Exception as e:
             print(f"⚠️ Failed to save MAB state: {e}")
 
     def load_state(self):
         try:
-            if os.path.exists(self.persistence_file):
-                with open(self.persistence_file, 'r') as f:
-                    self.context_data = json.load(f)
-                print(f"📁 Contextual MAB state loaded ({len(self.context_data)} contexts)")
+            state = self.persistence.load_snapshot()
+            if state is not None:
+                self.store = self._new_store(state)
+                print(f"📁 Contextual MAB state loaded ({len(self.store)} contexts)")
             else:
                 print("ℹ️ No MAB state found, starting fresh")
+            
+            # Crash recovery: reward yang belum masuk snapshot (di-apply sebagai satu batch)
+            entries = []
+            replayed = self.persistence.replay_journal(entries.append)
+            if replayed:
+                self._apply_rewards(
+                    [entry['context'] for entry in entries],
+                    [entry['arm'] for entry in entries],
+                    [entry['reward'] for entry in entries]
+                )
+                print(f"♻️ MAB journal replayed ({replayed} rewards)")
         except Exception as e:
             print(f"⚠️ Failed to load MAB state: {e}")
-            self.context_data = {}
+            self.store = self._new_store()
+
+    def start_background_flush(self):
+        """Mulai write-behind flush task (dipanggil saat startup aplikasi)"""
+        self.persistence.start()
+
+    async def stop_background_flush(self):
+        """Hentikan flush task dan tulis sisa reward (dipanggil saat shutdown)"""
+        await self.persistence.stop()
 
     def get_statistics(self) -> Dict[str, Any]:
         return {
-            "total_contexts": len(self.context_data),
+            "total_contexts": len(self.store),
+            "max_contexts": self.max_contexts,
+            "evicted_contexts": self.store.evictions,
             "contexts": self.context_data
         }
 
     def reset(self):
-        self.context_data = {}
+        self.store = self._new_store()
         self.save_state()
\ No newline at end of file
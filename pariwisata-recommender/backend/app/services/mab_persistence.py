@@ -0,0 +1,11 @@
+"""
+MAB State Persistence
+JournaledState dengan format snapshot contextual MAB ({"last_seq", "contexts"}).
+"""
+
+from app.services.journal_persistence import JournaledState
+
+
+class MABStatePersistence(JournaledState):
+    def __init__(self, snapshot_file: str, state_key: str = "contexts", label: str = "MAB", **kwargs):
+        super().__init__(snapshot_file, state_key=state_key, label=label, **kwargs)
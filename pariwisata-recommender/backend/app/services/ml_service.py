@@ -1,13 +1,17 @@
+import asyncio
 import os
-from typing import List, Dict, Any, Optional, Literal, Tuple
+from typing import List, Dict, Any, Optional, Literal, Sequence, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 
 # Import recommenders
 from app.services.content_based_recommender import ContentBasedRecommender
 from app.services.collaborative_recommender import CollaborativeRecommender
 from app.services.hybrid_recommender import HybridRecommender
+from app.services.model_registry import ModelRegistry, ModelBundle
 from app.services.mab_optimizer import MABOptimizer
 from app.services.context_aware_component import ContextAwareComponent
+from app.services.impression_log import impression_log
+from app.services.training_executor import TrainingJob, training_executor
 
 # Auto-select between production (real API) and simulation
 USE_PRODUCTION_API = bool(os.getenv("OPENWEATHER_API_KEY")) or \
@@ -25,13 +29,9 @@ class MLService:
         print("="*60)
 
         # [PERBAIKAN KRITIS] Gunakan Single Source of Truth
-        # HybridRecommender sudah memiliki content & collab recommender di dalamnya.
-        # Kita gunakan instance yang sama agar tidak ada double training/file lock conflict.
-        self.hybrid_recommender = HybridRecommender()
-        
-        # Reference component dari dalam hybrid
-        self.content_recommender = self.hybrid_recommender.content_recommender
-        self.collaborative_recommender = self.hybrid_recommender.collaborative_recommender
+        # Model disajikan dari registry: bundle immutable ber-versi (hybrid + content + collab).
+        # Training membangun bundle baru lalu menukar referensi aktif secara atomik.
+        self.registry = ModelRegistry()
 
         # Initialize MAB Optimizer
         self.mab_optimizer = MABOptimizer(
@@ -47,80 +47,108 @@ class MLService:
         print("📦 Attempting to auto-load existing models...")
         self.load_all_models()
 
-        # Training status check
-        self._training_status = {
-            'content_based': getattr(self.content_recommender, 'is_trained', False),
-            'collaborative': getattr(self.collaborative_recommender, 'is_trained', False),
-            'hybrid': getattr(self.hybrid_recommender, 'is_trained', False)
-        }
-
         print("\n📊 Model Status:")
         print(f"   Content-Based: {'✅ LOADED' if self._training_status['content_based'] else '❌ NOT LOADED'}")
         print(f"   Collaborative: {'✅ LOADED' if self._training_status['collaborative'] else '❌ NOT LOADED'}")
         print(f"   Hybrid:        {'✅ LOADED' if self._training_status['hybrid'] else '❌ NOT LOADED'}")
         print("="*60 + "\n")
+
+    # Model aktif. Handler mengambil `self.registry.current` sekali per request
+    # agar seluruh request memakai satu bundle walaupun terjadi swap di tengah jalan.
+    @property
+    def hybrid_recommender(self) -> HybridRecommender:
+        return self.registry.current.hybrid
+
+    @property
+    def content_recommender(self) -> ContentBasedRecommender:
+        return self.registry.current.content
+
+    @property
+    def collaborative_recommender(self) -> CollaborativeRecommender:
+        return self.registry.current.collaborative
+
+    @property
+    def _training_status(self) -> Dict[str, bool]:
+        return self._bundle_status(self.registry.current)
+
+    @staticmethod
+    def _bundle_status(bundle: ModelBundle) -> Dict[str, bool]:
+        return {
+            'content_based': bool(bundle.content.is_trained),
+            'collaborative': bool(bundle.collaborative.is_trained),
+            'hybrid': bool(bundle.hybrid.is_trained)
+        }
     
-    async def train_all_models(self, db: AsyncSession) -> Dict[str, Any]:
+    async def train_all_models(self, db: AsyncSession,
+                               components: Sequence[str] = HybridRecommender.COMPONENTS,
+                               job: Optional[TrainingJob] = None,
+                               timeout: Optional[float] = None) -> Dict[str, Any]:
         """
-        Train semua recommendation models.
-        [OPTIMIZED] Hanya memanggil hybrid.train() karena ia otomatis melatih
-        content & collab recommender di dalamnya secara berurutan.
+        Train recommendation models ke bundle baru di samping model yang sedang melayani.
+        Data diambil sekali dari DB di sini; fitting berjalan di proses worker
+        training_executor (content & collab paralel, lalu hybrid) sehingga event
+        loop tidak terblokir.
+        Request yang berjalan tetap memakai bundle lama sampai swap.
         """
         results = {}
+        status = self._training_status
+        job = job or training_executor.create_job(components)
+        results['job_id'] = job.job_id
         try:
             print("🔄 Starting Optimized Training Sequence...")
             
-            # Cukup panggil satu ini saja!
-            # Ini akan men-trigger: Content.train() -> Collab.train() -> Hybrid.train()
-            # Secara berurutan, aman, dan tanpa konflik file.
-            hybrid_result = await self.hybrid_recommender.train(db)
+            async def train(hybrid: HybridRecommender):
+                data = await hybrid.load_training_data(db, components)
+                results['hybrid'] = await training_executor.run(job, hybrid.MODEL_DIR, data, timeout)
+                # Muat artifact hasil worker (memory-mapped), di luar event loop
+                await asyncio.to_thread(hybrid.load_model)
+
+            bundle = await self.registry.build(train, components, preload=False)
+            job.version = bundle.version
+            job.finish('succeeded')
             
             # Update status & results
-            results['hybrid'] = hybrid_result
-            results['content_based'] = "Trained via Hybrid"
-            results['collaborative'] = "Trained via Hybrid"
+            for component in HybridRecommender.COMPONENTS:
+                results[component] = "Trained via Hybrid" if component in components else "Carried over"
+            results['version'] = bundle.version
+            status = self._bundle_status(bundle)
             
-            self._training_status['content_based'] = True
-            self._training_status['collaborative'] = True
-            self._training_status['hybrid'] = True
-            
-            print("✅ All models trained successfully via Hybrid Pipeline!")
+            print(f"✅ Models trained successfully via Hybrid Pipeline (version {bundle.version})!")
             
         except Exception as e:
             print(f"❌ Training failed: {str(e)}")
             results['error'] = str(e)
-            self._training_status['hybrid'] = False
-            # Status lainnya mungkin true/false tergantung di mana error terjadi, biarkan apa adanya
+            job.finish('failed', str(e))
+            status = {**status, 'hybrid': False}
+            # Bundle aktif tidak berubah
         
         return {
             "training_results": results,
-            "training_status": self._training_status,
-            "overall_status": "success" if self._training_status['hybrid'] else "failed"
+            "training_status": status,
+            "active_version": self.registry.current.version,
+            # Retrain sebagian sukses walau hybrid belum lengkap (mis. collaborative belum punya data)
+            "overall_status": "failed" if 'error' in results else "success"
         }
 
     def load_all_models(self) -> Dict[str, Any]:
-        """Load model artifacts for all recommenders on-demand."""
+        """Load model artifacts (versi aktif di registry) lalu swap ke bundle tersebut."""
         results = {}
         
         # Load via Hybrid (yang akan men-load komponennya juga)
         try:
-            self.hybrid_recommender.load_model()
-            
-            # Update local status based on the loaded instances
-            self._training_status['content_based'] = self.content_recommender.is_trained
-            self._training_status['collaborative'] = self.collaborative_recommender.is_trained
-            self._training_status['hybrid'] = self.hybrid_recommender.is_trained
+            bundle = self.registry.load()
             
-            results['hybrid'] = {'loaded': self.hybrid_recommender.is_trained}
-            results['content_based'] = {'loaded': self.content_recommender.is_trained}
-            results['collaborative'] = {'loaded': self.collaborative_recommender.is_trained}
+            results['hybrid'] = {'loaded': bundle.hybrid.is_trained}
+            results['content_based'] = {'loaded': bundle.content.is_trained}
+            results['collaborative'] = {'loaded': bundle.collaborative.is_trained}
+            results['version'] = bundle.version
             
         except Exception as e:
             results['error'] = str(e)
 
         return {
             'load_results': results,
-            'training_status': getattr(self, '_training_status', {})
+            'training_status': self._training_status
         }
     
     async def get_recommendations(
@@ -128,27 +156,27 @@ class MLService:
         user_id: Optional[int], 
         algorithm: Literal['content_based', 'collaborative', 'hybrid', 'context_only'] = 'hybrid',
         num_recommendations: int = 10,
-        db: AsyncSession = None
+        db: AsyncSession = None,
+        session_id: Optional[str] = None
     ) -> Tuple[List[Dict[str, Any]], Optional[int], Optional[Dict[str, Any]]]:
         
-        # ... (Bagian ini tetap sama seperti sebelumnya, tidak perlu diubah) ...
-        # Copy-paste logika get_recommendations dari kode sebelumnya jika perlu,
-        # tapi intinya logika routing ini aman.
+        # Snapshot bundle: swap model selama request tidak mempengaruhi request ini
+        bundle = self.registry.current
         
         if algorithm == 'content_based':
-            if not self.content_recommender.is_trained:
+            if not bundle.content.is_trained:
                 raise ValueError("Content-based model belum di-train")
             if user_id is None:
                 raise ValueError("Content-based requires user_id")
-            recommendations = await self.content_recommender.predict(user_id, num_recommendations, db)
+            recommendations = await bundle.content.predict(user_id, num_recommendations, db)
             return recommendations, None, None
         
         elif algorithm == 'collaborative':
-            if not self.collaborative_recommender.is_trained:
+            if not bundle.collaborative.is_trained:
                 raise ValueError("Collaborative model belum di-train")
             if user_id is None:
                 raise ValueError("Collaborative requires user_id")
-            recommendations = await self.collaborative_recommender.predict(user_id, num_recommendations, db)
+            recommendations = await bundle.collaborative.predict(user_id, num_recommendations, db)
             return recommendations, None, None
         
         elif algorithm == 'hybrid':
@@ -163,20 +191,23 @@ class MLService:
                 pass
             
             # 2. Use Contextual MAB & Hybrid Recommender
-            recommendations, arm_index = await self.hybrid_recommender.predict(
+            recommendations, arm_index = await bundle.hybrid.predict(
                 user_id, 
                 num_recommendations, 
                 db, 
                 mab_optimizer=self.mab_optimizer,
                 context=current_context
             )
+
+            # Impression log: reward MAB dihitung batch dari interaksi berikutnya
+            impression_log.record(user_id, session_id, recommendations, arm_index, current_context)
             
             return recommendations, arm_index, current_context
         
         elif algorithm == 'context_only':
             # Legacy fallback
             current_context = await self.context_service.get_current_context() if hasattr(self.context_service, 'get_current_context') else {}
-            base_recommendations = await self.content_recommender._get_popular_destinations(num_recommendations * 2, db)
+            base_recommendations = await bundle.content._get_popular_destinations(num_recommendations * 2, db)
             
             if current_context and base_recommendations:
                 # Logic mapping context... (sama seperti sebelumnya)
@@ -190,26 +221,26 @@ class MLService:
 
     # ... (Metode explain_recommendation, get_user_profile, dll tetap sama) ...
     async def explain_recommendation(self, user_id, destination_id, algorithm='hybrid', db=None):
+        bundle = self.registry.current
         if algorithm == 'content_based':
-            return await self.content_recommender.explain(user_id, destination_id, db)
+            return await bundle.content.explain(user_id, destination_id, db)
         elif algorithm == 'collaborative':
-            return await self.collaborative_recommender.explain(user_id, destination_id, db)
+            return await bundle.collaborative.explain(user_id, destination_id, db)
         elif algorithm == 'hybrid':
-            return await self.hybrid_recommender.explain(user_id, destination_id, db)
+            return await bundle.hybrid.explain(user_id, destination_id, db)
         return {}
 
     async def get_user_profile(self, user_id, db):
         return await self.hybrid_recommender.get_user_profile(user_id, db)
 
     def get_models_status(self):
+        bundle = self.registry.current
+        status = self._bundle_status(bundle)
         return {
-            "models": {
-                "content_based": {"is_trained": self.content_recommender.is_trained},
-                "collaborative": {"is_trained": self.collaborative_recommender.is_trained},
-                "hybrid": {"is_trained": self.hybrid_recommender.is_trained}
-            },
-            "training_status": self._training_status,
-            "mab_optimizer": {"total_contexts": len(self.mab_optimizer.context_data)}
+            "models": {name: {"is_trained": trained} for name, trained in status.items()},
+            "training_status": status,
+            "model_version": {"active": bundle.version, "pinned": self.registry.pinned},
+            "mab_optimizer": {"total_contexts": len(self.mab_optimizer.store)}
         }
 
     def update_recommendation_feedback(self, arm_index, reward, context=None):
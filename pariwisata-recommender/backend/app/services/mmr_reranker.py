@@ -0,0 +1,153 @@
+"""
+MMR Re-ranking Engine
+Maximal Marginal Relevance berbasis array NumPy untuk diversifikasi rekomendasi.
+Formula sesuai tesis: MMR = (1-λ) * relevance - λ * max_similarity
+"""
+
+import numpy as np
+from typing import List, Dict, Any, Optional, Sequence, Union
+
+
+class MMRReranker:
+    """
+    MMR re-ranker di atas similarity matrix yang sudah dihitung sebelumnya.
+
+    Mapping destination_id -> baris matrix dibangun sekali saat model dimuat,
+    sehingga lookup per kandidat O(1). Selama re-ranking, vektor max-similarity
+    setiap kandidat terhadap item terpilih diperbarui sekali per item terpilih,
+    sehingga total biaya rerank O(k·n) untuk k hasil dari n kandidat.
+    """
+
+    def __init__(self, similarity_matrix: np.ndarray, item_ids: Sequence[int]):
+        self.similarity_matrix = similarity_matrix
+        self.item_ids = list(item_ids)
+        self.item_index = {item_id: idx for idx, item_id in enumerate(self.item_ids)}
+
+    def _candidate_rows(self, recommendations: List[Dict[str, Any]]) -> np.ndarray:
+        """Map kandidat ke baris similarity matrix (-1 jika item tidak ada di model)"""
+        return np.fromiter(
+            (self.item_index.get(rec.get('destination_id'), -1) for rec in recommendations),
+            dtype=np.int64,
+            count=len(recommendations)
+        )
+
+    def _similarity_to(self, selected_row: int, rows: np.ndarray) -> np.ndarray:
+        """Similarity item terpilih ke semua kandidat; item di luar model dianggap 0"""
+        if selected_row < 0:
+            return np.zeros(len(rows))
+        sims = np.asarray(self.similarity_matrix[selected_row, np.maximum(rows, 0)], dtype=float)
+        sims[rows < 0] = 0.0
+        return sims
+
+    def rerank(self, recommendations: List[Dict[str, Any]], lambda_val: float,
+               num_final_recs: int) -> List[Dict[str, Any]]:
+        """
+        Re-rank satu daftar kandidat dengan MMR.
+
+        Args:
+            recommendations: List dict dengan 'destination_id' dan 'score'
+            lambda_val: λ=0.0 → pure relevance, λ=1.0 → pure diversity
+            num_final_recs: Jumlah item hasil akhir
+
+        Returns:
+            List rekomendasi terurut hasil MMR
+        """
+        n = len(recommendations)
+        k = min(num_final_recs, n)
+        if k <= 0:
+            return []
+
+        relevance = np.array([float(rec['score']) for rec in recommendations])
+        rows = self._candidate_rows(recommendations)
+
+        max_similarity = np.zeros(n)
+        available = np.ones(n, dtype=bool)
+        selected = []
+
+        # Item pertama: relevance tertinggi
+        best = int(np.argmax(relevance))
+        for _ in range(k):
+            selected.append(best)
+            available[best] = False
+            if len(selected) == k:
+                break
+
+            np.maximum(max_similarity, self._similarity_to(rows[best], rows), out=max_similarity)
+            mmr_scores = (1 - lambda_val) * relevance - lambda_val * max_similarity
+            mmr_scores[~available] = -np.inf
+            best = int(np.argmax(mmr_scores))
+
+        return [recommendations[idx] for idx in selected]
+
+    def rerank_batch(self, candidate_lists: List[List[Dict[str, Any]]],
+                     lambda_vals: Union[float, Sequence[float]],
+                     num_final_recs: int) -> List[List[Dict[str, Any]]]:
+        """
+        Re-rank banyak daftar kandidat sekaligus.
+
+        Semua daftar di-pad ke panjang yang sama lalu diproses sebagai matrix
+        (batch x kandidat), sehingga setiap langkah seleksi MMR adalah satu operasi
+        vektor untuk seluruh batch.
+
+        Args:
+            candidate_lists: List dari daftar kandidat (format sama dengan rerank)
+            lambda_vals: Satu λ untuk semua, atau satu λ per daftar
+            num_final_recs: Jumlah item hasil akhir per daftar
+        """
+        batch_size = len(candidate_lists)
+        if batch_size == 0:
+            return []
+
+        lengths = np.array([len(cands) for cands in candidate_lists])
+        width = int(lengths.max()) if batch_size else 0
+        if width == 0:
+            return [[] for _ in candidate_lists]
+
+        lambdas = np.broadcast_to(np.asarray(lambda_vals, dtype=float), (batch_size,))[:, None]
+
+        relevance = np.zeros((batch_size, width))
+        rows = np.full((batch_size, width), -1, dtype=np.int64)
+        for b, cands in enumerate(candidate_lists):
+            if cands:
+                relevance[b, :len(cands)] = [float(rec['score']) for rec in cands]
+                rows[b, :len(cands)] = self._candidate_rows(cands)
+
+        available = np.arange(width)[None, :] < lengths[:, None]
+        max_similarity = np.zeros((batch_size, width))
+        safe_rows = np.maximum(rows, 0)
+        batch_idx = np.arange(batch_size)
+
+        k = min(num_final_recs, width)
+        picks = np.full((batch_size, k), -1, dtype=np.int64)
+
+        best = np.argmax(np.where(available, relevance, -np.inf), axis=1)
+        for step in range(k):
+            active = available[batch_idx, best]
+            picks[active, step] = best[active]
+            available[batch_idx[active], best[active]] = False
+            if step == k - 1:
+                break
+
+            selected_rows = rows[batch_idx, best]
+            sims = np.asarray(self.similarity_matrix[safe_rows[batch_idx, best][:, None], safe_rows], dtype=float)
+            sims[(rows < 0) | (selected_rows < 0)[:, None] | ~active[:, None]] = 0.0
+            np.maximum(max_similarity, sims, out=max_similarity)
+
+            mmr_scores = (1 - lambdas) * relevance - lambdas * max_similarity
+            mmr_scores[~available] = -np.inf
+            best = np.argmax(mmr_scores, axis=1)
+
+        return [
+            [candidate_lists[b][idx] for idx in picks[b] if idx >= 0]
+            for b in range(batch_size)
+        ]
+
+
+def build_reranker(similarity_matrix: Optional[np.ndarray], item_ids: Sequence[int]) -> Optional[MMRReranker]:
+    """Buat MMRReranker jika similarity matrix tersedia dan konsisten dengan item_ids"""
+    if similarity_matrix is None or not item_ids:
+        return None
+    if similarity_matrix.shape[0] != len(item_ids):
+        print(f"⚠️ MMR: similarity matrix {similarity_matrix.shape} tidak cocok dengan {len(item_ids)} items")
+        return None
+    return MMRReranker(similarity_matrix, item_ids)
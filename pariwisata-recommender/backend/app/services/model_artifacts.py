@@ -0,0 +1,173 @@
+"""
+Model Artifacts
+Format model on-disk ber-versi (pengganti satu blob pickle per recommender):
+
+    <model_dir>/<nama_model>/
+        manifest.json        format_version, kind, created_at, metadata, daftar array
+        <array>.npy          factors, similarity, profiles, id mapping (tanpa pickle)
+        <sparse>.data.npy    CSR: data / indices / indptr (+ shape di manifest)
+        objects.pkl          opsional: objek kecil non-array (mis. estimator sklearn)
+
+Array dimuat dengan np.load(mmap_mode='r'): startup hampir instan, zero-copy,
+dan page cache dipakai bersama oleh semua worker uvicorn. Array hasil load
+read-only; model diganti utuh saat retrain, tidak diubah in-place.
+"""
+
+import json
+import os
+import pickle
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+from scipy.sparse import csr_matrix, issparse
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+OBJECTS_FILE = "objects.pkl"
+REGISTRY_FILE = "registry.json"  # State model registry (versi aktif) di root direktori model
+VERSIONS_DIR = "versions"
+_SPARSE_PARTS = ('data', 'indices', 'indptr')
+
+
+class ModelArtifact:
+    """Artifact yang sudah dimuat: metadata dari manifest + array (memory-mapped)"""
+
+    def __init__(self, path: Path, manifest: Dict[str, Any], arrays: Dict[str, Any], objects: Dict[str, Any]):
+        self.path = path
+        self.manifest = manifest
+        self.arrays = arrays
+        self.objects = objects
+
+    @property
+    def kind(self) -> str:
+        return self.manifest.get('kind', 'unknown')
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.manifest.get('metadata', {})
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.arrays
+
+    def __getitem__(self, name: str):
+        return self.arrays[name]
+
+    def get(self, name: str, default=None):
+        return self.arrays.get(name, default)
+
+
+def artifact_dir(model_dir: Path, model_file: str) -> Path:
+    """Direktori artifact untuk nama file model lama (mis. collaborative_model.pkl -> collaborative_model/)"""
+    return Path(model_dir) / Path(model_file).stem
+
+
+def version_dir(root_dir: Path, version: int) -> Path:
+    """Direktori bundle versi model registry (versi 0 = layout lama, langsung di root_dir)"""
+    return Path(root_dir) if version == 0 else Path(root_dir) / VERSIONS_DIR / f"v{version:04d}"
+
+
+def active_model_dir(root_dir: Path) -> Path:
+    """Direktori versi aktif menurut registry.json (tanpa registry -> root_dir)"""
+    try:
+        with open(Path(root_dir) / REGISTRY_FILE) as f:
+            version = int(json.load(f).get('active', 0))
+    except (OSError, ValueError):
+        return Path(root_dir)
+    path = version_dir(root_dir, version)
+    return path if path.exists() else Path(root_dir)
+
+
+def has_artifact(path: Path) -> bool:
+    return (Path(path) / MANIFEST_FILE).exists()
+
+
+def save_artifact(path: Path, kind: str, arrays: Dict[str, Any],
+                  metadata: Optional[Dict[str, Any]] = None,
+                  objects: Optional[Dict[str, Any]] = None) -> Path:
+    """
+    Tulis artifact ke direktori sementara lalu tukar dengan direktori lama
+    (reader tidak pernah melihat artifact setengah jadi).
+
+    Args:
+        arrays: nama -> ndarray atau scipy sparse matrix (disimpan sebagai CSR);
+            nilai None dilewati
+        metadata: dict JSON-serializable (bobot, info training, dsb.)
+        objects: objek non-array yang tetap di-pickle (kecil)
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+
+    manifest: Dict[str, Any] = {
+        'format_version': FORMAT_VERSION,
+        'kind': kind,
+        'created_at': datetime.now().isoformat(),
+        'metadata': metadata or {},
+        'arrays': {},
+        'sparse': {},
+        'objects': None
+    }
+    for name, value in arrays.items():
+        if value is None:
+            continue
+        if issparse(value):
+            value = csr_matrix(value)
+            for part in _SPARSE_PARTS:
+                np.save(tmp_path / f"{name}.{part}.npy", np.ascontiguousarray(getattr(value, part)), allow_pickle=False)
+            manifest['sparse'][name] = {'format': 'csr', 'shape': list(value.shape), 'dtype': str(value.dtype)}
+        else:
+            value = np.ascontiguousarray(value)
+            np.save(tmp_path / f"{name}.npy", value, allow_pickle=False)
+            manifest['arrays'][name] = {'dtype': str(value.dtype), 'shape': list(value.shape)}
+
+    if objects:
+        with open(tmp_path / OBJECTS_FILE, 'wb') as f:
+            pickle.dump(objects, f)
+        manifest['objects'] = OBJECTS_FILE
+
+    with open(tmp_path / MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Swap: lama -> .old, baru -> path, hapus lama
+    old_path = path.with_name(f"{path.name}.old-{os.getpid()}")
+    if path.exists():
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return path
+
+
+def load_artifact(path: Path, mmap: bool = True) -> Optional[ModelArtifact]:
+    """Muat artifact; None jika direktori belum berisi manifest (pakai fallback pickle)"""
+    path = Path(path)
+    manifest_path = path / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    version = manifest.get('format_version')
+    if version is None or version > FORMAT_VERSION:
+        raise Exception(f"Unsupported model artifact format {version} in {path}")
+
+    mmap_mode = 'r' if mmap else None
+    arrays: Dict[str, Any] = {}
+    for name in manifest.get('arrays', {}):
+        arrays[name] = np.load(path / f"{name}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+    for name, spec in manifest.get('sparse', {}).items():
+        data, indices, indptr = (
+            np.load(path / f"{name}.{part}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+            for part in _SPARSE_PARTS
+        )
+        arrays[name] = csr_matrix((data, indices, indptr), shape=tuple(spec['shape']), copy=False)
+
+    objects: Dict[str, Any] = {}
+    if manifest.get('objects'):
+        with open(path / manifest['objects'], 'rb') as f:
+            objects = pickle.load(f)
+
+    return ModelArtifact(path, manifest, arrays, objects)
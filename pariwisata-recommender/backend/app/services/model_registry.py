@@ -0,0 +1,440 @@
+"""
+Model Registry
+Bundle model immutable ber-versi (content + collaborative + hybrid + item graph).
+
+- Training membangun bundle baru di samping bundle aktif (direktori artifact
+  sendiri: data/models/versions/vNNNN), lalu satu referensi ditukar secara atomik
+- Request yang sedang berjalan tetap memakai bundle yang diambilnya di awal
+- Versi bisa di-list, diaktifkan (rollback) dan di-pin; state disimpan di
+  data/models/registry.json sehingga versi aktif bertahan saat restart
+- Beberapa worker uvicorn berbagi registry.json: perubahan state (alokasi versi,
+  aktivasi, pin) dilakukan di bawah flock registry.lock setelah membaca ulang
+  state, dan worker lain mengikuti versi aktif saat mtime registry.json berubah
+"""
+
+import asyncio
+import json
+import os
+import re
+import shutil
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from app.services.hybrid_recommender import HybridRecommender
+from app.services.content_based_recommender import ContentBasedRecommender
+from app.services.collaborative_recommender import CollaborativeRecommender
+from app.services.model_artifacts import REGISTRY_FILE, VERSIONS_DIR, artifact_dir, version_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows: satu proses saja, tanpa lock lintas worker
+    fcntl = None
+
+LEGACY_VERSION = 0  # Model di data/models langsung (sebelum registry)
+
+_COMPONENT_FILES = {
+    'content_based': ContentBasedRecommender.MODEL_FILE,
+    'collaborative': CollaborativeRecommender.MODEL_FILE,
+    'hybrid': HybridRecommender.MODEL_FILE,
+}
+
+
+class ModelBundle(NamedTuple):
+    version: int
+    hybrid: HybridRecommender
+    model_dir: Path
+    created_at: str
+    source: str  # 'trained' | 'loaded' | 'empty'
+
+    @property
+    def content(self) -> ContentBasedRecommender:
+        return self.hybrid.content_recommender
+
+    @property
+    def collaborative(self) -> CollaborativeRecommender:
+        return self.hybrid.collaborative_recommender
+
+    @property
+    def is_trained(self) -> bool:
+        return bool(self.hybrid.is_trained)
+
+    @property
+    def trained_components(self) -> List[str]:
+        """Sub-model yang siap (hybrid.is_trained butuh keduanya; bundle dengan satu sub-model tetap valid)"""
+        trained = {'content_based': self.content.is_trained, 'collaborative': self.collaborative.is_trained}
+        return [component for component, ready in trained.items() if ready]
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'source': self.source,
+            'created_at': self.created_at,
+            'trained_at': self.hybrid.model_info.get('trained_at'),
+            'is_trained': self.is_trained,
+            'content_based': bool(self.content.is_trained),
+            'collaborative': bool(self.collaborative.is_trained),
+        }
+
+
+class ModelRegistry:
+    """
+    `current` selalu menunjuk satu ModelBundle utuh; pembaca cukup mengambil
+    referensi itu sekali per request. Hanya satu build yang berjalan bersamaan.
+    """
+
+    def __init__(self, root_dir: Path = HybridRecommender.MODEL_DIR, keep_versions: int = 3,
+                 refresh_interval: float = 2.0):
+        self.root_dir = Path(root_dir)
+        self.versions_dir = self.root_dir / VERSIONS_DIR
+        self.state_file = self.root_dir / REGISTRY_FILE
+        # registry.json diganti via os.replace, jadi flock dipegang pada file terpisah
+        self.lock_file = self.root_dir / "registry.lock"
+        self.keep_versions = keep_versions
+        self.refresh_interval = refresh_interval
+        self._state_mtime: Optional[int] = None
+        self._checked_at = 0.0
+        self._following: Optional[int] = None  # Versi (dari worker lain) yang sedang dimuat di background
+        self._follow_task: Optional[asyncio.Task] = None
+
+        self._bundles: Dict[int, ModelBundle] = {}
+        self._history: List[Dict[str, Any]] = []  # Metadata semua versi di disk
+        self._active: Optional[ModelBundle] = None
+        self._active_version = LEGACY_VERSION  # Versi aktif menurut registry.json (bisa mendahului _active)
+        self.pinned: Optional[int] = None
+        self._build_lock = asyncio.Lock()
+        self._control_lock = asyncio.Lock()
+
+    # ----------------------------------------------------------------- read
+
+    @property
+    def current(self) -> ModelBundle:
+        if self._active is None:
+            self._active = self._empty_bundle()
+        else:
+            self._follow_state()
+        return self._active
+
+    def _follow_state(self):
+        """
+        Ikuti versi aktif yang diubah worker lain (dicek paling sering tiap refresh_interval).
+        Versi yang belum ada di memori dimuat di thread terpisah; bundle lama tetap
+        melayani request sampai bundle baru siap.
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.refresh_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = self.state_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._state_mtime:
+            return
+        self._state_mtime = mtime
+
+        state = self._read_state()
+        self._history = state.get('versions', [])
+        self.pinned = state.get('pinned')
+        version = self._active_version = state.get('active', LEGACY_VERSION)
+        if version in (self._active.version, self._following) or not self._version_dir(version).exists():
+            return
+        bundle = self._bundles.get(version)
+        if bundle is not None:
+            self._swap(bundle)
+            self._prune_memory()
+            print(f"🔁 Model version {version} activated (registry changed)")
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Tanpa event loop (script): versi aktif diikuti saat load() berikutnya
+        self._following = version
+        self._follow_task = loop.create_task(self._load_followed(version))
+
+    async def _load_followed(self, version: int):
+        try:
+            bundle = await asyncio.to_thread(self._load_bundle, version)
+        except Exception as e:
+            print(f"⚠️ Model version {version} activated elsewhere could not be loaded: {e}")
+            bundle = None
+        if self._following != version:
+            return  # Versi aktif berubah lagi selama loading
+        self._following = None
+        if bundle is None or not bundle.trained_components:
+            if bundle is not None:
+                print(f"⚠️ Model version {version} activated elsewhere could not be loaded")
+            return
+        self._bundles = {**self._bundles, version: bundle}
+        self._swap(bundle)
+        self._prune_memory()
+        print(f"🔁 Model version {version} activated (registry changed)")
+
+    def list_versions(self) -> List[Dict[str, Any]]:
+        active = self.current.version
+        versions = {entry['version']: dict(entry) for entry in self._history}
+        for version, bundle in self._bundles.items():
+            versions.setdefault(version, {}).update(bundle.describe())
+        return [
+            {**entry, 'active': version == active, 'pinned': version == self.pinned,
+             'in_memory': version in self._bundles}
+            for version, entry in sorted(versions.items(), reverse=True)
+        ]
+
+    # ----------------------------------------------------------- lifecycle
+
+    def _version_dir(self, version: int) -> Path:
+        return version_dir(self.root_dir, version)
+
+    def _empty_bundle(self) -> ModelBundle:
+        return ModelBundle(LEGACY_VERSION, HybridRecommender(self.root_dir), self.root_dir,
+                           datetime.now().isoformat(), 'empty')
+
+    def _load_bundle(self, version: int) -> ModelBundle:
+        model_dir = self._version_dir(version)
+        hybrid = HybridRecommender(model_dir)
+        hybrid.load_model()
+        return ModelBundle(version, hybrid, model_dir, datetime.now().isoformat(), 'loaded')
+
+    def load(self) -> ModelBundle:
+        """Muat versi aktif dari disk (registry.json; tanpa registry -> layout lama)"""
+        self._state_mtime = self._stat_state()
+        self._checked_at = time.monotonic()
+        state = self._read_state()
+        self._history = state.get('versions', [])
+        self.pinned = state.get('pinned')
+        version = state.get('active', LEGACY_VERSION)
+        if version != LEGACY_VERSION and not self._version_dir(version).exists():
+            print(f"⚠️ Model version {version} missing on disk, falling back to legacy models")
+            version = LEGACY_VERSION
+
+        bundle = self._load_bundle(version)
+        self._active_version = version
+        self._bundles = {version: bundle}
+        self._swap(bundle)
+        return bundle
+
+    async def build(self, train: Callable[[HybridRecommender], Awaitable[Any]],
+                    components: Sequence[str] = HybridRecommender.COMPONENTS,
+                    preload: bool = True) -> ModelBundle:
+        """
+        Bangun bundle baru di direktori versi baru lalu aktifkan (kecuali ada versi di-pin).
+        Komponen yang tidak ada di `components` disalin dari bundle aktif; dengan
+        preload=False artifact-nya tidak dimuat di sini (training di proses lain
+        yang memuat, lalu `train` memuat hasil akhir dari direktori versi).
+        """
+        async with self._build_lock:
+            base = self.current
+            # flock, copy & load berjalan di thread: event loop (dan worker lain) tidak terblokir
+            model_dir = await asyncio.to_thread(self._allocate_version)
+            version = int(model_dir.name[1:])
+
+            try:
+                hybrid = HybridRecommender(model_dir)
+                for component in HybridRecommender.COMPONENTS:
+                    if component not in components:
+                        await asyncio.to_thread(self._carry_over, component, base.model_dir, model_dir)
+                if preload and 'content_based' not in components:
+                    await asyncio.to_thread(hybrid.content_recommender.load_model)
+                if preload and 'collaborative' not in components:
+                    await asyncio.to_thread(hybrid.collaborative_recommender.load_model)
+
+                await train(hybrid)
+                bundle = ModelBundle(version, hybrid, model_dir, datetime.now().isoformat(), 'trained')
+                # Cukup komponen yang diminta (mis. content saja saat collaborative belum punya data)
+                missing = [c for c in components if c not in bundle.trained_components]
+                if missing or not bundle.trained_components:
+                    raise Exception(f"Training did not produce a trained model ({', '.join(missing) or 'no components'})")
+            except BaseException:
+                # Termasuk CancelledError (training dibatalkan)
+                shutil.rmtree(model_dir, ignore_errors=True)
+                raise
+
+            await asyncio.to_thread(self._locked, self._commit_build, bundle)
+            return bundle
+
+    def _commit_build(self, bundle: ModelBundle):
+        self._bundles = {**self._bundles, bundle.version: bundle}
+        self._history = self._history + [{k: v for k, v in bundle.describe().items() if k != 'is_trained'}]
+        if self.pinned is None:
+            self._active_version = bundle.version
+            self._swap(bundle)
+            print(f"🔁 Model version {bundle.version} activated")
+        else:
+            print(f"📌 Model version {bundle.version} built; version {self.pinned} stays active (pinned)")
+        self._prune()
+        self._write_state()
+
+    def _allocate_version(self) -> Path:
+        """
+        Nomor versi berikutnya di bawah lock (state dibaca ulang; direktori build
+        yang sedang berjalan di worker lain juga dihitung). Direktori dibuat
+        eksklusif sehingga dua worker tidak pernah memakai versi yang sama.
+        """
+        with self._state_lock():
+            self._sync_state()
+            self.versions_dir.mkdir(parents=True, exist_ok=True)
+            on_disk = [int(m.group(1)) for m in map(re.compile(r'^v(\d+)$').match, os.listdir(self.versions_dir)) if m]
+            version = max([LEGACY_VERSION] + list(self._bundles) + on_disk + [e['version'] for e in self._history])
+            while True:
+                version += 1
+                model_dir = self._version_dir(version)
+                try:
+                    model_dir.mkdir(exist_ok=False)
+                    return model_dir
+                except FileExistsError:
+                    continue
+
+    def _carry_over(self, component: str, source_dir: Path, target_dir: Path):
+        """Salin artifact komponen yang tidak di-train ulang (artifact atau pickle lama)"""
+        model_file = _COMPONENT_FILES[component]
+        source = artifact_dir(source_dir, model_file)
+        if source.exists():
+            shutil.copytree(source, artifact_dir(target_dir, model_file))
+        elif (source_dir / model_file).exists():
+            shutil.copy2(source_dir / model_file, target_dir / model_file)
+
+    def _swap(self, bundle: ModelBundle):
+        # Satu assignment referensi: pembaca melihat bundle lama atau baru, tidak pernah campuran
+        self._following = None  # Aktivasi terbaru menang atas loading versi dari worker lain
+        self._active = bundle
+
+    # -------------------------------------------------------------- control
+
+    async def activate(self, version: int) -> ModelBundle:
+        """
+        Aktifkan versi tertentu (dari memori, atau dimuat dari disk). Bundle dimuat
+        di thread tanpa memegang flock; state hanya diubah di bawah lock.
+        """
+        async with self._control_lock:
+            await asyncio.to_thread(self._locked, lambda: None)  # Baca ulang state
+            bundle = self._bundles.get(version)
+            if bundle is None:
+                if version != LEGACY_VERSION and not any(e['version'] == version for e in self._history):
+                    raise Exception(f"Model version {version} not found")
+                if not self._version_dir(version).exists():
+                    raise Exception(f"Model version {version} is no longer on disk")
+                bundle = await asyncio.to_thread(self._load_bundle, version)
+                if not bundle.trained_components:
+                    raise Exception(f"Model version {version} could not be loaded")
+            return await asyncio.to_thread(self._locked, self._commit_activation, bundle)
+
+    def _commit_activation(self, bundle: ModelBundle) -> ModelBundle:
+        version = bundle.version
+        if not self._version_dir(version).exists():
+            raise Exception(f"Model version {version} is no longer on disk")
+        self._bundles = {**self._bundles, version: bundle}
+        if self.pinned is not None and self.pinned != version:
+            self.pinned = version  # Aktivasi manual memindahkan pin
+        self._active_version = version
+        self._swap(bundle)
+        self._prune()
+        self._write_state()
+        print(f"🔁 Model version {version} activated")
+        return bundle
+
+    async def rollback(self) -> ModelBundle:
+        """Aktifkan versi sebelum versi aktif"""
+        active = await asyncio.to_thread(self._locked, lambda: self._active_version)
+        older = sorted(
+            {e['version'] for e in self._history} | set(self._bundles), reverse=True
+        )
+        candidates = [v for v in older if v < active and self._version_dir(v).exists()]
+        if not candidates:
+            raise Exception(f"No model version older than {active} to roll back to")
+        return await self.activate(candidates[0])
+
+    async def pin(self, version: Optional[int] = None) -> ModelBundle:
+        """Pin versi (default: versi aktif) sehingga training baru tidak mengaktifkan dirinya"""
+        if version is None:
+            version = await asyncio.to_thread(self._locked, lambda: self._active_version)
+        bundle = await self.activate(version)
+        await asyncio.to_thread(self._locked, self._set_pin, bundle.version)
+        return bundle
+
+    async def unpin(self):
+        await asyncio.to_thread(self._locked, self._set_pin, None)
+
+    def _set_pin(self, version: Optional[int]):
+        self.pinned = version
+        self._write_state()
+
+    # -------------------------------------------------------------- storage
+
+    def _prune(self):
+        """Simpan `keep_versions` versi terbaru (+ aktif & pin) di disk; di memori hanya aktif + sebelumnya"""
+        keep_disk = {self._active.version, self._active_version, self.pinned}
+        keep_disk |= set(sorted((e['version'] for e in self._history), reverse=True)[:self.keep_versions])
+
+        for entry in self._history:
+            if entry['version'] not in keep_disk:
+                shutil.rmtree(self._version_dir(entry['version']), ignore_errors=True)
+        # Rebind (bukan mutasi): dipanggil dari thread sementara event loop membaca state
+        self._history = [e for e in self._history if e['version'] in keep_disk]
+        self._prune_memory()
+
+    def _prune_memory(self):
+        # Versi sebelumnya tetap di memori agar rollback instan
+        keep = {self._active.version, self.pinned}
+        in_memory = sorted(self._bundles, reverse=True)
+        keep_memory = keep | set([v for v in in_memory if v < self._active.version][:1])
+        self._bundles = {v: b for v, b in self._bundles.items() if v in keep_memory}
+
+    def _locked(self, fn: Callable[..., Any], *args) -> Any:
+        """Baca ulang state lalu jalankan fn di bawah flock (blocking: panggil lewat asyncio.to_thread)"""
+        with self._state_lock():
+            self._sync_state()
+            return fn(*args)
+
+    @contextmanager
+    def _state_lock(self):
+        """flock eksklusif lintas worker untuk baca-ubah-tulis registry.json (jangan dari event loop)"""
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_file, 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _sync_state(self):
+        """Baca ulang riwayat & pin dari registry.json (dipanggil di bawah _state_lock)"""
+        if self.state_file.exists():
+            state = self._read_state()
+            self._history = state.get('versions', [])
+            self.pinned = state.get('pinned')
+            self._active_version = state.get('active', LEGACY_VERSION)
+
+    def _stat_state(self) -> Optional[int]:
+        try:
+            return self.state_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _read_state(self) -> Dict[str, Any]:
+        if not self.state_file.exists():
+            return {}
+        try:
+            with open(self.state_file) as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Model registry state unreadable: {e}")
+            return {}
+
+    def _write_state(self):
+        state = {
+            'active': self._active_version,
+            'pinned': self.pinned,
+            'versions': self._history,
+            'updated_at': datetime.now().isoformat()
+        }
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_file.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_file)
+        self._state_mtime = self._stat_state()
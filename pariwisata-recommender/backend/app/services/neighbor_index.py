@@ -0,0 +1,136 @@
+"""
+Neighbor Index
+Top-K nearest neighbor (cosine) per baris untuk user-kNN dan explain.
+Menggantikan matrix similarity n x n dengan array int32/float32 berukuran n x K.
+"""
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+from sklearn.preprocessing import normalize
+
+
+# Faktor ter-normalisasi untuk worker process (di-set oleh initializer)
+_worker_factors: Optional[np.ndarray] = None
+
+
+def _init_worker(normed_factors: np.ndarray):
+    global _worker_factors
+    _worker_factors = normed_factors
+
+
+def _worker_block(start: int, stop: int, k: int) -> Tuple[int, np.ndarray, np.ndarray]:
+    ids, sims = _top_k_block(_worker_factors, start, stop, k)
+    return start, ids, sims
+
+
+def _top_k_block(normed: np.ndarray, start: int, stop: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hitung top-K tetangga untuk baris [start, stop).
+    Memori sementara hanya (stop - start) x n_rows, bukan n_rows x n_rows.
+    """
+    return top_k_neighbors(normed[start:stop] @ normed.T, start, k)
+
+
+def top_k_neighbors(sims: np.ndarray, row_offset: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-K kolom per baris dari blok similarity (block_rows x n_rows), terurut menurun.
+    Baris ke-i blok adalah baris global row_offset + i; kolom itu sendiri dikecualikan.
+    Slot kosong (n_rows - 1 < k) berisi id -1 dan similarity 0.
+
+    Catatan: `sims` dimodifikasi in-place.
+    """
+    block_rows, n_rows = sims.shape
+    # Baris itu sendiri bukan tetangga
+    sims[np.arange(block_rows), np.arange(row_offset, row_offset + block_rows)] = -np.inf
+
+    k_eff = min(k, n_rows - 1)
+    ids = np.full((block_rows, k), -1, dtype=np.int32)
+    out_sims = np.zeros((block_rows, k), dtype=np.float32)
+    if k_eff <= 0:
+        return ids, out_sims
+
+    candidates = np.argpartition(-sims, k_eff - 1, axis=1)[:, :k_eff]
+    candidate_sims = np.take_along_axis(sims, candidates, axis=1)
+    order = np.argsort(-candidate_sims, axis=1, kind='stable')
+
+    ids[:, :k_eff] = np.take_along_axis(candidates, order, axis=1)
+    out_sims[:, :k_eff] = np.take_along_axis(candidate_sims, order, axis=1)
+    return ids, out_sims
+
+
+class NeighborIndex:
+    """
+    Index tetangga terdekat: untuk setiap baris disimpan K id tetangga (int32)
+    dan similarity-nya (float32), terurut menurun. Slot kosong berisi id -1.
+    Memori O(n_rows * K) berapapun jumlah user.
+    """
+
+    def __init__(self, neighbor_ids: np.ndarray, similarities: np.ndarray):
+        self.neighbor_ids = np.ascontiguousarray(neighbor_ids, dtype=np.int32)
+        self.similarities = np.ascontiguousarray(similarities, dtype=np.float32)
+
+    @property
+    def k(self) -> int:
+        return self.neighbor_ids.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.neighbor_ids.nbytes + self.similarities.nbytes
+
+    def __len__(self) -> int:
+        return self.neighbor_ids.shape[0]
+
+    @classmethod
+    def build(cls, factors: np.ndarray, k: int = 20, block_size: int = 1024,
+              n_jobs: int = 1) -> "NeighborIndex":
+        """
+        Bangun index dari vektor laten (mis. NMF user_factors) dengan cosine similarity.
+
+        Args:
+            factors: Matrix (n_rows x n_features)
+            k: Jumlah tetangga per baris
+            block_size: Jumlah baris per blok perkalian matrix
+            n_jobs: >1 untuk membagi blok ke ProcessPoolExecutor
+        """
+        normed = normalize(np.asarray(factors, dtype=np.float32))
+        n_rows = normed.shape[0]
+
+        neighbor_ids = np.full((n_rows, k), -1, dtype=np.int32)
+        similarities = np.zeros((n_rows, k), dtype=np.float32)
+        blocks = [(start, min(start + block_size, n_rows)) for start in range(0, n_rows, block_size)]
+
+        if n_jobs > 1 and len(blocks) > 1:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                     initargs=(normed,)) as executor:
+                futures = [executor.submit(_worker_block, start, stop, k) for start, stop in blocks]
+                for future in futures:
+                    start, ids, sims = future.result()
+                    neighbor_ids[start:start + len(ids)] = ids
+                    similarities[start:start + len(ids)] = sims
+        else:
+            for start, stop in blocks:
+                neighbor_ids[start:stop], similarities[start:stop] = _top_k_block(normed, start, stop, k)
+
+        return cls(neighbor_ids, similarities)
+
+    def to_arrays(self, prefix: str = "neighbor") -> Dict[str, np.ndarray]:
+        """Array untuk model artifact (lihat model_artifacts)"""
+        return {f"{prefix}_ids": self.neighbor_ids, f"{prefix}_similarities": self.similarities}
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix: str = "neighbor") -> Optional["NeighborIndex"]:
+        """Index dari array artifact (boleh memory-mapped); None jika tidak disimpan"""
+        if f"{prefix}_ids" not in arrays:
+            return None
+        return cls(arrays[f"{prefix}_ids"], arrays[f"{prefix}_similarities"])
+
+    def neighbors(self, row: int, n: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Ambil (id, similarity) tetangga untuk satu baris, maksimal n"""
+        ids = self.neighbor_ids[row]
+        sims = self.similarities[row]
+        valid = ids >= 0
+        ids, sims = ids[valid], sims[valid]
+        if n is not None:
+            ids, sims = ids[:n], sims[:n]
+        return ids, sims
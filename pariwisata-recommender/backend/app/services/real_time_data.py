@@ -8,7 +8,7 @@ Includes: Weather, Traffic, Social Trends, Temporal (Penanggalan)
 import random
 from datetime import datetime
 from typing import Dict, Any
-from app.services.social_trend_service import SocialTrendService
+from app.services.social_trend_service import social_trend_service
 
 class RealTimeContextService:
     """
@@ -28,7 +28,7 @@ class RealTimeContextService:
         self.hujan_months = [11, 12, 1, 2, 3, 4]    # November - April
         
         # Initialize Social Trend Service
-        self.trend_service = SocialTrendService()
+        self.trend_service = social_trend_service
 
     async def get_current_context(self) -> Dict[str, Any]:
         """
@@ -5,7 +5,7 @@ import asyncio
 from datetime import datetime
 from typing import Dict, Any, Optional
 from pathlib import Path
-from app.services.social_trend_service import SocialTrendService
+from app.services.social_trend_service import social_trend_service
 
 class RealTimeContextService:
     def __init__(self):
@@ -19,7 +19,7 @@ class RealTimeContextService:
         self.TRAFFIC_CACHE_DURATION = 600
         self.kemarau_months = [5, 6, 7, 8, 9, 10]
         self.hujan_months = [11, 12, 1, 2, 3, 4]
-        self.trend_service = SocialTrendService()
+        self.trend_service = social_trend_service
         print(f"🌍 RealTimeContextService initialized")
 
     async def get_current_context(self, lat: float = None, lon: float = None) -> Dict[str, Any]:
@@ -0,0 +1,101 @@
+"""
+Recommendation Hydrator
+Tahap akhir /recommendations/personalized: lengkapi daftar id terurut dari
+strategi apa pun (hybrid, incremental, context_only, fallback) dengan daftar
+populer, lalu resolve semua field kartu sekaligus dari DestinationCatalog.
+"""
+
+from typing import Any, Dict, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.destination_catalog import destination_catalog
+
+
+def _item_field(item: Any, key: str, default=None):
+    """Ambil field dari item rekomendasi (dict atau objek)"""
+    if isinstance(item, dict):
+        return item.get(key, default)
+    return getattr(item, key, default)
+
+
+class RecommendationHydrator:
+    """
+    Popularity fallback di-memoize per generasi DestinationCatalog, sehingga
+    hanya dihitung ulang setelah catalog dimuat ulang (review baru / TTL).
+    """
+
+    POPULAR_POOL_SIZE = 50
+
+    def __init__(self):
+        self._popular_generation = -1
+        self._popular_list: List[Dict[str, Any]] = []
+
+    async def get_popular_fallback(self, limit: int, db: AsyncSession) -> List[Dict[str, Any]]:
+        """Destinasi populer: urut avg rating review lalu jumlah review"""
+        await destination_catalog.ensure_loaded(db)
+        if self._popular_generation != destination_catalog.generation:
+            entries = await destination_catalog.all(db)
+            entries.sort(key=lambda e: (-e.avg_rating, -e.review_count, e.id))
+            self._popular_list = [
+                {
+                    'destination_id': e.id,
+                    'popularity_score': e.avg_rating * e.review_count,
+                    'avg_rating': e.avg_rating,
+                    'interaction_count': e.review_count
+                }
+                for e in entries
+            ]
+            self._popular_generation = destination_catalog.generation
+        return self._popular_list[:max(limit, self.POPULAR_POOL_SIZE)]
+
+    async def fill_with_popular(self, ranked_items: Optional[List[Any]], limit: int,
+                                db: AsyncSession) -> List[Any]:
+        """Tambahkan item populer (tanpa duplikat) jika hasil strategi kurang dari limit"""
+        ranked_items = list(ranked_items or [])
+        if len(ranked_items) >= limit:
+            return ranked_items
+
+        existing_ids = {int(_item_field(x, 'destination_id', 0) or 0) for x in ranked_items}
+        merged = ranked_items
+        for popular in await self.get_popular_fallback(limit, db):
+            if popular['destination_id'] not in existing_ids:
+                merged.append(popular)
+                existing_ids.add(popular['destination_id'])
+            if len(merged) >= limit:
+                break
+        return merged
+
+    async def hydrate(self, ranked_items: List[Any], limit: int,
+                      db: AsyncSession) -> List[Dict[str, Any]]:
+        """Resolve field kartu untuk top-`limit` item dengan satu lookup catalog"""
+        final_items = []
+        for item in ranked_items[:limit]:
+            dest_id = _item_field(item, 'destination_id')
+            if dest_id:
+                final_items.append((dest_id, item))
+        destinations = await destination_catalog.get_many([dest_id for dest_id, _ in final_items], db)
+
+        cards = []
+        for dest_id, item in final_items:
+            dest = destinations.get(dest_id)
+            if not dest:
+                continue
+
+            avg_rating = _item_field(item, 'avg_rating')
+            cards.append({
+                "id": dest.id,
+                "name": dest.name,
+                "image": f"/assets/images/{dest.name.lower().replace(' ', '-')}.jpg",
+                "description": dest.description or "Destinasi wisata menarik di Sumedang",
+                "region": dest.address or "Sumedang",
+                "category": dest.primary_category or "Alam",
+                "rating": round(float(avg_rating or 0), 1),
+                "reviewCount": _item_field(item, 'interaction_count', 0),
+                "algorithm": _item_field(item, 'algorithm', 'popular'),
+                "explanation": _item_field(item, 'explanation', '')
+            })
+        return cards
+
+
+# Global instance
+recommendation_hydrator = RecommendationHydrator()
@@ -0,0 +1,66 @@
+"""
+Review Statistics Provider
+Statistik review (jumlah & rata-rata rating) untuk banyak destinasi/aktivitas
+dengan satu query GROUP BY, menggantikan query count/avg per item.
+"""
+
+from typing import Dict, Iterable, NamedTuple, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import func
+
+from app.models.destination_review import DestinationReview
+from app.models.activity_review import ActivityReview
+
+
+class ReviewStats(NamedTuple):
+    count: int
+    avg_rating: Optional[float]  # None jika belum ada review
+
+
+EMPTY_STATS = ReviewStats(count=0, avg_rating=None)
+
+
+class ReviewStatsProvider:
+    """Answer "stats untuk N id ini" dengan satu grouped query"""
+
+    async def _grouped_stats(self, model, key_column, ids: Iterable[int],
+                             db: AsyncSession) -> Dict[int, ReviewStats]:
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return {}
+
+        result = await db.execute(
+            select(
+                key_column,
+                func.count(model.id),
+                func.avg(model.rating)
+            )
+            .where(key_column.in_(ids))
+            .group_by(key_column)
+        )
+        stats = {item_id: EMPTY_STATS for item_id in ids}
+        for item_id, count, avg_rating in result.all():
+            stats[item_id] = ReviewStats(
+                count=int(count or 0),
+                avg_rating=float(avg_rating) if avg_rating is not None else None
+            )
+        return stats
+
+    async def for_destinations(self, destination_ids: Iterable[int],
+                               db: AsyncSession) -> Dict[int, ReviewStats]:
+        """Statistik DestinationReview per destination_id (id tanpa review -> count 0)"""
+        return await self._grouped_stats(
+            DestinationReview, DestinationReview.destination_id, destination_ids, db
+        )
+
+    async def for_activities(self, activity_ids: Iterable[int],
+                             db: AsyncSession) -> Dict[int, ReviewStats]:
+        """Statistik ActivityReview per activity_id (id tanpa review -> count 0)"""
+        return await self._grouped_stats(
+            ActivityReview, ActivityReview.activity_id, activity_ids, db
+        )
+
+
+# Global instance
+review_stats_provider = ReviewStatsProvider()
@@ -257,6 +257,71 @@ class RewardCalculator:
         
         return reward
 
+    # ------------------------------------------------------------------ batch
+
+    @staticmethod
+    def relevance_from_feedback(rating: Optional[float], interaction_count: int) -> float:
+        """Relevance satu item (aturan yang sama dengan calculate_ndcg_from_interactions)"""
+        if rating is not None:
+            if rating >= 4.0:
+                return 3.0
+            if rating >= 3.0:
+                return 2.0
+            return 0.0
+        if interaction_count:
+            return min(1.0, interaction_count * 0.5)
+        return 0.0
+
+    def calculate_rewards_batch(
+        self,
+        relevance: np.ndarray,
+        category_ids: np.ndarray,
+        popularity: np.ndarray,
+        mask: np.ndarray,
+        k: int = 10
+    ) -> np.ndarray:
+        """
+        Composite reward untuk banyak impression sekaligus (vektor).
+
+        Args:
+            relevance: (M, L) relevance per posisi item yang ditampilkan
+            category_ids: (M, L) id kategori integer >= 0
+            popularity: (M, L) jumlah interaksi per item (untuk novelty)
+            mask: (M, L) True untuk posisi yang berisi item (baris di-pad)
+            k: jumlah posisi teratas untuk NDCG
+
+        Returns:
+            (M,) reward [0,1], sama dengan calculate_reward per impression
+        """
+        relevance = np.where(mask, relevance, 0.0)
+        n_items = mask.sum(axis=1)
+
+        # NDCG@k
+        top = relevance[:, :k]
+        discounts = 1.0 / np.log2(np.arange(top.shape[1]) + 2)
+        dcg = top @ discounts
+        idcg = -np.sort(-top, axis=1) @ discounts
+        ndcg = np.minimum(1.0, np.divide(dcg, idcg, out=np.zeros_like(dcg), where=idcg > 0))
+
+        # Simpson's Diversity Index per baris
+        rows = np.nonzero(mask)
+        counts = np.zeros((mask.shape[0], int(category_ids[mask].max(initial=0)) + 1))
+        np.add.at(counts, (rows[0], category_ids[rows]), 1)
+        safe_n = np.maximum(n_items, 1)[:, None]
+        simpson = ((counts / safe_n) ** 2).sum(axis=1)
+        diversity = np.where(n_items > 1, 1.0 - simpson, 0.0)
+
+        # Novelty = -log2(popularity / 1000), rata-rata per baris
+        popularity = np.where(popularity <= 0, 0.1, popularity)
+        novelty_items = -np.log2(np.minimum(1.0, popularity / 1000.0))
+        novelty = np.where(mask, novelty_items, 0.0).sum(axis=1) / np.maximum(n_items, 1)
+
+        return (
+            self.WEIGHTS['ndcg'] * np.clip(ndcg, 0.0, 1.0) +
+            self.WEIGHTS['diversity'] * np.clip(diversity, 0.0, 1.0) +
+            self.WEIGHTS['novelty'] * np.clip(novelty / 3.0, 0.0, 1.0)
+        )
+
 
 # Global instance
 reward_calculator = RewardCalculator()
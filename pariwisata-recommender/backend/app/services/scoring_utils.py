@@ -0,0 +1,35 @@
+"""
+Scoring Utilities
+Helper NumPy bersama untuk seleksi top-K pada vektor/matrix skor.
+"""
+
+import numpy as np
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Ambil indeks top-K dari vektor skor, terurut menurun.
+
+    Menggunakan argpartition (O(n)) lalu hanya mengurutkan K kandidat.
+    Urutan stabil: untuk skor yang sama, indeks lebih kecil didahulukan
+    (sama dengan hasil sort(reverse=True) pada list berurutan).
+    """
+    scores = np.asarray(scores)
+    n = scores.shape[0]
+    k = min(int(k), n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        threshold = scores[candidates].min()
+        # Pastikan tie di batas K diambil berdasarkan indeks terkecil
+        above = np.flatnonzero(scores > threshold)
+        ties = np.flatnonzero(scores == threshold)[:k - len(above)]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.arange(n)
+
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order]
+
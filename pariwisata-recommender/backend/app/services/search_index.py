@@ -0,0 +1,257 @@
+"""
+Search Index
+Inverted index in-process untuk endpoint /search: tokenisasi nama, deskripsi,
+kategori (dan alamat destinasi), ranking BM25, serta prefix matching untuk
+type-ahead. Index diperbarui secara incremental (upsert/remove per dokumen).
+"""
+
+import bisect
+import heapq
+import math
+import re
+import time
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.activity import Activity
+from app.services.destination_catalog import destination_catalog
+
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase + pecah per kata (huruf/angka)"""
+    if not text:
+        return []
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class InvertedIndex:
+    """
+    Inverted index dengan bobot per field dan skor BM25.
+
+    Setiap dokumen adalah dict field -> teks. Term frequency dihitung berbobot
+    (mis. kecocokan di nama bernilai lebih tinggi dari deskripsi).
+    """
+
+    K1 = 1.2
+    B = 0.75
+    MAX_PREFIX_EXPANSIONS = 50
+
+    def __init__(self, field_weights: Dict[str, float]):
+        self.field_weights = field_weights
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self.doc_terms: Dict[int, Dict[str, float]] = {}
+        self.doc_lengths: Dict[int, float] = {}
+        self.doc_signatures: Dict[int, Tuple] = {}
+        self.total_length = 0.0
+        self._vocab: List[str] = []
+        self._vocab_dirty = False
+
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+
+    def _signature(self, fields: Dict[str, Optional[str]]) -> Tuple:
+        return tuple(fields.get(name) for name in self.field_weights)
+
+    def upsert(self, doc_id: int, fields: Dict[str, Optional[str]]):
+        """Tambah/ganti dokumen; tidak melakukan apa-apa jika teksnya tidak berubah"""
+        signature = self._signature(fields)
+        if self.doc_signatures.get(doc_id) == signature:
+            return
+        self.remove(doc_id)
+
+        term_freqs: Dict[str, float] = defaultdict(float)
+        for field, weight in self.field_weights.items():
+            for token in tokenize(fields.get(field)):
+                term_freqs[token] += weight
+
+        for term, tf in term_freqs.items():
+            if term not in self.postings:
+                self._vocab_dirty = True
+            self.postings[term][doc_id] = tf
+
+        length = sum(term_freqs.values())
+        self.doc_terms[doc_id] = dict(term_freqs)
+        self.doc_lengths[doc_id] = length
+        self.doc_signatures[doc_id] = signature
+        self.total_length += length
+
+    def remove(self, doc_id: int):
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+                    self._vocab_dirty = True
+        self.total_length -= self.doc_lengths.pop(doc_id, 0.0)
+        self.doc_signatures.pop(doc_id, None)
+
+    def sync(self, documents: Dict[int, Dict[str, Optional[str]]]):
+        """Samakan index dengan snapshot dokumen: upsert yang berubah, hapus yang hilang"""
+        for doc_id in [doc_id for doc_id in self.doc_terms if doc_id not in documents]:
+            self.remove(doc_id)
+        for doc_id, fields in documents.items():
+            self.upsert(doc_id, fields)
+
+    def _expand(self, token: str, prefix: bool) -> List[str]:
+        """Term yang cocok dengan token (exact, atau semua term berawalan token)"""
+        if not prefix:
+            return [token] if token in self.postings else []
+        if self._vocab_dirty:
+            self._vocab = sorted(self.postings)
+            self._vocab_dirty = False
+        start = bisect.bisect_left(self._vocab, token)
+        end = start
+        while end < len(self._vocab) and self._vocab[end].startswith(token):
+            end += 1
+        terms = self._vocab[start:end]
+        if len(terms) <= self.MAX_PREFIX_EXPANSIONS:
+            return terms
+        # Query pendek (type-ahead): ambil term dengan document frequency tertinggi,
+        # bukan 50 pertama secara alfabet; token itu sendiri selalu ikut
+        ranked = heapq.nlargest(self.MAX_PREFIX_EXPANSIONS, terms, key=lambda term: len(self.postings[term]))
+        if token in self.postings and token not in ranked:
+            ranked[-1] = token
+        return ranked
+
+    def search(self, query: str, prefix: bool = True) -> List[Tuple[int, float]]:
+        """
+        Cari dokumen yang mengandung semua token query (AND).
+        Token terakhir di-expand sebagai prefix (type-ahead) jika prefix=True.
+
+        Returns:
+            List (doc_id, skor BM25) terurut menurun
+        """
+        tokens = tokenize(query)
+        n_docs = len(self.doc_terms)
+        if not tokens or n_docs == 0:
+            return []
+
+        avg_length = self.total_length / n_docs if n_docs else 1.0
+        scores: Optional[Dict[int, float]] = None
+
+        for position, token in enumerate(tokens):
+            is_last = position == len(tokens) - 1
+            token_scores: Dict[int, float] = defaultdict(float)
+            for term in self._expand(token, prefix and is_last):
+                posting = self.postings[term]
+                df = len(posting)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for doc_id, tf in posting.items():
+                    norm = self.K1 * (1 - self.B + self.B * self.doc_lengths[doc_id] / avg_length)
+                    token_scores[doc_id] += idf * tf * (self.K1 + 1) / (tf + norm)
+
+            if scores is None:
+                scores = dict(token_scores)
+            else:
+                scores = {
+                    doc_id: score + token_scores[doc_id]
+                    for doc_id, score in scores.items()
+                    if doc_id in token_scores
+                }
+            if not scores:
+                return []
+
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+class ActivityRecord(NamedTuple):
+    id: int
+    name: str
+    description: Optional[str]
+    category: Optional[str]
+    duration: Optional[str]
+    price_range: Optional[str]
+    image_url: Optional[str]
+
+
+class SearchService:
+    """
+    Index destinasi (bersumber dari DestinationCatalog) dan aktivitas.
+
+    Index destinasi disinkronkan setiap kali catalog dimuat ulang; index aktivitas
+    disinkronkan dari DB paling lama setiap `activity_max_age` detik (polling:
+    aktivitas hanya ditulis oleh script import di luar proses API, jadi tidak ada
+    write path yang bisa meng-invalidate). Sinkronisasi hanya meng-index ulang
+    dokumen yang teksnya berubah.
+    """
+
+    def __init__(self, activity_max_age: float = 300.0):
+        self.activity_max_age = activity_max_age
+        self.destination_index = InvertedIndex({
+            'name': 3.0, 'category': 1.5, 'primary_category': 1.5,
+            'description': 1.0, 'address': 1.0
+        })
+        self.activity_index = InvertedIndex({
+            'name': 3.0, 'category': 1.5, 'description': 1.0
+        })
+        self.activities: Dict[int, ActivityRecord] = {}
+        self._destination_generation = -1
+        self._activities_loaded_at: Optional[float] = None
+
+    async def _sync_destinations(self, db: AsyncSession):
+        await destination_catalog.ensure_loaded(db)
+        if self._destination_generation == destination_catalog.generation:
+            return
+        entries = await destination_catalog.all(db)
+        self.destination_index.sync({
+            e.id: {
+                'name': e.name, 'category': e.category, 'primary_category': e.primary_category,
+                'description': e.description, 'address': e.address
+            }
+            for e in entries
+        })
+        self._destination_generation = destination_catalog.generation
+
+    async def _sync_activities(self, db: AsyncSession):
+        if (self._activities_loaded_at is not None
+                and time.monotonic() - self._activities_loaded_at < self.activity_max_age):
+            return
+        result = await db.execute(
+            select(
+                Activity.id, Activity.name, Activity.description, Activity.category,
+                Activity.duration, Activity.price_range, Activity.image_url
+            )
+        )
+        self.activities = {row.id: ActivityRecord(*row) for row in result.all()}
+        self.activity_index.sync({
+            a.id: {'name': a.name, 'category': a.category, 'description': a.description}
+            for a in self.activities.values()
+        })
+        self._activities_loaded_at = time.monotonic()
+
+    async def search_destinations(self, query: str, db: AsyncSession, limit: int,
+                                  region: Optional[str] = None) -> List[Tuple[int, float]]:
+        """(destination_id, skor) terurut relevansi, opsional filter region pada alamat"""
+        await self._sync_destinations(db)
+        hits = self.destination_index.search(query)
+        if region:
+            region = region.lower()
+            entries = await destination_catalog.get_many([doc_id for doc_id, _ in hits], db)
+            hits = [
+                (doc_id, score) for doc_id, score in hits
+                if doc_id in entries and region in (entries[doc_id].address or '').lower()
+            ]
+        return hits[:limit]
+
+    async def search_activities(self, query: str, db: AsyncSession, limit: int,
+                                category: Optional[str] = None) -> List[ActivityRecord]:
+        """ActivityRecord terurut relevansi, opsional filter kategori"""
+        await self._sync_activities(db)
+        records = [self.activities[doc_id] for doc_id, _ in self.activity_index.search(query)]
+        if category:
+            category = category.lower()
+            records = [a for a in records if category in (a.category or '').lower()]
+        return records[:limit]
+
+
+# Global instance
+search_service = SearchService()
@@ -0,0 +1,258 @@
+"""
+Shared Trend Engine
+Mode lintas worker uvicorn untuk TrendEngine: bucket counter disimpan di file
+memory-mapped dengan layout tetap, sehingga semua worker menulis ke dan membaca
+dari state yang sama tanpa parsing JSON.
+
+Layout file (little-endian):
+    header            int64[16]   magic, layout, max_destinations, window_buckets,
+                                  n_signals, bucket_seconds, current_bucket,
+                                  n_used, warmed_up
+    dest_ids          int64[max_destinations]                      (-1 = kosong)
+    counts            int32[max_destinations, window_buckets, n_signals]
+
+Penulisan dilindungi fcntl.flock (eksklusif); pembacaan menyalin state di bawah
+lock yang sama menjadi snapshot lokal, diperbarui paling lama setiap
+`refresh_interval` detik. File dengan layout berbeda diganti (file sementara
++ os.replace), tidak pernah di-truncate selagi worker lain me-map-nya.
+"""
+
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: mode shared tidak tersedia
+    fcntl = None
+
+from app.services.trend_engine import SIGNAL_INDEX, SIGNAL_WEIGHTS, SIGNALS, TrendEngine
+
+
+_MAGIC = 0x54524E44  # "TRND"
+_LAYOUT_VERSION = 1
+_HEADER_FIELDS = 16
+(_H_MAGIC, _H_LAYOUT, _H_MAX_DEST, _H_WINDOW, _H_SIGNALS, _H_BUCKET_SECONDS,
+ _H_CURRENT_BUCKET, _H_USED, _H_WARMED) = range(9)
+
+
+class SharedTrendEngine(TrendEngine):
+    """
+    TrendEngine dengan counter di file memory-mapped bersama.
+
+    Skor trending dihitung dari bucket di dalam window (time decay per bucket),
+    sehingga event yang lebih tua dari window tidak lagi berkontribusi.
+    """
+
+    def __init__(self, path: str, max_destinations: int = 2048,
+                 refresh_interval: float = 5.0, **kwargs):
+        if fcntl is None:
+            raise Exception("Shared trend engine requires fcntl (POSIX)")
+        super().__init__(**kwargs)
+        self.path = path
+        self.max_destinations = max_destinations
+        self.refresh_interval = refresh_interval
+        self._refreshed_at = 0.0
+        self._slots: Dict[int, int] = {}
+        self._scores = np.zeros(0)
+        self._ranked = np.zeros(0, dtype=np.int64)
+        self._full_warned = False
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'a+b')
+        self._open_layout()
+
+    # -------------------------------------------------------------- layout
+
+    def _layout_shape(self) -> Tuple[int, int, int]:
+        header_bytes = _HEADER_FIELDS * 8
+        ids_bytes = self.max_destinations * 8
+        counts_bytes = self.max_destinations * self.window_buckets * len(SIGNALS) * 4
+        return header_bytes, ids_bytes, counts_bytes
+
+    def _open_layout(self):
+        header_bytes, ids_bytes, counts_bytes = self._layout_shape()
+        total = header_bytes + ids_bytes + counts_bytes
+        expected = [_MAGIC, _LAYOUT_VERSION, self.max_destinations, self.window_buckets,
+                    len(SIGNALS), self.bucket_seconds]
+
+        while True:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            try:
+                # File bisa sudah diganti worker lain (layout baru) sebelum lock didapat
+                if os.fstat(self._file.fileno()).st_ino == os.stat(self.path).st_ino:
+                    self._file.seek(0, os.SEEK_END)
+                    header = None
+                    if self._file.tell() >= total:
+                        header = np.memmap(self.path, dtype='<i8', mode='r+', shape=(_HEADER_FIELDS,))
+                        if list(header[:6]) != expected:
+                            header = None
+                    if header is not None:
+                        self._header = header
+                        self._shared_ids = np.memmap(self.path, dtype='<i8', mode='r+', offset=header_bytes,
+                                                     shape=(self.max_destinations,))
+                        self._shared_counts = np.memmap(
+                            self.path, dtype='<i4', mode='r+', offset=header_bytes + ids_bytes,
+                            shape=(self.max_destinations, self.window_buckets, len(SIGNALS))
+                        )
+                        return
+                    # File baru atau layout berbeda: inisialisasi ulang
+                    self._write_layout(total, header_bytes, expected)
+            finally:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            # Buka ulang path (inode baru) lalu periksa lagi di bawah lock
+            self._file.close()
+            self._file = open(self.path, 'a+b')
+
+    def _write_layout(self, total: int, header_bytes: int, expected: List[int]):
+        """
+        Tulis layout kosong ke file sementara lalu os.replace ke path. Worker yang
+        masih me-map file lama tetap memegang inode lama (tidak di-truncate di
+        bawah mapping mereka) sampai membuka ulang file.
+        """
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.truncate(total)
+        header = np.memmap(tmp_path, dtype='<i8', mode='r+', shape=(_HEADER_FIELDS,))
+        header[:6] = expected
+        header[_H_CURRENT_BUCKET] = self.current_bucket
+        header[_H_USED] = 0
+        header[_H_WARMED] = 0
+        ids = np.memmap(tmp_path, dtype='<i8', mode='r+', offset=header_bytes,
+                        shape=(self.max_destinations,))
+        ids[:] = -1
+        ids.flush()
+        header.flush()
+        del header, ids
+        os.replace(tmp_path, self.path)
+        print(f"🗂️ Shared trend state initialized: {self.path}")
+
+    def _lock(self):
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+
+    def _unlock(self):
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _advance_shared(self, now_bucket: int):
+        """Kosongkan bucket kedaluwarsa di file bersama (dipanggil di bawah lock)"""
+        current = int(self._header[_H_CURRENT_BUCKET])
+        if now_bucket <= current:
+            return
+        used = int(self._header[_H_USED])
+        expired = min(now_bucket - current, self.window_buckets)
+        for bucket in range(now_bucket - expired + 1, now_bucket + 1):
+            self._shared_counts[:used, bucket % self.window_buckets] = 0
+        self._header[_H_CURRENT_BUCKET] = now_bucket
+
+    def _slot(self, destination_id: int) -> Optional[int]:
+        """Slot destinasi di file bersama; dialokasikan jika belum ada (di bawah lock)"""
+        slot = self._slots.get(destination_id)
+        if slot is not None:
+            return slot
+        used = int(self._header[_H_USED])
+        found = np.flatnonzero(self._shared_ids[:used] == destination_id)
+        if found.size:
+            slot = int(found[0])
+        elif used < self.max_destinations:
+            slot = used
+            self._shared_ids[slot] = destination_id
+            self._shared_counts[slot] = 0
+            self._header[_H_USED] = used + 1
+        else:
+            if not self._full_warned:
+                print(f"⚠️ Shared trend state full ({self.max_destinations} destinations)")
+                self._full_warned = True
+            return None
+        self._slots[destination_id] = slot
+        return slot
+
+    # -------------------------------------------------------------- update
+
+    def record(self, destination_id: int, signal: str, timestamp: Optional[float] = None, count: int = 1):
+        if signal == 'review':
+            signal = 'rating'
+        signal_idx = SIGNAL_INDEX.get(signal)
+        if signal_idx is None:
+            return
+        destination_id = int(destination_id)
+
+        now = time.time()
+        timestamp = now if timestamp is None else min(timestamp, now)
+        bucket = self._bucket_of(timestamp)
+        now_bucket = self._bucket_of(now)
+        if bucket <= now_bucket - self.window_buckets:
+            return
+
+        self._lock()
+        try:
+            self._advance_shared(now_bucket)
+            slot = self._slot(destination_id)
+            if slot is not None:
+                self._shared_counts[slot, bucket % self.window_buckets, signal_idx] += count
+        finally:
+            self._unlock()
+
+    # ---------------------------------------------------------------- read
+
+    def _advance(self, now: float):
+        """Perbarui snapshot lokal dari file bersama jika sudah lewat refresh_interval"""
+        if now - self._refreshed_at < self.refresh_interval:
+            return
+        now_bucket = self._bucket_of(now)
+
+        self._lock()
+        try:
+            self._advance_shared(now_bucket)
+            used = int(self._header[_H_USED])
+            ids = np.array(self._shared_ids[:used])
+            counts = np.array(self._shared_counts[:used], dtype=np.int64)
+        finally:
+            self._unlock()
+
+        # Umur setiap slot ring (bucket sekarang = 0) -> bobot decay per bucket
+        slots = np.arange(self.window_buckets)
+        age_buckets = (now_bucket - slots) % self.window_buckets
+        bucket_times = (now_bucket - age_buckets + 0.5) * self.bucket_seconds
+        decay = np.exp(-self.decay_rate * np.maximum(now - bucket_times, 0.0))
+
+        self.dest_ids = [int(dest_id) for dest_id in ids]
+        self.dest_index = {dest_id: row for row, dest_id in enumerate(self.dest_ids)}
+        self._slots = dict(self.dest_index)
+        self.window_counts = counts.sum(axis=1)
+        self._scores = np.einsum('nbs,b,s->n', counts, decay, SIGNAL_WEIGHTS) if used else np.zeros(0)
+        self._ranked = np.argsort(-self._scores, kind='stable')
+        self.current_bucket = now_bucket
+        self._reclassify()
+        self._refreshed_at = now
+        self.version += 1
+
+    def top_k(self, k: int) -> List[Tuple[int, float]]:
+        self._advance(time.time())
+        return [
+            (self.dest_ids[row], float(self._scores[row]))
+            for row in self._ranked[:k] if self._scores[row] > 0
+        ]
+
+    def trend_score(self, destination_id: int) -> float:
+        self._advance(time.time())
+        row = self.dest_index.get(destination_id)
+        return 0.0 if row is None else float(self._scores[row])
+
+    # ---------------------------------------------------------- warm start
+
+    async def warm_start(self, db):
+        """Hanya worker pertama yang mengisi window dari DB; worker lain memakai file yang ada"""
+        self._lock()
+        try:
+            already_warm = bool(self._header[_H_WARMED])
+            self._header[_H_WARMED] = 1
+        finally:
+            self._unlock()
+        if already_warm:
+            print("📈 Shared trend state already warm, skipping DB warm start")
+            self.warmed_up = True
+            return
+        await super().warm_start(db)
+        self._refreshed_at = 0.0
@@ -0,0 +1,316 @@
+"""
+Training Executor
+Fitting model (TF-IDF, NMF, cosine similarity, neighbor index) dijalankan di
+proses terpisah sehingga event loop FastAPI tetap melayani request. Training
+adalah DAG kecil:
+
+1. extract  - snapshot data training diambil sekali dari DB di proses utama
+              (async, array kolumnar picklable; lihat HybridRecommender.load_training_data)
+2. fit      - setiap komponen yang diminta (content_based, collaborative) di-fit
+              di proses worker sendiri secara paralel; artifact ditulis ke direktori versi
+3. hybrid   - setelah semua fit selesai, satu worker memuat sub-model dari direktori
+              versi (termasuk yang dibawa dari versi sebelumnya) dan merakit bundle hybrid
+
+Semua worker di-spawn di awal (import numpy/sklearn berjalan bersamaan); worker
+stage yang punya dependensi menunggu sinyal `ready` dari parent sebelum mulai.
+Dengan satu CPU (atau satu komponen) stage fit & hybrid dijalankan berurutan
+di satu worker karena worker tambahan hanya menambah biaya spawn.
+
+Progress per stage dikirim lewat satu queue; job bisa dibatalkan atau kena
+timeout (semua worker di-terminate, direktori versi dibuang oleh model registry).
+"""
+
+import asyncio
+import multiprocessing
+import os
+import queue
+import traceback
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+POLL_INTERVAL = 0.2  # Detik antar pengecekan queue progress
+FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled', 'timeout')
+ASSEMBLY_STAGE = 'hybrid'
+PIPELINE_STAGE = 'pipeline'  # Semua stage berurutan di satu worker
+
+
+def _run_fit(model_dir: str, component: str, data: Dict[str, Any], ready, events):
+    """Worker stage fit: satu sub-model (top-level agar bisa di-spawn)"""
+    try:
+        from app.services.hybrid_recommender import HybridRecommender
+
+        ready.wait()
+        events.put(('stage', component, 'started'))
+        result = HybridRecommender(Path(model_dir)).fit_component(component, data)
+        events.put(('stage', component, 'completed'))
+        events.put(('done', component, result))
+    except BaseException as e:
+        events.put(('error', component, str(e), traceback.format_exc()))
+
+
+def _run_assembly(model_dir: str, ready, events):
+    """Worker stage hybrid: muat sub-model dari model_dir lalu rakit bundle hybrid"""
+    try:
+        from app.services.hybrid_recommender import HybridRecommender
+
+        ready.wait()  # Semua stage fit selesai
+        events.put(('stage', ASSEMBLY_STAGE, 'started'))
+        hybrid = HybridRecommender(Path(model_dir))
+        hybrid.content_recommender.load_model()
+        hybrid.collaborative_recommender.load_model()
+        hybrid.assemble()
+        events.put(('stage', ASSEMBLY_STAGE, 'completed'))
+        events.put(('done', ASSEMBLY_STAGE, None))
+    except BaseException as e:
+        events.put(('error', ASSEMBLY_STAGE, str(e), traceback.format_exc()))
+
+
+def _run_pipeline(model_dir: str, components: Sequence[str], data: Dict[str, Any], ready, events):
+    """Worker tunggal: fit komponen berurutan lalu rakit hybrid (HybridRecommender.fit)"""
+    try:
+        from app.services.hybrid_recommender import HybridRecommender
+
+        ready.wait()
+        hybrid = HybridRecommender(Path(model_dir))
+        # Komponen yang tidak di-train sudah disalin registry ke model_dir
+        if 'content_based' not in components:
+            hybrid.content_recommender.load_model()
+        if 'collaborative' not in components:
+            hybrid.collaborative_recommender.load_model()
+
+        result = hybrid.fit(data, components, progress=lambda stage, status: events.put(('stage', stage, status)))
+        events.put(('done', PIPELINE_STAGE, result))
+    except BaseException as e:
+        events.put(('error', PIPELINE_STAGE, str(e), traceback.format_exc()))
+
+
+class TrainingStage(NamedTuple):
+    name: str
+    target: Callable
+    args: Tuple
+    depends_on: Tuple[str, ...] = ()
+
+
+class TrainingJob:
+    """Status satu training run (queued -> running -> succeeded/failed/cancelled/timeout)"""
+
+    def __init__(self, components: Sequence[str]):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.components = tuple(components)
+        self.status = 'queued'
+        self.stages: List[Dict[str, Any]] = []
+        self.current_stage: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.version: Optional[int] = None
+        self.error: Optional[str] = None
+        self.pids: Dict[str, int] = {}  # Stage -> pid worker
+        self.running_stages: List[str] = []
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.cancel_requested = False
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def progress(self) -> float:
+        """Fraksi stage selesai (komponen yang di-train + stage hybrid)"""
+        total = len(self.components) + 1
+        completed = sum(1 for stage in self.stages if stage['status'] == 'completed')
+        return round(min(1.0, completed / total), 3)
+
+    def record_stage(self, stage: str, status: str):
+        # Stage fit bisa berjalan bersamaan
+        if status == 'started':
+            self.running_stages.append(stage)
+        elif stage in self.running_stages:
+            self.running_stages.remove(stage)
+        self.current_stage = ', '.join(self.running_stages) or None
+        self.stages.append({'stage': stage, 'status': status, 'at': datetime.now().isoformat()})
+
+    def finish(self, status: str, error: Optional[str] = None):
+        if self.done:
+            return
+        self.status = status
+        self.error = error
+        self.running_stages = []
+        self.current_stage = None
+        self.finished_at = datetime.now().isoformat()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'components': list(self.components),
+            'status': self.status,
+            'progress': self.progress,
+            'current_stage': self.current_stage,
+            'running_stages': list(self.running_stages),
+            'stages': self.stages,
+            'version': self.version,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class TrainingExecutor:
+    """
+    Menjalankan stage training di proses worker (satu proses per stage; stage
+    fit paralel, stage hybrid setelah semuanya selesai). Proses di-spawn (bukan
+    fork) karena parent menjalankan event loop & thread. `parallel` default:
+    aktif jika ada lebih dari satu CPU.
+    """
+
+    def __init__(self, timeout: float = 3600.0, history_size: int = 20, parallel: Optional[bool] = None):
+        self.timeout = timeout
+        self.history_size = history_size
+        self.parallel = (os.cpu_count() or 1) > 1 if parallel is None else parallel
+        self.jobs: "OrderedDict[str, TrainingJob]" = OrderedDict()
+        self._context = multiprocessing.get_context('spawn')
+
+    def create_job(self, components: Sequence[str]) -> TrainingJob:
+        job = TrainingJob(components)
+        self.jobs[job.job_id] = job
+        # Buang riwayat lama (job yang masih berjalan tidak dibuang)
+        for job_id in [j for j, old in self.jobs.items() if old.done][:max(0, len(self.jobs) - self.history_size)]:
+            del self.jobs[job_id]
+        return job
+
+    def get_job(self, job_id: str) -> Optional[TrainingJob]:
+        return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        return [job.to_dict() for job in reversed(self.jobs.values())]
+
+    def cancel(self, job_id: str) -> TrainingJob:
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise Exception(f"Training job {job_id} not found")
+        if not job.done:
+            job.cancel_requested = True
+        return job
+
+    async def run(self, job: TrainingJob, model_dir: Path, data: Dict[str, Dict[str, Any]],
+                  timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Jalankan DAG stage training di proses worker tanpa memblokir event loop; artifact ditulis ke model_dir"""
+        if job.cancel_requested:
+            job.finish('cancelled', "Cancelled before start")
+            raise Exception(f"Training job {job.job_id} cancelled")
+
+        stages = self._plan(job, model_dir, data)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        events = self._context.Queue()
+        ready = {stage.name: self._context.Event() for stage in stages}
+        processes: Dict[str, Any] = {}
+        results: Dict[str, Any] = {}
+
+        job.status = 'running'
+        job.started_at = datetime.now().isoformat()
+
+        try:
+            started = await asyncio.gather(*(
+                self._start(job, stage, ready[stage.name], events, loop) for stage in stages
+            ), return_exceptions=True)
+            processes.update(
+                (stage.name, process) for stage, process in zip(stages, started)
+                if not isinstance(process, BaseException)
+            )
+            for process in started:
+                if isinstance(process, BaseException):
+                    raise process
+
+            while len(results) < len(stages):
+                # Lepas stage yang semua dependensinya sudah selesai
+                for stage in stages:
+                    if not ready[stage.name].is_set() and all(dep in results for dep in stage.depends_on):
+                        ready[stage.name].set()
+
+                event = self._next_event(events)
+                if event is None:
+                    if job.cancel_requested:
+                        job.finish('cancelled', "Cancelled by request")
+                        raise Exception(f"Training job {job.job_id} cancelled")
+                    if loop.time() > deadline:
+                        job.finish('timeout', f"Exceeded {timeout or self.timeout:g}s")
+                        raise Exception(f"Training job {job.job_id} timed out")
+                    exited = [name for name, p in processes.items() if name not in results and not p.is_alive()]
+                    if exited:
+                        event = self._next_event(events)  # Pesan terakhir sebelum proses keluar
+                        if event is None:
+                            raise Exception(
+                                f"Training worker '{exited[0]}' exited with code {processes[exited[0]].exitcode}"
+                            )
+                    else:
+                        await asyncio.sleep(POLL_INTERVAL)
+                        continue
+
+                kind = event[0]
+                if kind == 'stage':
+                    job.record_stage(event[1], event[2])
+                elif kind == 'done':
+                    results[event[1]] = event[2]
+                elif kind == 'error':
+                    print(f"❌ Training worker error ({event[1]}):\n{event[3]}")
+                    raise Exception(event[2])
+
+            job.result = results[PIPELINE_STAGE] if PIPELINE_STAGE in results else {
+                stage.name: results[stage.name] for stage in stages if stage.name != ASSEMBLY_STAGE
+            }
+            return job.result
+        except BaseException as e:
+            job.finish('cancelled' if isinstance(e, asyncio.CancelledError) else 'failed', str(e))
+            raise
+        finally:
+            for process in processes.values():
+                if job.done and process.is_alive():
+                    process.terminate()  # Dibatalkan / timeout / gagal
+            await asyncio.gather(*(loop.run_in_executor(None, p.join, 5) for p in processes.values()))
+            for process in processes.values():
+                if process.is_alive():
+                    process.kill()
+            events.close()
+
+    def _plan(self, job: TrainingJob, model_dir: Path, data: Dict[str, Dict[str, Any]]) -> List[TrainingStage]:
+        """Stage fit paralel + stage hybrid, atau satu worker berurutan"""
+        if not self.parallel or len(job.components) < 2:
+            return [TrainingStage(PIPELINE_STAGE, _run_pipeline, (str(model_dir), job.components, data))]
+
+        fit_stages = [
+            TrainingStage(component, _run_fit, (str(model_dir), component, data[component]))
+            for component in job.components
+        ]
+        return fit_stages + [
+            TrainingStage(ASSEMBLY_STAGE, _run_assembly, (str(model_dir),), tuple(s.name for s in fit_stages))
+        ]
+
+    async def _start(self, job: TrainingJob, stage: TrainingStage, ready, events, loop):
+        process = self._context.Process(
+            target=stage.target,
+            args=stage.args + (ready, events),
+            name=f"training-{job.job_id}-{stage.name}",
+            daemon=True
+        )
+        # start() menulis snapshot data ke pipe sampai worker selesai import -> jangan di event loop
+        await loop.run_in_executor(None, process.start)
+        job.pids[stage.name] = process.pid
+        print(f"🏗️ Training job {job.job_id}: stage '{stage.name}' started in worker pid {process.pid}")
+        return process
+
+    @staticmethod
+    def _next_event(events):
+        try:
+            return events.get_nowait()
+        except queue.Empty:
+            return None
+
+
+# Global instance
+training_executor = TrainingExecutor(timeout=float(os.getenv("TRAINING_TIMEOUT_SECONDS", "3600")))
@@ -0,0 +1,250 @@
+"""
+Trend Engine
+Counter trending per destinasi dengan sliding window yang eksak:
+- Ring buffer per destinasi berisi bucket 5 menit (288 bucket = 24 jam) untuk
+  view, click, rating, favorite; jumlah window dipelihara incremental
+- Skor trending dengan exponential time decay (forward decay: akumulator
+  diskalakan ke epoch t0, sehingga urutan skor tidak berubah seiring waktu)
+- Top-K dari heap dengan lazy deletion, klasifikasi viral/trending sebagai set
+
+Update O(1); bucket yang kedaluwarsa dikurangkan sekali per 5 menit (vektor).
+"""
+
+import heapq
+import math
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.rating import Rating
+from app.models.user_interaction import UserInteraction
+
+
+# Sinyal yang dihitung per bucket, beserta bobot skor trending
+SIGNALS = ('view', 'click', 'rating', 'favorite')
+SIGNAL_INDEX = {name: idx for idx, name in enumerate(SIGNALS)}
+SIGNAL_WEIGHTS = np.array([1.0, 2.0, 5.0, 3.0])
+
+
+class TrendEngine:
+    """
+    Ambang klasifikasi memakai jumlah view dalam window (default 24 jam):
+    viral >= VIRAL_VIEW_THRESHOLD, trending >= TRENDING_VIEW_THRESHOLD.
+    """
+
+    VIRAL_VIEW_THRESHOLD = 100  # views in 24h
+    TRENDING_VIEW_THRESHOLD = 50  # views in 24h
+    INITIAL_CAPACITY = 64
+    RENORMALIZE_EXPONENT = 50.0
+
+    def __init__(self, bucket_seconds: int = 300, window_buckets: int = 288,
+                 half_life_hours: float = 6.0):
+        self.bucket_seconds = bucket_seconds
+        self.window_buckets = window_buckets
+        self.decay_rate = math.log(2) / (half_life_hours * 3600)
+
+        self.dest_ids: List[int] = []
+        self.dest_index: Dict[int, int] = {}
+        self.buckets = np.zeros((self.INITIAL_CAPACITY, window_buckets, len(SIGNALS)), dtype=np.int32)
+        self.window_counts = np.zeros((self.INITIAL_CAPACITY, len(SIGNALS)), dtype=np.int64)
+
+        # Forward decay: skor(t) = acc * exp(-decay_rate * (t - epoch))
+        self.epoch = time.time()
+        self.decay_acc = np.zeros(self.INITIAL_CAPACITY)
+        self._heap: List[Tuple[float, int]] = []
+
+        self.viral: Set[int] = set()
+        self.trending: Set[int] = set()
+
+        self.current_bucket = self._bucket_of(self.epoch)
+        self.version = 0
+        self.warmed_up = False
+
+    def __len__(self) -> int:
+        return len(self.dest_ids)
+
+    def _bucket_of(self, timestamp: float) -> int:
+        return int(timestamp // self.bucket_seconds)
+
+    # ------------------------------------------------------------- storage
+
+    def _row(self, destination_id: int) -> int:
+        row = self.dest_index.get(destination_id)
+        if row is not None:
+            return row
+        row = len(self.dest_ids)
+        if row >= self.buckets.shape[0]:
+            capacity = self.buckets.shape[0] * 2
+            for name in ('buckets', 'window_counts', 'decay_acc'):
+                current = getattr(self, name)
+                grown = np.zeros((capacity,) + current.shape[1:], dtype=current.dtype)
+                grown[:row] = current[:row]
+                setattr(self, name, grown)
+        self.dest_ids.append(destination_id)
+        self.dest_index[destination_id] = row
+        return row
+
+    def _advance(self, now: float):
+        """Geser window ke bucket sekarang: kurangi & kosongkan bucket yang kedaluwarsa"""
+        now_bucket = self._bucket_of(now)
+        if now_bucket <= self.current_bucket:
+            return
+        n = len(self.dest_ids)
+        expired = min(now_bucket - self.current_bucket, self.window_buckets)
+        for bucket in range(now_bucket - expired + 1, now_bucket + 1):
+            slot = bucket % self.window_buckets
+            self.window_counts[:n] -= self.buckets[:n, slot]
+            self.buckets[:n, slot] = 0
+        self.current_bucket = now_bucket
+        self._reclassify()
+        self.version += 1
+
+        if self.decay_rate * (now - self.epoch) > self.RENORMALIZE_EXPONENT:
+            self._renormalize(now)
+
+    def advance(self):
+        """Geser window ke waktu sekarang (dipanggil sebelum membaca state)"""
+        self._advance(time.time())
+
+    def _renormalize(self, now: float):
+        """Pindahkan epoch ke `now` agar akumulator tidak overflow; bangun ulang heap"""
+        n = len(self.dest_ids)
+        self.decay_acc[:n] *= math.exp(-self.decay_rate * (now - self.epoch))
+        self.epoch = now
+        self._heap = [(-self.decay_acc[row], row) for row in range(n) if self.decay_acc[row] > 0]
+        heapq.heapify(self._heap)
+
+    def _reclassify(self):
+        views = self.window_counts[:len(self.dest_ids), SIGNAL_INDEX['view']]
+        self.viral = {self.dest_ids[row] for row in np.flatnonzero(views >= self.VIRAL_VIEW_THRESHOLD)}
+        self.trending = {
+            self.dest_ids[row]
+            for row in np.flatnonzero((views >= self.TRENDING_VIEW_THRESHOLD) & (views < self.VIRAL_VIEW_THRESHOLD))
+        }
+
+    # -------------------------------------------------------------- update
+
+    def record(self, destination_id: int, signal: str, timestamp: Optional[float] = None, count: int = 1):
+        """
+        Catat satu event (signal: view/click/rating/favorite; review dihitung sebagai rating).
+        Event di luar window diabaikan.
+        """
+        if signal == 'review':
+            signal = 'rating'
+        signal_idx = SIGNAL_INDEX.get(signal)
+        if signal_idx is None:
+            return
+        destination_id = int(destination_id)
+
+        now = time.time()
+        self._advance(now)
+        timestamp = now if timestamp is None else min(timestamp, now)
+        bucket = self._bucket_of(timestamp)
+        if bucket <= self.current_bucket - self.window_buckets:
+            return
+
+        row = self._row(destination_id)
+        self.buckets[row, bucket % self.window_buckets, signal_idx] += count
+        self.window_counts[row, signal_idx] += count
+
+        if signal == 'view':
+            views = self.window_counts[row, signal_idx]
+            if views >= self.VIRAL_VIEW_THRESHOLD:
+                self.trending.discard(destination_id)
+                self.viral.add(destination_id)
+            elif views >= self.TRENDING_VIEW_THRESHOLD:
+                self.trending.add(destination_id)
+
+        self.decay_acc[row] += count * SIGNAL_WEIGHTS[signal_idx] * math.exp(self.decay_rate * (timestamp - self.epoch))
+        heapq.heappush(self._heap, (-self.decay_acc[row], row))
+        if len(self._heap) > 4 * len(self.dest_ids) + 64:
+            self._renormalize(now)
+        self.version += 1
+
+    # ---------------------------------------------------------------- read
+
+    def trend_score(self, destination_id: int) -> float:
+        row = self.dest_index.get(destination_id)
+        if row is None:
+            return 0.0
+        return float(self.decay_acc[row] * math.exp(-self.decay_rate * (time.time() - self.epoch)))
+
+    def window_counts_of(self, destination_id: int) -> Dict[str, int]:
+        self._advance(time.time())
+        row = self.dest_index.get(destination_id)
+        if row is None:
+            return {name: 0 for name in SIGNALS}
+        return {name: int(self.window_counts[row, idx]) for idx, name in enumerate(SIGNALS)}
+
+    def top_k(self, k: int) -> List[Tuple[int, float]]:
+        """(destination_id, skor ter-decay) untuk K destinasi teratas, terurut menurun"""
+        self._advance(time.time())
+        decay = math.exp(-self.decay_rate * (time.time() - self.epoch))
+        result, valid = [], []
+        while self._heap and len(result) < k:
+            neg_acc, row = heapq.heappop(self._heap)
+            # Entry basi (akumulator sudah naik lagi) dibuang
+            if -neg_acc != self.decay_acc[row]:
+                continue
+            valid.append((neg_acc, row))
+            result.append((self.dest_ids[row], float(-neg_acc * decay)))
+        for entry in valid:
+            heapq.heappush(self._heap, entry)
+        return result
+
+    def classification(self, destination_id: int) -> str:
+        self._advance(time.time())
+        if destination_id in self.viral:
+            return "viral"
+        if destination_id in self.trending:
+            return "trending"
+        return "normal"
+
+    # ---------------------------------------------------------- warm start
+
+    def load_events(self, events: Iterable[Tuple[int, str, datetime]]):
+        """Isi window dari event historis (destination_id, signal, created_at)"""
+        for destination_id, signal, created_at in events:
+            if created_at is not None:
+                self.record(destination_id, signal, timestamp=created_at.timestamp())
+
+    async def warm_start(self, db: AsyncSession):
+        """Bangun ulang window 24 jam terakhir dari user_interactions dan ratings"""
+        cutoff = datetime.now() - timedelta(seconds=self.bucket_seconds * self.window_buckets)
+        interactions = await db.execute(
+            select(UserInteraction.entity_id, UserInteraction.interaction_type, UserInteraction.created_at)
+            .where(UserInteraction.entity_type == 'destination')
+            .where(UserInteraction.created_at >= cutoff)
+        )
+        self.load_events(interactions.all())
+
+        ratings = await db.execute(
+            select(Rating.destination_id, Rating.created_at).where(Rating.created_at >= cutoff)
+        )
+        self.load_events((dest_id, 'rating', created_at) for dest_id, created_at in ratings.all())
+        self.warmed_up = True
+        print(f"📈 Trend engine warmed up: {len(self.dest_ids)} destinations in window")
+
+
+def create_trend_engine() -> TrendEngine:
+    """
+    Engine untuk proses ini. Jika TREND_SHARED_FILE di-set, counter disimpan di
+    file memory-mapped yang dipakai bersama oleh semua worker uvicorn.
+    """
+    shared_file = os.getenv("TREND_SHARED_FILE")
+    if shared_file:
+        try:
+            from app.services.shared_trend_engine import SharedTrendEngine
+            return SharedTrendEngine(shared_file)
+        except Exception as e:
+            print(f"⚠️ Shared trend state unavailable ({e}), using per-process trend engine")
+    return TrendEngine()
+
+
+# Global instance (satu per proses)
+trend_engine = create_trend_engine()
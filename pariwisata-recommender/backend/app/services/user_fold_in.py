@@ -0,0 +1,107 @@
+"""
+User Fold-In
+Faktor laten untuk user baru / user yang rating-nya berubah sejak training,
+tanpa retrain NMF: proyeksi non-negative least squares vektor rating user
+ke item_factors yang tetap
+
+    w* = argmin_{w >= 0} || x - item_factors @ w ||^2
+
+(objective NMF untuk satu baris dengan H tetap; x = rating user, 0 untuk item lain).
+
+- Gram matrix item_factors^T item_factors (k x k) di-Cholesky sekali per model,
+  sehingga setiap fold-in hanya NNLS berukuran k x k
+- Hasil disimpan di side table yang bisa tumbuh; array model utama (memory-mapped,
+  read-only) tidak diubah
+- Vektor rating = tabel ratings + rating dari destination_reviews (sumber yang
+  ditulis aplikasi), sama dengan sumber retrain; model baru mulai dengan side
+  table kosong
+"""
+
+import time
+from typing import Any, Dict, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+from scipy.linalg import solve_triangular
+from scipy.optimize import nnls
+
+
+class FoldInEntry(NamedTuple):
+    row: int                 # Baris di UserFactorTable.factors
+    rated_cols: np.ndarray   # Kolom item yang sudah di-rate (untuk masking)
+    updated_at: float        # time.monotonic()
+
+
+class UserFactorTable:
+    """
+    Side table faktor user hasil fold-in. Entry kedaluwarsa setelah `max_age`
+    detik atau setelah `mark_stale` (rating baru), lalu di-fold-in ulang.
+    """
+
+    def __init__(self, item_factors: np.ndarray, max_age: float = 300.0, initial_capacity: int = 256):
+        self.item_factors = item_factors
+        self.max_age = max_age
+        n_components = item_factors.shape[1]
+
+        # G = H^T H = L L^T (jitter kecil agar tetap positive definite jika ada komponen nol)
+        gram = np.asarray(item_factors.T @ item_factors, dtype=np.float64)
+        jitter = 1e-10 * max(float(np.trace(gram)) / max(n_components, 1), 1.0)
+        self._chol = np.linalg.cholesky(gram + jitter * np.eye(n_components))
+
+        self.factors = np.zeros((initial_capacity, n_components))
+        self._entries: Dict[int, FoldInEntry] = {}
+        self._stale: Set[int] = set()
+        self.metrics: Dict[str, Any] = {'fold_ins': 0, 'last_fold_in_ms': 0.0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def project(self, item_cols: np.ndarray, ratings: np.ndarray) -> np.ndarray:
+        """NNLS fold-in satu vektor rating (kolom item terenkode + nilai rating)"""
+        # ||x - Hw||^2 = w^T G w - 2 w^T H^T x + c = ||L^T w - L^-1 H^T x||^2 + c'
+        hx = np.asarray(ratings, dtype=np.float64) @ self.item_factors[item_cols]
+        rhs = solve_triangular(self._chol, hx, lower=True)
+        factor, _ = nnls(self._chol.T, rhs)
+        return factor
+
+    def get(self, user_id: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(faktor user, kolom yang sudah di-rate) jika entry masih segar"""
+        entry = self._entries.get(user_id)
+        if entry is None or user_id in self._stale or time.monotonic() - entry.updated_at > self.max_age:
+            return None
+        return self.factors[entry.row].copy(), entry.rated_cols
+
+    def put(self, user_id: int, item_cols: np.ndarray, ratings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Fold-in lalu simpan (baris lama dipakai ulang jika user sudah ada)"""
+        started = time.perf_counter()
+        factor = self.project(item_cols, ratings)
+
+        entry = self._entries.get(user_id)
+        row = entry.row if entry is not None else len(self._entries)
+        if row >= len(self.factors):
+            grown = np.zeros((len(self.factors) * 2, self.factors.shape[1]))
+            grown[:len(self.factors)] = self.factors
+            self.factors = grown
+        self.factors[row] = factor
+
+        rated_cols = np.sort(np.asarray(item_cols, dtype=np.int64))
+        self._entries[user_id] = FoldInEntry(row, rated_cols, time.monotonic())
+        self._stale.discard(user_id)
+
+        self.metrics['fold_ins'] += 1
+        self.metrics['last_fold_in_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        return factor.copy(), rated_cols
+
+    def mark_stale(self, user_id: int):
+        """Rating user berubah: fold-in ulang pada request berikutnya"""
+        self._stale.add(user_id)
+
+    def is_stale(self, user_id: int) -> bool:
+        return user_id in self._stale
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            'users': len(self._entries),
+            'stale': len(self._stale),
+            'capacity': len(self.factors)
+        }
@@ -14,10 +14,47 @@ from contextlib import asynccontextmanager
 # Load environment variables
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start/stop background tasks milik service global"""
+    from app.services.ml_service import ml_service
+    from app.services.incremental_learner import incremental_learner
+    from app.services.interaction_pipeline import interaction_pipeline
+    from app.services.trend_engine import trend_engine
+    from app.services.context_snapshot import context_snapshot_service
+    from app.services.impression_log import impression_log
+    from app.core.db import AsyncSessionLocal
+
+    # MAB state & skor destinasi: write-behind flush (journal + snapshot)
+    ml_service.mab_optimizer.start_background_flush()
+    incremental_learner.score_store.start_background_flush()
+    # Trend window 24 jam dibangun ulang dari DB
+    try:
+        async with AsyncSessionLocal() as db:
+            await trend_engine.warm_start(db)
+    except Exception as e:
+        print(f"⚠️ Trend engine warm start failed: {e}")
+    # Ingestion click/view: batch insert di background
+    interaction_pipeline.start()
+    # Context real-time (cuaca/traffic/kalender/tren) di-refresh di background
+    context_snapshot_service.start()
+    # Reward MAB: impression log di-settle batch secara periodik
+    impression_log.start(ml_service.mab_optimizer)
+    yield
+    await impression_log.stop()
+    await context_snapshot_service.stop()
+    # Drain antrian dulu: subscriber masih meng-update skor & trend
+    await interaction_pipeline.stop()
+    await incremental_learner.score_store.stop_background_flush()
+    await ml_service.mab_optimizer.stop_background_flush()
+
+
 app = FastAPI(
     title="Pariwisata Recommendation API",
     description="API untuk Sistem Rekomendasi Pariwisata Adaptif dengan Incremental Learning",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS for frontend applications
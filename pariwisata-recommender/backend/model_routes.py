@@ -22,6 +22,9 @@ model_router = APIRouter(prefix="/admin/model", tags=["model-management"])
 class RetrainRequest(BaseModel):
     modelType: Literal["contentBased", "collaborative", "hybrid", "all"]
     
+class PinRequest(BaseModel):
+    version: Optional[int] = None  # None = pin versi aktif
+
 class ScheduleRequest(BaseModel):
     interval: Literal["weekly", "monthly", "quarterly", "biannual", "triannual", "annual"]
 
@@ -68,10 +71,11 @@ async def get_model_status(current_admin: dict = Depends(get_current_admin)):
         # Get REAL status langsung dari ml_service (sama seperti /ml/status)
         status_data = ml_service.get_models_status()
         
-        # Get model_info dari masing-masing recommender untuk detail
-        content_info = ml_service.content_recommender.model_info if hasattr(ml_service.content_recommender, 'model_info') else {}
-        collab_info = ml_service.collaborative_recommender.model_info if hasattr(ml_service.collaborative_recommender, 'model_info') else {}
-        hybrid_info = ml_service.hybrid_recommender.model_info if hasattr(ml_service.hybrid_recommender, 'model_info') else {}
+        # Get model_info dari masing-masing recommender untuk detail (satu bundle)
+        bundle = ml_service.registry.current
+        content_info = bundle.content.model_info if hasattr(bundle.content, 'model_info') else {}
+        collab_info = bundle.collaborative.model_info if hasattr(bundle.collaborative, 'model_info') else {}
+        hybrid_info = bundle.hybrid.model_info if hasattr(bundle.hybrid, 'model_info') else {}
         
         return {
             "contentBased": {
@@ -92,6 +96,7 @@ async def get_model_status(current_admin: dict = Depends(get_current_admin)):
                 "accuracy": hybrid_info.get("accuracy", 0.88),
                 "samples": hybrid_info.get("n_samples", hybrid_info.get("samples", 36992))
             },
+            "version": status_data["model_version"],
             "_debug": {
                 "trainingStatus": status_data["training_status"],
                 "contentInfo": content_info,
@@ -181,34 +186,37 @@ async def get_drift_detection(current_admin: dict = Depends(get_current_admin)):
             "recommendation": "✅ Model performa stabil"
         }
 
-async def retrain_model_task(model_type: str):
-    """Background task to retrain model"""
+# Komponen yang di-train per modelType; komponen lain dibawa dari versi aktif
+RETRAIN_COMPONENTS = {
+    "contentBased": ("content_based",),
+    "collaborative": ("collaborative",),
+    "hybrid": ("content_based", "collaborative"),
+    "all": ("content_based", "collaborative"),
+}
+DEFAULT_ACCURACY = {"contentBased": 0.85, "collaborative": 0.82, "hybrid": 0.88, "all": 0.88}
+
+async def retrain_model_task(model_type: str, job=None):
+    """Background task to retrain model (bundle baru di registry, model aktif tidak diubah)"""
     try:
         from app.services.ml_service import ml_service
         from app.core.db import AsyncSessionLocal
         
         start_time = datetime.now()
+        components = RETRAIN_COMPONENTS.get(model_type)
+        if components is None:
+            raise Exception(f"Unknown model type: {model_type}")
         
         async with AsyncSessionLocal() as db:
-            if model_type == "all":
-                # Retrain all models
-                print("🔄 Retraining all models...")
-                result = await ml_service.train_all_models(db)
-                accuracy = result.get("training_results", {}).get("hybrid", {}).get("accuracy", 0.88)
-            elif model_type == "contentBased":
-                print("🔄 Retraining Content-Based model...")
-                result = await ml_service.content_recommender.train(db)
-                accuracy = result.get("accuracy", 0.85)
-            elif model_type == "collaborative":
-                print("🔄 Retraining Collaborative model...")
-                result = await ml_service.collaborative_recommender.train(db)
-                accuracy = result.get("accuracy", 0.82)
-            elif model_type == "hybrid":
-                print("🔄 Retraining Hybrid model...")
-                result = await ml_service.hybrid_recommender.train(db)
-                accuracy = result.get("accuracy", 0.88)
-            else:
-                accuracy = 0
+            print(f"🔄 Retraining {model_type} model...")
+            result = await ml_service.train_all_models(db, components=components, job=job)
+        
+        if result["overall_status"] != "success":
+            raise Exception(result["training_results"].get("error", "training failed"))
+        bundle = ml_service.registry.current
+        info = bundle.content.model_info if model_type == "contentBased" else (
+            bundle.collaborative.model_info if model_type == "collaborative" else bundle.hybrid.model_info
+        )
+        accuracy = info.get("accuracy", DEFAULT_ACCURACY[model_type])
         
         duration = (datetime.now() - start_time).total_seconds()
         
@@ -219,6 +227,8 @@ async def retrain_model_task(model_type: str):
             "trainingType": "full_retrain",
             "duration": f"{int(duration // 60)}m {int(duration % 60)}s",
             "accuracy": accuracy,
+            "version": result["training_results"].get("version"),
+            "jobId": result["training_results"].get("job_id"),
             "status": "success"
         })
         
@@ -244,16 +254,94 @@ async def retrain_model(
     current_admin: dict = Depends(get_current_admin)
 ):
     """Trigger model retraining"""
+    from app.services.training_executor import training_executor
+    
+    # Job dibuat sekarang agar progress bisa dipantau lewat /training-jobs/{jobId}
+    job = training_executor.create_job(RETRAIN_COMPONENTS[request.modelType])
     
     # Add retraining task to background
-    background_tasks.add_task(retrain_model_task, request.modelType)
+    background_tasks.add_task(retrain_model_task, request.modelType, job)
     
     return {
         "message": f"Model retraining started for {request.modelType}",
         "status": "initiated",
+        "jobId": job.job_id,
         "timestamp": datetime.now().isoformat()
     }
 
+@model_router.get("/training-jobs")
+async def list_training_jobs(current_admin: dict = Depends(get_current_admin)):
+    """List training job terbaru beserta progress per stage"""
+    from app.services.training_executor import training_executor
+    return training_executor.list_jobs()
+
+@model_router.get("/training-jobs/{job_id}")
+async def get_training_job(job_id: str, current_admin: dict = Depends(get_current_admin)):
+    """Status & progress satu training job"""
+    from app.services.training_executor import training_executor
+    job = training_executor.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return job.to_dict()
+
+@model_router.post("/training-jobs/{job_id}/cancel")
+async def cancel_training_job(job_id: str, current_admin: dict = Depends(get_current_admin)):
+    """Batalkan training job (proses worker dihentikan, model aktif tidak berubah)"""
+    from app.services.training_executor import training_executor
+    try:
+        job = training_executor.cancel(job_id)
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return job.to_dict()
+
+@model_router.get("/versions")
+async def list_model_versions(current_admin: dict = Depends(get_current_admin)):
+    """List versi model di registry (aktif, pinned, tersedia untuk rollback)"""
+    from app.services.ml_service import ml_service
+    registry = ml_service.registry
+    return {
+        "active": registry.current.version,
+        "pinned": registry.pinned,
+        "versions": registry.list_versions()
+    }
+
+@model_router.post("/versions/{version}/activate")
+async def activate_model_version(version: int, current_admin: dict = Depends(get_current_admin)):
+    """Aktifkan versi model tertentu (swap atomik)"""
+    from app.services.ml_service import ml_service
+    try:
+        bundle = await ml_service.registry.activate(version)
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"message": f"Model version {bundle.version} activated", "active": bundle.version}
+
+@model_router.post("/rollback")
+async def rollback_model_version(current_admin: dict = Depends(get_current_admin)):
+    """Kembali ke versi model sebelumnya"""
+    from app.services.ml_service import ml_service
+    try:
+        bundle = await ml_service.registry.rollback()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"message": f"Rolled back to model version {bundle.version}", "active": bundle.version}
+
+@model_router.post("/pin")
+async def pin_model_version(request: PinRequest, current_admin: dict = Depends(get_current_admin)):
+    """Pin versi model: retrain berikutnya tidak otomatis diaktifkan"""
+    from app.services.ml_service import ml_service
+    try:
+        bundle = await ml_service.registry.pin(request.version)
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"message": f"Model version {bundle.version} pinned", "active": bundle.version, "pinned": bundle.version}
+
+@model_router.post("/unpin")
+async def unpin_model_version(current_admin: dict = Depends(get_current_admin)):
+    """Lepas pin; retrain berikutnya langsung diaktifkan"""
+    from app.services.ml_service import ml_service
+    await ml_service.registry.unpin()
+    return {"message": "Model version unpinned", "active": ml_service.registry.current.version}
+
 @model_router.post("/schedule")
 async def set_retrain_schedule(
     request: ScheduleRequest,
@@ -4,6 +4,12 @@ import time
 import json
 import traceback
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.model_artifacts import active_model_dir, has_artifact, load_artifact
+
+MODEL_NAME = 'collaborative_model'
+
 def check_memory_threshold(threshold_bytes: int = None) -> bool:
     """Check if available memory is above `threshold_bytes`.
 
@@ -35,6 +41,17 @@ def load_collaborative_model(model_path: str):
         if not os.path.exists(model_path):
             raise FileNotFoundError(model_path)
 
+        # Format artifact (direktori manifest.json + .npy): semua array memory-mapped
+        if os.path.isdir(model_path):
+            artifact = load_artifact(model_path)
+            if artifact is None:
+                raise FileNotFoundError(os.path.join(model_path, 'manifest.json'))
+            print(f"[worker] Loading model artifact (format {artifact.manifest.get('format_version')}) with mmap_mode='r'")
+            meta = artifact.metadata.get('trained_at')
+            print(f"[worker] Model loaded successfully. trained_at={meta}, arrays={sorted(artifact.arrays)}")
+            time.sleep(1)
+            return {'status': 'loaded', 'trained_at': str(meta)}
+
         # Try to use joblib with mmap_mode to reduce peak memory when possible
         try:
             from joblib import load as joblib_load
@@ -58,9 +75,21 @@ def load_collaborative_model(model_path: str):
         return {'status': 'error', 'error': str(e)}
 
 
+def resolve_model_path(path: str) -> str:
+    """
+    Path artifact/pickle collaborative. `path` boleh berupa artifact langsung atau
+    root direktori model; root di-resolve ke versi aktif model registry (registry.json).
+    """
+    if os.path.isdir(path) and not has_artifact(path):
+        path = os.path.join(str(active_model_dir(path)), MODEL_NAME)
+    if not os.path.exists(path) and os.path.exists(path + '.pkl'):
+        path += '.pkl'  # Model lama (pickle)
+    return path
+
+
 def main():
-    # Expect model path as first arg, else use default mounted path
-    model_path = sys.argv[1] if len(sys.argv) > 1 else '/app/data/models/collaborative_model.pkl'
+    # Expect model path (or models root) as first arg, else use default mounted models root
+    model_path = resolve_model_path(sys.argv[1] if len(sys.argv) > 1 else '/app/data/models')
 
     # Check memory
     ok = check_memory_threshold()